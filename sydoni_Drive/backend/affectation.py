@@ -0,0 +1,182 @@
+from collections import deque
+from backend.detour import calculer_detours, filtrer_par_detour, DETOUR_MAX_KM
+from backend.spatial import Grille
+from backend.models.annonce import find_annonces_par_depart
+from backend.trajets import reserver_trajet, EN_ATTENTE
+from backend.universites import get_coordonnees_universite
+
+# Nombre d'annonces candidates (les plus proches) examinées pour chaque passager
+NB_CANDIDATES = 12
+
+# Nombre de voisines présélectionnées par candidate retenue, pour compenser celles écartées par le détour
+FACTEUR_VOISINES = 3
+
+def _candidates(demandes, annonces, coordonnees_universites, nb_candidates, distance_max_km, detour_max_km, detour_max_min):
+    """
+    Construit, pour chaque demande, la liste des annonces éligibles les plus proches (distance, indice d'annonce).
+    Une annonce est éligible si elle va à la même université et si le détour imposé à l'automobiliste
+    pour prendre le passager reste dans les limites, comme pour la recherche interactive (backend.matching).
+    Les voisines sont présélectionnées par une grille spatiale par université: les détours ne sont
+    calculés que pour elles, et non pour toutes les annonces de l'université.
+    """
+    # Grille des départs des annonces ayant une place, indexées par leur indice dans la liste
+    def depart(j):
+        position = annonces[j].position_depart
+        if annonces[j].places_disponibles <= 0 or not position:
+            return None
+        return position["latitude"], position["longitude"]
+    grille = Grille(cle=lambda j: j, position=depart, partition=lambda j: annonces[j].universite_destination)
+    for j in range(len(annonces)):
+        grille.add(j)
+
+    candidates = []
+    for demande in demandes:
+        universite = demande["universite"]
+        if universite not in coordonnees_universites:
+            candidates.append([])
+            continue
+        lat, lon = demande["latitude"], demande["longitude"]
+        voisines = grille.plus_proches(lat, lon, FACTEUR_VOISINES * nb_candidates, universite)
+        if distance_max_km is not None:
+            voisines = [(distance, j) for distance, j in voisines if distance <= distance_max_km]
+        detours = calculer_detours(lat, lon, [annonces[j] for _, j in voisines], *coordonnees_universites[universite])
+        # Même filtre que la recherche interactive, appliqué aux couples (distance, indice d'annonce)
+        retenues = sorted(couple for couple, _ in filtrer_par_detour(voisines, detours, detour_max_km, detour_max_min))
+        candidates.append(retenues[:nb_candidates])
+    return candidates
+
+def _chemin_augmentant(p, candidates, places, passagers_par_annonce, affectation, profondeur_max):
+    """
+    Recherche en largeur une chaîne de déplacements libérant une place pour la demande p:
+    p prend la place de q sur une annonce complète, q se reporte sur une autre de ses candidates, etc.
+    Retourne la liste des (demande, annonce) à appliquer, ou None.
+    """
+    file = deque([(p, 0)])
+    precedent = {} # Annonce visitée -> (demande qui la prend, annonce quittée par la demande précédente)
+    vues = {p}
+    while file:
+        demande, profondeur = file.popleft()
+        for _, j in candidates[demande]:
+            if j in precedent or j == affectation.get(demande):
+                continue
+            precedent[j] = demande
+            if places[j] > 0:
+                # Remonter la chaîne: chaque demande prend l'annonce suivante
+                chaine = []
+                while True:
+                    d = precedent[j]
+                    chaine.append((d, j))
+                    if d == p:
+                        return chaine
+                    j = affectation[d]
+            if profondeur + 1 < profondeur_max:
+                for q in passagers_par_annonce[j]:
+                    if q not in vues:
+                        vues.add(q)
+                        file.append((q, profondeur + 1))
+    return None
+
+def calculer_affectation(demandes, annonces, coordonnees_universites, nb_candidates=NB_CANDIDATES,
+                         distance_max_km=None, profondeur_max=3, detour_max_km=DETOUR_MAX_KM, detour_max_min=None):
+    """
+    Affecte en lot des passagers aux annonces en respectant le nombre de places, en servant
+    le plus de passagers possible et en minimisant la distance totale de prise en charge.
+    Méthode gloutonne avec réparation:
+      1. les couples (passager, annonce) éligibles sont pris par distance croissante;
+      2. chaque passager resté sans place est servi, si possible, par une chaîne de reports
+         (un passager déjà placé cède sa place et se reporte sur une autre de ses candidates);
+      3. chaque passager est enfin déplacé vers une annonce plus proche s'il y reste une place.
+
+    Args:
+        demandes (list): Des dictionnaires {"id", "latitude", "longitude", "universite"}.
+        annonces (list): Les objets Annonce ouverts (position de départ et places disponibles).
+        coordonnees_universites (dict): Nom d'université -> (latitude, longitude).
+        nb_candidates (int, optional): Nombre d'annonces les plus proches examinées par passager. Defaults to NB_CANDIDATES.
+        distance_max_km (float, optional): Distance maximale de prise en charge. Defaults to None.
+        profondeur_max (int, optional): Longueur maximale des chaînes de reports. Defaults to 3.
+        detour_max_km (float, optional): Détour maximal en kilomètres (None: pas de limite). Defaults to DETOUR_MAX_KM.
+        detour_max_min (float, optional): Détour maximal en minutes (None: pas de limite). Defaults to None.
+
+    Returns:
+        dict: {"affectations": {id de demande: id_annonce}, "non_affectees": [id de demande],
+               "distance_totale": somme des distances passager-automobiliste en km}.
+    """
+    candidates = _candidates(demandes, annonces, coordonnees_universites, nb_candidates, distance_max_km, detour_max_km, detour_max_min)
+    distances = [dict((j, distance) for distance, j in liste) for liste in candidates]
+    places = [max(annonce.places_disponibles, 0) for annonce in annonces]
+    affectation = {} # Indice de demande -> indice d'annonce
+    passagers_par_annonce = [set() for _ in annonces]
+
+    def affecter(p, j):
+        ancienne = affectation.get(p)
+        if ancienne is not None:
+            passagers_par_annonce[ancienne].discard(p)
+            places[ancienne] += 1
+        affectation[p] = j
+        passagers_par_annonce[j].add(p)
+        places[j] -= 1
+
+    # 1. Glouton: les couples les plus proches d'abord
+    couples = sorted((distance, p, j) for p, liste in enumerate(candidates) for distance, j in liste)
+    for _, p, j in couples:
+        if p not in affectation and places[j] > 0:
+            affecter(p, j)
+
+    # 2. Réparation: chaînes de reports pour les passagers restés sans place
+    for p in range(len(demandes)):
+        if p not in affectation and candidates[p]:
+            chaine = _chemin_augmentant(p, candidates, places, passagers_par_annonce, affectation, profondeur_max)
+            if chaine:
+                # Appliquer depuis la fin de la chaîne: la place libre est prise en premier
+                for demande, j in chaine:
+                    affecter(demande, j)
+
+    # 3. Amélioration: rapprocher chaque passager si une annonce plus proche a encore une place
+    for p, j in list(affectation.items()):
+        for distance, k in candidates[p]:
+            if distance >= distances[p][j]:
+                break
+            if places[k] > 0:
+                affecter(p, k)
+                break
+
+    return {
+        "affectations": {demandes[p]["id"]: annonces[j].id_annonce for p, j in affectation.items()},
+        "non_affectees": [demande["id"] for p, demande in enumerate(demandes) if p not in affectation],
+        "distance_totale": sum(distances[p][j] for p, j in affectation.items()),
+    }
+
+def affecter_en_lot(demandes, debut, fin, **options):
+    """
+    Affecte en lot les demandes en attente aux annonces ouvertes partant dans [debut, fin),
+    puis enregistre les réservations correspondantes.
+
+    Args:
+        demandes (list): Des dictionnaires {"id" (email du passager), "latitude", "longitude", "universite"}.
+        debut (datetime): Départ au plus tôt (inclus).
+        fin (datetime): Départ au plus tard (exclu).
+        **options: Options transmises à calculer_affectation (nb_candidates, distance_max_km, profondeur_max,
+            detour_max_km, detour_max_min).
+
+    Returns:
+        dict: Le résultat de calculer_affectation, avec en plus "echecs": {id de demande: message}
+        pour les réservations refusées à l'enregistrement.
+    """
+    universites = {demande["universite"] for demande in demandes}
+    annonces = [annonce for universite in universites
+                for annonce in find_annonces_par_depart(debut, fin, statut=EN_ATTENTE, universite=universite)
+                if annonce.places_disponibles > 0 and annonce.position_depart]
+    coordonnees_universites = {}
+    for universite in universites:
+        coords = get_coordonnees_universite(universite)
+        if coords is not None:
+            coordonnees_universites[universite] = coords
+
+    resultat = calculer_affectation(demandes, annonces, coordonnees_universites, **options)
+    positions = {demande["id"]: (demande["latitude"], demande["longitude"]) for demande in demandes}
+    resultat["echecs"] = {}
+    for email, id_annonce in resultat["affectations"].items():
+        succes, message = reserver_trajet(id_annonce, email, *positions[email])
+        if not succes:
+            resultat["echecs"][email] = message
+    return resultat
@@ -0,0 +1,234 @@
+import random
+from stockage import SOLDES_FILE, declare_derived_index, query_derived_index
+
+class _Noeud:
+    __slots__ = ("cle", "priorite", "taille", "gauche", "droite")
+
+    def __init__(self, cle):
+        self.cle = cle
+        self.priorite = random.random()
+        self.taille = 1
+        self.gauche = None
+        self.droite = None
+
+def _taille(noeud):
+    return noeud.taille if noeud is not None else 0
+
+def _fusionner(gauche, droite):
+    """
+    Fusionne deux arbres dont toutes les clés de `gauche` précèdent celles de `droite`.
+    """
+    if gauche is None:
+        return droite
+    if droite is None:
+        return gauche
+    if gauche.priorite > droite.priorite:
+        gauche.droite = _fusionner(gauche.droite, droite)
+        gauche.taille = 1 + _taille(gauche.gauche) + _taille(gauche.droite)
+        return gauche
+    droite.gauche = _fusionner(gauche, droite.gauche)
+    droite.taille = 1 + _taille(droite.gauche) + _taille(droite.droite)
+    return droite
+
+def _couper(noeud, cle, inclus):
+    """
+    Coupe un arbre en (clés < cle, clés >= cle), ou en (clés <= cle, clés > cle) si `inclus`.
+    """
+    if noeud is None:
+        return None, None
+    if noeud.cle < cle or (inclus and noeud.cle == cle):
+        noeud.droite, droite = _couper(noeud.droite, cle, inclus)
+        noeud.taille = 1 + _taille(noeud.gauche) + _taille(noeud.droite)
+        return noeud, droite
+    gauche, noeud.gauche = _couper(noeud.gauche, cle, inclus)
+    noeud.taille = 1 + _taille(noeud.gauche) + _taille(noeud.droite)
+    return gauche, noeud
+
+class ArbreRang:
+    """
+    Ensemble ordonné de clés (arbre binaire de recherche aléatoire, ou treap) dont chaque nœud
+    connaît la taille de son sous-arbre: insertion, retrait, nombre de clés inférieures à une
+    valeur et accès par position se font en O(log n) en moyenne.
+    """
+    def __init__(self):
+        self.racine = None
+
+    def __len__(self):
+        return _taille(self.racine)
+
+    def construire(self, cles):
+        """
+        Remplace le contenu de l'arbre par des clés déjà triées, en O(n): l'arbre est construit équilibré
+        et des priorités aléatoires lui sont attribuées en ordre décroissant, niveau par niveau.
+        """
+        noeuds = [_Noeud(cle) for cle in cles]
+
+        def lier(debut, fin):
+            if debut >= fin:
+                return None
+            milieu = (debut + fin) // 2
+            noeud = noeuds[milieu]
+            noeud.gauche, noeud.droite, noeud.taille = lier(debut, milieu), lier(milieu + 1, fin), fin - debut
+            return noeud
+
+        self.racine = lier(0, len(noeuds))
+        priorites = sorted((random.random() for _ in noeuds), reverse=True)
+        niveau = [self.racine] if self.racine is not None else []
+        for i, noeud in enumerate(niveau):
+            # La liste est parcourue pendant qu'elle s'allonge: parcours en largeur
+            noeud.priorite = priorites[i]
+            niveau.extend(enfant for enfant in (noeud.gauche, noeud.droite) if enfant is not None)
+
+    def ajouter(self, cle):
+        gauche, droite = _couper(self.racine, cle, False)
+        self.racine = _fusionner(_fusionner(gauche, _Noeud(cle)), droite)
+
+    def retirer(self, cle):
+        gauche, reste = _couper(self.racine, cle, False)
+        _, droite = _couper(reste, cle, True)
+        self.racine = _fusionner(gauche, droite)
+
+    def compter_inferieurs(self, cle):
+        """
+        Nombre de clés strictement inférieures à `cle`.
+        """
+        nombre, noeud = 0, self.racine
+        while noeud is not None:
+            if noeud.cle < cle:
+                nombre += _taille(noeud.gauche) + 1
+                noeud = noeud.droite
+            else:
+                noeud = noeud.gauche
+        return nombre
+
+    def premiers(self, n=None):
+        """
+        Les n plus petites clés (toutes si n est None), dans l'ordre (parcours infixe interrompu au n-ième nœud).
+        """
+        resultat, pile, noeud = [], [], self.racine
+        while (pile or noeud is not None) and (n is None or len(resultat) < n):
+            while noeud is not None:
+                pile.append(noeud)
+                noeud = noeud.gauche
+            noeud = pile.pop()
+            resultat.append(noeud.cle)
+            noeud = noeud.droite
+        return resultat
+
+# Classements tenus: général, par université et par engin
+CRITERES = ("universite", "engin")
+
+class Classement:
+    """
+    Classement des utilisateurs par points, tenu à jour par le stockage à chaque changement de solde
+    (index dérivé de la table des soldes). Chaque classement (général, par université, par engin)
+    est un ArbreRang de clés (-points, email): les meilleurs sont en tête et, à points égaux,
+    les utilisateurs sont départagés par email.
+    Les clés ajoutées sont mises en attente et insérées à la lecture suivante: à la construction
+    de l'index (tous les soldes ajoutés d'un coup), l'arbre est alors construit en une fois.
+    """
+    def __init__(self):
+        self.soldes = {} # Email -> solde enregistré
+        self.arbres = {None: ArbreRang()} # None (général) ou (critère, valeur) -> ArbreRang
+        self.en_attente = {} # Partition -> clés ajoutées pas encore insérées dans l'arbre
+
+    def _partitions(self, solde):
+        return [None] + [(critere, solde.get(critere)) for critere in CRITERES if solde.get(critere)]
+
+    def _arbre(self, partition):
+        """
+        Retourne l'arbre d'une partition (None si elle est vide), après y avoir inséré les clés en attente.
+        """
+        arbre, cles = self.arbres.get(partition), self.en_attente.pop(partition, None)
+        if cles:
+            if arbre is None:
+                arbre = self.arbres[partition] = ArbreRang()
+            if len(cles) > len(arbre):
+                arbre.construire(sorted(arbre.premiers() + cles))
+            else:
+                for cle in cles:
+                    arbre.ajouter(cle)
+        return arbre
+
+    def add(self, solde):
+        self.soldes[solde["email"]] = solde
+        cle = (-solde["solde"], solde["email"])
+        for partition in self._partitions(solde):
+            self.en_attente.setdefault(partition, []).append(cle)
+
+    def discard(self, solde):
+        if self.soldes.get(solde["email"]) != solde:
+            return
+        del self.soldes[solde["email"]]
+        cle = (-solde["solde"], solde["email"])
+        for partition in self._partitions(solde):
+            arbre = self._arbre(partition)
+            arbre.retirer(cle)
+            if not arbre and partition is not None:
+                del self.arbres[partition]
+
+    def meilleurs(self, n, partition=None):
+        arbre = self._arbre(partition)
+        if arbre is None:
+            return []
+        resultat = []
+        for position, (points, email) in enumerate(arbre.premiers(n)):
+            # Classement avec ex aequo: même rang pour les mêmes points
+            rang = resultat[-1]["rang"] if resultat and resultat[-1]["points"] == -points else position + 1
+            resultat.append({"rang": rang, "email": email, "points": -points})
+        return resultat
+
+    def rang(self, email, partition=None):
+        solde = self.soldes.get(email)
+        if solde is None or partition not in self._partitions(solde):
+            return None
+        arbre = self._arbre(partition)
+        # Le rang est 1 + le nombre d'utilisateurs ayant strictement plus de points
+        return arbre.compter_inferieurs((-solde["solde"],)) + 1, len(arbre)
+
+declare_derived_index(SOLDES_FILE, "classement", Classement)
+
+def _partition(universite=None, engin=None):
+    if universite is not None and engin is not None:
+        raise ValueError("Un classement est général, par université ou par engin, pas les deux à la fois.")
+    if universite is not None:
+        return ("universite", universite)
+    if engin is not None:
+        return ("engin", engin)
+    return None
+
+def get_classement(n=10, universite=None, engin=None):
+    """
+    Retourne les n utilisateurs ayant le plus de points: classement général,
+    ou limité à une université ou à un type d'engin.
+
+    Args:
+        n (int, optional): Le nombre d'utilisateurs retournés. Defaults to 10.
+        universite (str, optional): Ne classer que les utilisateurs de cette université. Defaults to None.
+        engin (str, optional): Ne classer que les automobilistes de cet engin (ex: "moto"). Defaults to None.
+
+    Returns:
+        list: Des dictionnaires {"rang", "email", "points"}, du premier au n-ième (ex aequo au même rang).
+    """
+    partition = _partition(universite, engin)
+    return query_derived_index(SOLDES_FILE, "classement", lambda classement: classement.meilleurs(n, partition))
+
+def get_rangs(email):
+    """
+    Retourne le rang d'un utilisateur dans le classement général, celui de son université
+    et celui de son type d'engin.
+
+    Args:
+        email (str): Email de l'utilisateur, tel qu'enregistré.
+
+    Returns:
+        dict: {"general", "universite", "engin"} -> (rang, nombre d'utilisateurs classés),
+        ou None pour un classement où l'utilisateur n'apparaît pas (aucun point encore attribué).
+    """
+    def requete(classement):
+        solde = classement.soldes.get(email, {})
+        rangs = {"general": classement.rang(email)}
+        for critere in CRITERES:
+            rangs[critere] = classement.rang(email, (critere, solde[critere])) if solde.get(critere) else None
+        return rangs
+    return query_derived_index(SOLDES_FILE, "classement", requete)
@@ -0,0 +1,96 @@
+from backend.distance import calculer_distance_km, distances_depuis_point, PointsPrepares
+from backend.routage import charger_reseau
+
+# Vitesse moyenne (km/h) utilisée pour estimer les durées quand le réseau routier local est absent
+VITESSE_MOYENNE_KMH = 30
+
+# Détour maximal par défaut (km) imposé à l'automobiliste pour prendre en charge un passager
+DETOUR_MAX_KM = 3.0
+
+def distances_automobiliste_universite(annonces, latitude_univ, longitude_univ):
+    """
+    Retourne la distance départ-université de chaque annonce: la valeur enregistrée à la publication,
+    ou, pour les annonces qui n'en ont pas, une valeur calculée (en un seul appel par lots).
+
+    Args:
+        annonces (list): Les objets Annonce (avec une position de départ).
+        latitude_univ (float): Latitude de l'université de destination.
+        longitude_univ (float): Longitude de l'université de destination.
+
+    Returns:
+        list: Les distances en kilomètres, dans l'ordre des annonces.
+    """
+    distances = [annonce.distance_universite_km for annonce in annonces]
+    manquantes = [i for i, distance in enumerate(distances) if distance is None]
+    if manquantes:
+        departs = PointsPrepares((annonces[i].position_depart["latitude"], annonces[i].position_depart["longitude"]) for i in manquantes)
+        for i, distance in zip(manquantes, distances_depuis_point(latitude_univ, longitude_univ, departs)):
+            distances[i] = distance
+    return distances
+
+def calculer_detours(lat, lon, annonces, latitude_univ, longitude_univ):
+    """
+    Calcule, pour chaque annonce, le détour imposé à l'automobiliste pour prendre en charge le passager:
+    (départ -> passager -> université) - (départ -> université), en kilomètres et en minutes.
+    Toutes les annonces sont évaluées ensemble: avec le réseau routier local, deux recherches
+    (vers le passager et vers l'université) suffisent quel que soit le nombre d'annonces;
+    sans réseau, les distances à vol d'oiseau sont calculées par lots.
+
+    Args:
+        lat (float): Latitude du passager.
+        lon (float): Longitude du passager.
+        annonces (list): Les objets Annonce (avec une position de départ), vers la même université.
+        latitude_univ (float): Latitude de l'université de destination.
+        longitude_univ (float): Longitude de l'université de destination.
+
+    Returns:
+        list: Pour chaque annonce, un dictionnaire {"detour_km", "detour_min"}, ou None si le passager
+        ne peut pas être rejoint par la route.
+    """
+    departs = [(annonce.position_depart["latitude"], annonce.position_depart["longitude"]) for annonce in annonces]
+    reseau = charger_reseau()
+    if reseau is not None:
+        vers_passager = reseau.couts_vers(lat, lon, departs)
+        *vers_univ, passager_univ = reseau.couts_vers(latitude_univ, longitude_univ, departs + [(lat, lon)])
+        if passager_univ is None:
+            return [None] * len(annonces)
+        detours = []
+        for trajet_passager, trajet_univ in zip(vers_passager, vers_univ):
+            if trajet_passager is None or trajet_univ is None:
+                detours.append(None)
+                continue
+            detours.append({
+                "detour_km": trajet_passager[0] + passager_univ[0] - trajet_univ[0],
+                "detour_min": trajet_passager[1] + passager_univ[1] - trajet_univ[1],
+            })
+        return detours
+
+    # Sans réseau routier: distances à vol d'oiseau (la distance départ-université est enregistrée à la publication)
+    prepares = PointsPrepares(departs)
+    vers_passager = distances_depuis_point(lat, lon, prepares)
+    vers_univ = distances_automobiliste_universite(annonces, latitude_univ, longitude_univ)
+    passager_univ = calculer_distance_km(lat, lon, latitude_univ, longitude_univ)
+    detours = []
+    for trajet_passager, trajet_univ in zip(vers_passager, vers_univ):
+        detour_km = trajet_passager + passager_univ - trajet_univ
+        detours.append({"detour_km": detour_km, "detour_min": detour_km / VITESSE_MOYENNE_KMH * 60})
+    return detours
+
+def filtrer_par_detour(annonces, detours, detour_max_km=None, detour_max_min=None):
+    """
+    Garde les annonces dont le détour respecte les limites données, triées par détour croissant.
+
+    Args:
+        annonces (list): Les objets Annonce.
+        detours (list): Les détours correspondants (résultat de calculer_detours).
+        detour_max_km (float, optional): Détour maximal en kilomètres. Defaults to None.
+        detour_max_min (float, optional): Détour maximal en minutes. Defaults to None.
+
+    Returns:
+        list: Des couples (objet Annonce, détour), du plus petit détour au plus grand.
+    """
+    retenues = [(annonce, detour) for annonce, detour in zip(annonces, detours)
+                if detour is not None
+                and (detour_max_km is None or detour["detour_km"] <= detour_max_km)
+                and (detour_max_min is None or detour["detour_min"] <= detour_max_min)]
+    return sorted(retenues, key=lambda retenue: retenue[1]["detour_km"])
@@ -1,5 +1,14 @@
+from functools import lru_cache
 from math import radians, sin, cos, sqrt, atan2
 
+try:
+    import numpy as np # Optionnel: calcul vectorisé des distances par lots
+except ImportError:
+    np = None
+
+# Rayon moyen de la Terre en kilomètres
+RAYON_TERRE_KM = 6371.0
+
 def calculer_distance_km(lat1, lon1, lat2, lon2):
     """
     Calcule la distance en kilomètres entre deux points géographiques
@@ -15,7 +24,7 @@ def calculer_distance_km(lat1, lon1, lat2, lon2):
         float: La distance entre les deux points en kilomètres.
     """
     # Rayon moyen de la Terre en kilomètres
-    R = 6371.0
+    R = RAYON_TERRE_KM
 
     # Conversion des coordonnées de degrés en radians
     lat1_rad, lon1_rad = radians(lat1), radians(lon1)
@@ -35,5 +44,93 @@ def calculer_distance_km(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
+@lru_cache(maxsize=4096)
+def preparer_point(lat, lon):
+    """
+    Précalcule les valeurs d'un point utilisées par la formule de Haversine.
+    Le résultat est mis en cache: un point fixe (une université, la position du passager)
+    n'est converti qu'une seule fois.
+
+    Args:
+        lat (float): Latitude en degrés.
+        lon (float): Longitude en degrés.
+
+    Returns:
+        tuple: (latitude en radians, longitude en radians, cosinus de la latitude).
+    """
+    lat_rad = radians(lat)
+    return lat_rad, radians(lon), cos(lat_rad)
+
+class PointsPrepares:
+    """
+    Un lot de points dont les radians et cosinus sont précalculés, réutilisable pour
+    plusieurs calculs de distances (ex: les départs de toutes les annonces vers une université).
+    Les valeurs sont stockées dans des tableaux NumPy si NumPy est disponible, dans des listes sinon.
+    """
+    def __init__(self, points):
+        """
+        Args:
+            points (iterable): Les points, sous forme de couples (latitude, longitude) en degrés.
+        """
+        prepares = [preparer_point(lat, lon) for lat, lon in points]
+        self.taille = len(prepares)
+        if np is not None:
+            valeurs = np.array(prepares, dtype=float).reshape(self.taille, 3)
+            self.lat_rad, self.lon_rad, self.cos_lat = valeurs[:, 0], valeurs[:, 1], valeurs[:, 2]
+        else:
+            self.lat_rad = [p[0] for p in prepares]
+            self.lon_rad = [p[1] for p in prepares]
+            self.cos_lat = [p[2] for p in prepares]
+
+    def __len__(self):
+        return self.taille
+
+def _preparer(points):
+    return points if isinstance(points, PointsPrepares) else PointsPrepares(points)
 
+def distances_depuis_point(lat, lon, points):
+    """
+    Calcule en un seul appel les distances entre un point et un lot de points.
+
+    Args:
+        lat (float): Latitude du point d'origine en degrés.
+        lon (float): Longitude du point d'origine en degrés.
+        points (iterable | PointsPrepares): Les points de destination, couples (latitude, longitude)
+            ou lot déjà préparé.
+
+    Returns:
+        list: Les distances en kilomètres, dans l'ordre des points.
+    """
+    points = _preparer(points)
+    lat_rad, lon_rad, cos_lat = preparer_point(lat, lon)
+    if np is not None:
+        a = np.sin((points.lat_rad - lat_rad) / 2)**2 + cos_lat * points.cos_lat * np.sin((points.lon_rad - lon_rad) / 2)**2
+        return (2 * RAYON_TERRE_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))).tolist()
+    return _distances_depuis_prepare(lat_rad, lon_rad, cos_lat, points)
+
+def matrice_distances(origines, destinations):
+    """
+    Calcule la matrice des distances entre chaque origine et chaque destination.
+
+    Args:
+        origines (iterable | PointsPrepares): Les N points d'origine (couples (latitude, longitude) ou lot préparé).
+        destinations (iterable | PointsPrepares): Les M points de destination.
+
+    Returns:
+        list: Une liste de N listes de M distances en kilomètres.
+    """
+    origines, destinations = _preparer(origines), _preparer(destinations)
+    if np is not None:
+        dlat = destinations.lat_rad[np.newaxis, :] - origines.lat_rad[:, np.newaxis]
+        dlon = destinations.lon_rad[np.newaxis, :] - origines.lon_rad[:, np.newaxis]
+        a = np.sin(dlat / 2)**2 + np.outer(origines.cos_lat, destinations.cos_lat) * np.sin(dlon / 2)**2
+        return (2 * RAYON_TERRE_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))).tolist()
+    return [_distances_depuis_prepare(lat_rad, lon_rad, cos_lat, destinations)
+            for lat_rad, lon_rad, cos_lat in zip(origines.lat_rad, origines.lon_rad, origines.cos_lat)]
 
+def _distances_depuis_prepare(lat_rad, lon_rad, cos_lat, points):
+    distances = []
+    for lat2_rad, lon2_rad, cos_lat2 in zip(points.lat_rad, points.lon_rad, points.cos_lat):
+        a = sin((lat2_rad - lat_rad) / 2)**2 + cos_lat * cos_lat2 * sin((lon2_rad - lon_rad) / 2)**2
+        distances.append(2 * RAYON_TERRE_KM * atan2(sqrt(a), sqrt(1 - a)))
+    return distances
@@ -0,0 +1,144 @@
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from backend.recherche import IndexTexte, normaliser_texte
+from backend.spatial import Grille
+from stockage import load_data
+
+# Répertoire des lieux (centres-villes, quartiers, secteurs, lieux connus, rues) de Koudougou et Ouagadougou
+LIEUX_FILE = "data/lieux.json"
+
+# Nombre de requêtes récentes gardées en cache par le géocodeur
+TAILLE_CACHE = 1024
+
+# Distance maximale (km) entre une position et le lieu retourné par le géocodage inverse
+RAYON_INVERSE_KM = 2.0
+
+# À score égal, ordre de préférence des types de lieux
+PRIORITE_TYPES = {"ville": 0, "quartier": 1, "secteur": 2, "lieu": 3, "rue": 4}
+
+# Lieu du répertoire: coordonnées (latitude, longitude) immuables
+Lieu = namedtuple("Lieu", ["nom", "type", "ville", "coordonnees", "alias"])
+
+class Geocodeur:
+    """
+    Géocodeur hors ligne sur un répertoire de lieux.
+    La recherche par texte passe par un index de mots (préfixes et trigrammes, tolérant les fautes de frappe)
+    et garde les requêtes récentes en cache; le géocodage inverse passe par une grille spatiale.
+    """
+    def __init__(self, lieux, taille_cache=TAILLE_CACHE):
+        """
+        Args:
+            lieux (list): Des dictionnaires {"nom", "type", "ville", "latitude", "longitude", "alias" (facultatif)}.
+            taille_cache (int, optional): Nombre de requêtes gardées en cache. Defaults to TAILLE_CACHE.
+        """
+        self.lieux = []
+        self.index = IndexTexte()
+        # Grille des lieux (couples (indice, Lieu)), partitionnée par type de lieu
+        self.grille = Grille(cle=lambda couple: couple[0], position=lambda couple: couple[1].coordonnees,
+                             partition=lambda couple: couple[1].type)
+        for i, lieu in enumerate(lieux):
+            entree = Lieu(lieu["nom"], lieu.get("type", "lieu"), lieu.get("ville", ""),
+                          (float(lieu["latitude"]), float(lieu["longitude"])), tuple(lieu.get("alias", ())))
+            self.lieux.append(entree)
+            self.index.add(i, (entree.nom, entree.ville) + entree.alias)
+            self.grille.add((i, entree))
+        self._rechercher = lru_cache(maxsize=taille_cache)(self._rechercher_normalise)
+
+    def __len__(self):
+        return len(self.lieux)
+
+    def _rechercher_normalise(self, texte, limit):
+        resultats = sorted(self.index.rechercher(texte, limit=None),
+                           key=lambda resultat: (-resultat[0], PRIORITE_TYPES.get(self.lieux[resultat[1]].type, len(PRIORITE_TYPES)),
+                                                 self.lieux[resultat[1]].nom))
+        return tuple((self.lieux[i], score) for score, i in resultats[:limit])
+
+    def geocoder(self, texte, limit=5):
+        """
+        Recherche les lieux correspondant à un texte libre (nom, alias, ville; préfixes et fautes de frappe tolérés).
+
+        Args:
+            texte (str): Le texte saisi (ex: "dapoya koudougou", "grand marche", "secteur 5").
+            limit (int, optional): Le nombre maximal de lieux. Defaults to 5.
+
+        Returns:
+            list: Des couples (Lieu, score entre 0 et 1), du plus pertinent au moins pertinent.
+        """
+        return list(self._rechercher(normaliser_texte(texte), limit))
+
+    def geocoder_inverse(self, lat, lon, rayon_km=RAYON_INVERSE_KM, types=None):
+        """
+        Recherche le lieu le plus proche d'une position.
+
+        Args:
+            lat (float): Latitude en degrés.
+            lon (float): Longitude en degrés.
+            rayon_km (float, optional): Distance maximale au lieu retourné. Defaults to RAYON_INVERSE_KM.
+            types (iterable, optional): Ne retenir que ces types de lieux (ex: ("quartier", "secteur")). Defaults to None.
+
+        Returns:
+            tuple: (Lieu, distance en km), ou None si aucun lieu n'est assez proche.
+        """
+        partitions = [None] if types is None else list(types)
+        candidats = [resultat for partition in partitions for resultat in self.grille.plus_proches(lat, lon, 1, partition)]
+        if not candidats:
+            return None
+        distance, i = min(candidats)
+        return (self.lieux[i], distance) if distance <= rayon_km else None
+
+    def cache_info(self):
+        """
+        Statistiques du cache des requêtes (succès, échecs, taille).
+        """
+        return self._rechercher.cache_info()
+
+_geocodeur = None
+_geocodeur_charge = False
+_verrou = threading.Lock()
+
+def charger_geocodeur(chemin=LIEUX_FILE):
+    """
+    Charge le géocodeur sur le répertoire des lieux (une seule fois par processus).
+
+    Args:
+        chemin (str, optional): Le chemin du répertoire des lieux. Defaults to LIEUX_FILE.
+
+    Returns:
+        Geocodeur: Le géocodeur, ou None si le répertoire est absent ou vide.
+    """
+    global _geocodeur, _geocodeur_charge
+    with _verrou:
+        if not _geocodeur_charge:
+            _geocodeur_charge = True
+            lieux = load_data(chemin, default_value=[], readonly=True)
+            _geocodeur = Geocodeur(lieux) if lieux else None
+        return _geocodeur
+
+def utiliser_geocodeur(geocodeur):
+    """
+    Remplace le géocodeur de l'application (ex: géocodeur de test).
+    """
+    global _geocodeur, _geocodeur_charge
+    with _verrou:
+        _geocodeur, _geocodeur_charge = geocodeur, True
+
+def geocoder(texte, limit=5):
+    """
+    Recherche les lieux correspondant à un texte libre avec le géocodeur de l'application.
+
+    Returns:
+        list: Des couples (Lieu, score), ou une liste vide si le répertoire des lieux est absent.
+    """
+    geocodeur = charger_geocodeur()
+    return geocodeur.geocoder(texte, limit) if geocodeur is not None else []
+
+def geocoder_inverse(lat, lon, rayon_km=RAYON_INVERSE_KM, types=None):
+    """
+    Recherche le lieu le plus proche d'une position avec le géocodeur de l'application.
+
+    Returns:
+        tuple: (Lieu, distance en km), ou None si aucun lieu n'est assez proche ou si le répertoire est absent.
+    """
+    geocodeur = charger_geocodeur()
+    return geocodeur.geocoder_inverse(lat, lon, rayon_km, types) if geocodeur is not None else None
@@ -1,55 +1,380 @@
-import requests
+import json
+import threading
+import time
+import urllib.request
+from backend.geocodage import geocoder, geocoder_inverse
+from backend.recherche import mots
+from backend.universites import MOTS_VIDES
+
+try:
+    import requests # Optionnel: requêtes HTTP de la source de position en ligne
+except ImportError:
+    requests = None
+
+# Fichier de position local (phrases NMEA d'un récepteur GPS, ou "latitude,longitude")
+POSITION_FILE = "data/position.nmea"
+
+# Durée de validité (secondes) d'une position en cache
+TTL_POSITION = 120
+
+# Intervalle (secondes) entre deux lectures de la source par le rafraîchissement en arrière-plan
+INTERVALLE_RAFRAICHISSEMENT = 30
+
+# Score minimal du lieu trouvé pour qu'une adresse saisie soit acceptée (voir get_coordinates_from_address)
+SCORE_MIN_ADRESSE = 0.5
+
+# Longueur minimale d'un mot de l'adresse pour qu'il soit accepté comme début d'un mot du lieu
+LONGUEUR_MIN_PREFIXE = 3
+
+# --- Sources de position ---
+
+class SourceFixe:
+    """
+    Source retournant toujours la même position (démonstration, tests, poste fixe).
+    """
+    def __init__(self, latitude, longitude):
+        self.position = (latitude, longitude)
+
+    def lire(self):
+        return self.position
+
+def _degres_nmea(valeur, hemisphere):
+    """
+    Convertit une coordonnée NMEA (ddmm.mmmm ou dddmm.mmmm) en degrés décimaux.
+    """
+    point = valeur.index(".")
+    degres = int(valeur[:point - 2]) + float(valeur[point - 2:]) / 60
+    return -degres if hemisphere in ("S", "W") else degres
+
+def lire_phrase_nmea(phrase):
+    """
+    Extrait la position d'une phrase NMEA GGA ou RMC (somme de contrôle vérifiée si présente).
+
+    Args:
+        phrase (str): La phrase, ex: "$GPGGA,123519,1215.156,N,00221.762,W,1,08,0.9,300.0,M,,,,*0B".
+
+    Returns:
+        tuple: (latitude, longitude), ou None si la phrase n'est pas une position valide.
+    """
+    phrase = phrase.strip()
+    if not phrase.startswith("$"):
+        return None
+    corps, _, controle = phrase[1:].partition("*")
+    if controle:
+        somme = 0
+        for caractere in corps:
+            somme ^= ord(caractere)
+        if controle[:2].upper() != f"{somme:02X}":
+            return None
+    champs = corps.split(",")
+    try:
+        if champs[0].endswith("GGA") and champs[6] not in ("", "0"):
+            return _degres_nmea(champs[2], champs[3]), _degres_nmea(champs[4], champs[5])
+        if champs[0].endswith("RMC") and champs[2] == "A":
+            return _degres_nmea(champs[3], champs[4]), _degres_nmea(champs[5], champs[6])
+    except (IndexError, ValueError):
+        return None
+    return None
+
+class SourceFichier:
+    """
+    Source lisant un fichier local tenu à jour par un récepteur GPS (ou son simulateur):
+    phrases NMEA (GGA, RMC) ou lignes "latitude,longitude". La dernière position valide est retenue.
+    """
+    def __init__(self, chemin=POSITION_FILE):
+        self.chemin = chemin
+
+    def lire(self):
+        try:
+            with open(self.chemin, encoding="ascii", errors="ignore") as f:
+                lignes = f.read().splitlines()
+        except OSError:
+            return None
+        for ligne in reversed(lignes):
+            if ligne.startswith("$"):
+                position = lire_phrase_nmea(ligne)
+            else:
+                try:
+                    latitude, longitude = (float(valeur) for valeur in ligne.split(","))
+                    position = (latitude, longitude)
+                except ValueError:
+                    position = None
+            if position is not None:
+                return position
+        return None
+
+class SourceHTTP:
+    """
+    Source interrogeant un service de géolocalisation HTTP qui répond en JSON
+    ({"lat", "lon"} comme ip-api.com, ou {"latitude", "longitude"}).
+    """
+    def __init__(self, url="http://ip-api.com/json", timeout=3.0):
+        self.url = url
+        self.timeout = timeout
+
+    def lire(self):
+        try:
+            if requests is not None:
+                data = requests.get(self.url, timeout=self.timeout).json()
+            else:
+                with urllib.request.urlopen(self.url, timeout=self.timeout) as reponse:
+                    data = json.loads(reponse.read().decode("utf-8"))
+        except Exception:
+            # Service injoignable ou réponse invalide: pas de position
+            return None
+        if not isinstance(data, dict) or data.get("status", "success") != "success":
+            return None
+        latitude, longitude = data.get("lat", data.get("latitude")), data.get("lon", data.get("longitude"))
+        if latitude is None or longitude is None:
+            return None
+        return float(latitude), float(longitude)
+
+class SourceChainee:
+    """
+    Source interrogeant plusieurs sources dans l'ordre et retournant la première position obtenue.
+    """
+    def __init__(self, *sources):
+        self.sources = sources
+
+    def lire(self):
+        for source in self.sources:
+            position = source.lire()
+            if position is not None:
+                return position
+        return None
+
+# --- Fournisseur de position ---
+
+class FournisseurPosition:
+    """
+    Fournit la dernière position connue sans jamais bloquer l'appelant.
+    La position lue sur la source est gardée en cache pendant `ttl` secondes; la source est relue
+    en arrière-plan (périodiquement une fois démarré, ou dès qu'une position périmée est demandée),
+    et les abonnés sont prévenus à chaque nouvelle position.
+    """
+    def __init__(self, source, ttl=TTL_POSITION, intervalle=INTERVALLE_RAFRAICHISSEMENT):
+        """
+        Args:
+            source: La source de position (objet ayant une méthode lire() -> (latitude, longitude) ou None).
+            ttl (float, optional): Durée de validité d'une position en secondes. Defaults to TTL_POSITION.
+            intervalle (float, optional): Intervalle du rafraîchissement périodique en secondes. Defaults to INTERVALLE_RAFRAICHISSEMENT.
+        """
+        self.source = source
+        self.ttl = ttl
+        self.intervalle = intervalle
+        self._position = None
+        self._horodatage = None
+        self._abonnes = []
+        self._verrou = threading.Lock()
+        self._lecture_en_cours = False
+        self._arret = threading.Event()
+        self._thread = None
+
+    def position(self):
+        """
+        Retourne immédiatement la dernière position connue si elle a moins de `ttl` secondes.
+        Si elle est absente ou périmée, une lecture de la source est lancée en arrière-plan.
+
+        Returns:
+            tuple: (latitude, longitude), ou None si aucune position valide n'est encore connue.
+        """
+        with self._verrou:
+            position, horodatage = self._position, self._horodatage
+        if horodatage is not None and time.monotonic() - horodatage <= self.ttl:
+            return position
+        self._lire_en_arriere_plan()
+        return None
+
+    def derniere_position(self):
+        """
+        Retourne la dernière position connue, même périmée, avec son âge en secondes.
+
+        Returns:
+            tuple: ((latitude, longitude), âge), ou None si aucune position n'a encore été lue.
+        """
+        with self._verrou:
+            if self._horodatage is None:
+                return None
+            return self._position, time.monotonic() - self._horodatage
+
+    def rafraichir(self):
+        """
+        Lit la source (appel bloquant), met à jour le cache et prévient les abonnés si la position a changé.
+
+        Returns:
+            tuple: La position lue, ou None si la source n'en a pas fourni.
+        """
+        position = self.source.lire()
+        if position is None:
+            return None
+        position = tuple(position)
+        with self._verrou:
+            nouvelle = position != self._position
+            self._position, self._horodatage = position, time.monotonic()
+            abonnes = list(self._abonnes)
+        if nouvelle:
+            for rappel in abonnes:
+                rappel(position)
+        return position
+
+    def _lire_en_arriere_plan(self):
+        with self._verrou:
+            if self._lecture_en_cours:
+                return
+            self._lecture_en_cours = True
+
+        def lire():
+            try:
+                self.rafraichir()
+            finally:
+                with self._verrou:
+                    self._lecture_en_cours = False
+
+        threading.Thread(target=lire, daemon=True).start()
+
+    def abonner(self, rappel):
+        """
+        Enregistre une fonction appelée (depuis le fil de rafraîchissement) avec chaque nouvelle position.
+        """
+        with self._verrou:
+            self._abonnes.append(rappel)
+
+    def desabonner(self, rappel):
+        """
+        Retire une fonction enregistrée par abonner (sans effet si elle ne l'est pas).
+        """
+        with self._verrou:
+            if rappel in self._abonnes:
+                self._abonnes.remove(rappel)
+
+    def demarrer(self):
+        """
+        Démarre le rafraîchissement périodique en arrière-plan (sans effet s'il est déjà démarré).
+        """
+        with self._verrou:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._arret.clear()
+            self._thread = threading.Thread(target=self._boucle, daemon=True)
+            self._thread.start()
+
+    def arreter(self):
+        """
+        Arrête le rafraîchissement périodique.
+        """
+        self._arret.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            try:
+                self.rafraichir()
+            except Exception:
+                pass # Une source défaillante ne doit pas arrêter le rafraîchissement
+            self._arret.wait(self.intervalle)
+
+_fournisseur = None
+_verrou_fournisseur = threading.Lock()
+
+def get_fournisseur():
+    """
+    Retourne le fournisseur de position de l'application, créé au premier appel sur le fichier
+    de position local (POSITION_FILE), et démarre son rafraîchissement en arrière-plan.
+    """
+    global _fournisseur
+    with _verrou_fournisseur:
+        if _fournisseur is None:
+            _fournisseur = FournisseurPosition(SourceFichier(POSITION_FILE))
+        fournisseur = _fournisseur
+    fournisseur.demarrer()
+    return fournisseur
+
+def utiliser_source(source, ttl=TTL_POSITION, intervalle=INTERVALLE_RAFRAICHISSEMENT):
+    """
+    Remplace la source de position de l'application (ex: SourceChainee(SourceFichier(), SourceHTTP())).
+    Les abonnés du fournisseur précédent sont repris par le nouveau.
+
+    Returns:
+        FournisseurPosition: Le nouveau fournisseur (non démarré).
+    """
+    global _fournisseur
+    nouveau = FournisseurPosition(source, ttl, intervalle)
+    with _verrou_fournisseur:
+        ancien, _fournisseur = _fournisseur, nouveau
+    if ancien is not None:
+        ancien.arreter()
+        for rappel in list(ancien._abonnes):
+            nouveau.abonner(rappel)
+    return nouveau
 
 def get_current_location():
     """
     Récupère la position géographique actuelle de l'utilisateur (latitude et longitude).
-    Cette implémentation est un placeholder et devrait être remplacée par une méthode
-    plus robuste pour obtenir la localisation réelle (ex: API de géolocalisation du navigateur,
-    GPS du téléphone, ou une API tierce comme Google Geolocation API).
+    L'appel ne bloque jamais: il retourne la dernière position connue du fournisseur de position,
+    qui lit sa source en arrière-plan. Pour être prévenu d'une position plus récente, utiliser suivre_position.
 
     Returns:
-        tuple: Un tuple (latitude, longitude) si la localisation est trouvée, sinon None.
-    """
-    # Placeholder: Pour le développement, on peut retourner des coordonnées fixes.
-    # Dans une application réelle, cela nécessiterait une intégration avec un service de géolocalisation.
-    # Exemple avec une API de géolocalisation publique (peut nécessiter une clé API et être soumise à des limites):
-    # try:
-    #     response = requests.get("http://ip-api.com/json")
-    #     data = response.json()
-    #     if data["status"] == "success":
-    #         return data["lat"], data["lon"]
-    # except Exception as e:
-    #     print(f"Erreur lors de la récupération de la localisation: {e}")
-    return None # Retourne None si la localisation ne peut pas être obtenue
+        tuple: Un tuple (latitude, longitude) si la localisation est connue, sinon None.
+    """
+    return get_fournisseur().position()
+
+def suivre_position(rappel):
+    """
+    Abonne une fonction aux nouvelles positions du fournisseur de l'application.
+    La fonction est appelée depuis un fil d'arrière-plan avec (latitude, longitude).
+    """
+    get_fournisseur().abonner(rappel)
+
+def ne_plus_suivre_position(rappel):
+    """
+    Désabonne une fonction enregistrée par suivre_position.
+    """
+    get_fournisseur().desabonner(rappel)
 
 def get_coordinates_from_address(address):
     """
     Convertit une adresse textuelle en coordonnées géographiques (latitude et longitude).
-    Cette fonction est un placeholder et doit être remplacée par une intégration avec
-    un service de géocodage (ex: Google Geocoding API, OpenStreetMap Nominatim).
+    Le géocodage est fait hors ligne, sur le répertoire local des lieux (quartiers, secteurs,
+    lieux connus et rues de Koudougou et Ouagadougou).
+
+    Les mots vides ("de", "la"...) sont ignorés, et le meilleur lieu n'est retenu que s'il atteint
+    SCORE_MIN_ADRESSE et qu'un mot de l'adresse est l'un de ses mots, ou le début de l'un d'eux
+    (au moins LONGUEUR_MIN_PREFIXE lettres): une adresse inconnue ne renvoie pas vers un lieu quelconque.
 
     Args:
-        address (str): L'adresse à géocoder.
+        address (str): L'adresse à géocoder (ex: "Dapoya, Koudougou", "grand marché").
 
     Returns:
         tuple: Un tuple (latitude, longitude) si l'adresse est trouvée, sinon None.
     """
-    # Placeholder: Dans une application réelle, cela nécessiterait une intégration avec un service de géocodage.
-    # Exemple avec une API de géocodage (nécessite une clé API et peut être soumise à des limites):
-    # base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-    # params = {
-    #     "address": address,
-    #     "key": "VOTRE_CLE_API_GOOGLE"
-    # }
-    # try:
-    #     response = requests.get(base_url, params=params)
-    #     data = response.json()
-    #     if data["status"] == "OK" and data["results"]:
-    #         location = data["results"][0]["geometry"]["location"]
-    #         return location["lat"], location["lng"]
-    # except Exception as e:
-    #     print(f"Erreur lors du géocodage de l'adresse: {e}")
-    return None # Retourne None si l'adresse ne peut pas être géocodée
+    mots_adresse = [mot for mot in mots(address) if mot not in MOTS_VIDES]
+    if not mots_adresse:
+        return None
+    resultats = geocoder(" ".join(mots_adresse), limit=1)
+    if not resultats or resultats[0][1] < SCORE_MIN_ADRESSE:
+        return None
+    lieu = resultats[0][0]
+    mots_lieu = {mot for texte in (lieu.nom, lieu.ville) + lieu.alias for mot in mots(texte)}
+    if not any(mot in mots_lieu or (len(mot) >= LONGUEUR_MIN_PREFIXE and any(m.startswith(mot) for m in mots_lieu))
+               for mot in mots_adresse):
+        return None
+    return lieu.coordonnees
 
+def get_address_from_coordinates(latitude, longitude):
+    """
+    Retrouve le nom du lieu le plus proche d'une position (géocodage inverse hors ligne).
 
+    Args:
+        latitude (float): Latitude en degrés.
+        longitude (float): Longitude en degrés.
 
+    Returns:
+        str: Le nom du lieu et sa ville (ex: "Dapoya, Koudougou"), ou None si aucun lieu n'est assez proche.
+    """
+    resultat = geocoder_inverse(latitude, longitude)
+    if resultat is None:
+        return None
+    lieu, _ = resultat
+    return f"{lieu.nom}, {lieu.ville}" if lieu.ville else lieu.nom
@@ -0,0 +1,86 @@
+import heapq
+from datetime import datetime
+from backend.distance import calculer_distance_km, distances_depuis_point, PointsPrepares
+from backend.detour import calculer_detours, filtrer_par_detour, distances_automobiliste_universite, DETOUR_MAX_KM
+from backend.spatial import annonces_dans_rayon
+from backend.trajets import get_annonces_disponibles
+from backend.universites import get_coordonnees_universite
+
+# Critères de classement des trajets proposés: clé de tri (plus petite = meilleure)
+CRITERES_TRI = {
+    "distance": lambda candidat: (candidat["distance_passager_automobiliste"], candidat["annonce"].depart_prevu or ""),
+    "detour": lambda candidat: (candidat["detour_km"], candidat["distance_passager_automobiliste"]),
+    "depart": lambda candidat: (candidat["annonce"].depart_prevu or "", candidat["distance_passager_automobiliste"]),
+    "places": lambda candidat: (-candidat["annonce"].places_disponibles, candidat["distance_passager_automobiliste"]),
+}
+
+def rechercher_trajets(lat, lon, universite, limit=20, sort_by="distance", rayon_km=None,
+                       detour_max_km=DETOUR_MAX_KM, detour_max_min=None):
+    """
+    Recherche les trajets qu'un passager peut réserver vers une université, classés et notés.
+    Une annonce est éligible si elle est en attente, a encore des places, part dans le futur et
+    si le détour imposé à l'automobiliste pour prendre le passager (départ -> passager -> université,
+    moins départ -> université) reste dans les limites données.
+    Les candidates sont fournies par les index (départs à venir, ou index spatial si un rayon est donné),
+    leurs distances et détours sont calculés par lots et seules les `limit` meilleures sont retenues (tas).
+
+    Args:
+        lat (float): Latitude du passager.
+        lon (float): Longitude du passager.
+        universite (str): Le nom de l'université de destination.
+        limit (int, optional): Le nombre maximal de trajets retournés. Defaults to 20.
+        sort_by (str, optional): Le critère de classement: "distance" (distance à l'automobiliste),
+            "detour" (plus petit détour), "depart" (départ le plus proche) ou "places" (le plus de places).
+            Defaults to "distance".
+        rayon_km (float, optional): Si fourni, ne retient que les départs à moins de rayon_km du passager.
+        detour_max_km (float, optional): Détour maximal en kilomètres (None: pas de limite). Defaults to DETOUR_MAX_KM.
+        detour_max_min (float, optional): Détour maximal en minutes (None: pas de limite). Defaults to None.
+
+    Returns:
+        list: Des dictionnaires {"annonce", "score", "detour_km", "detour_min", "distance_passager_automobiliste",
+        "distance_automobiliste_universite", "distance_passager_universite"}, du meilleur au moins bon.
+    """
+    if sort_by not in CRITERES_TRI:
+        raise ValueError(f"Critère de tri inconnu: {sort_by}")
+    coords_univ = get_coordonnees_universite(universite)
+    if coords_univ is None:
+        return []
+    latitude_univ, longitude_univ = coords_univ
+
+    if rayon_km is not None:
+        maintenant = datetime.now().isoformat(timespec="seconds")
+        annonces = [annonce for annonce, _ in annonces_dans_rayon(lat, lon, rayon_km, universite)
+                    if annonce.depart_prevu and annonce.depart_prevu >= maintenant]
+    else:
+        annonces = get_annonces_disponibles(universite=universite)
+    annonces = [annonce for annonce in annonces if annonce.position_depart]
+
+    # Détours évalués pour toutes les annonces à la fois, puis filtrés par les limites demandées
+    detours = calculer_detours(lat, lon, annonces, latitude_univ, longitude_univ)
+    retenues = filtrer_par_detour(annonces, detours, detour_max_km, detour_max_min)
+    annonces = [annonce for annonce, _ in retenues]
+
+    # La distance passager-université est la même pour toutes les annonces
+    distance_passager_univ = calculer_distance_km(lat, lon, latitude_univ, longitude_univ)
+    departs = PointsPrepares((annonce.position_depart["latitude"], annonce.position_depart["longitude"]) for annonce in annonces)
+    # La distance départ-université est enregistrée sur l'annonce à la publication
+    distances_automobiliste_univ = distances_automobiliste_universite(annonces, latitude_univ, longitude_univ)
+    distances_passager_automobiliste = distances_depuis_point(lat, lon, departs)
+
+    candidats = (
+        {
+            "annonce": annonce,
+            "detour_km": detour["detour_km"],
+            "detour_min": detour["detour_min"],
+            "distance_passager_automobiliste": distance_passager_auto,
+            "distance_automobiliste_universite": distance_auto_univ,
+            "distance_passager_universite": distance_passager_univ,
+        }
+        for (annonce, detour), distance_auto_univ, distance_passager_auto
+        in zip(retenues, distances_automobiliste_univ, distances_passager_automobiliste)
+    )
+    cle = CRITERES_TRI[sort_by]
+    meilleurs = heapq.nsmallest(limit, candidats, key=cle)
+    for candidat in meilleurs:
+        candidat["score"] = cle(candidat)[0]
+    return meilleurs
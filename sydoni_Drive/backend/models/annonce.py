@@ -1,7 +1,11 @@
 import json
+import random
+import threading
+import time
 import uuid
-from datetime import datetime # Importation de datetime
-from stockage import load_annonces, save_annonces # Importation des fonctions génériques de stockage
+import weakref
+from datetime import datetime, timedelta # Importation de datetime
+from stockage import ANNONCES_FILE, load_annonces, save_annonces, delete_record, find_records, range_records, declare_index, declare_sorted_index, acces, Transaction, ConflitEcriture # Importation des fonctions génériques de stockage
 
 class Annonce:
     """
@@ -9,7 +13,8 @@ class Annonce:
     Cette classe modélise les données d'une offre de trajet.
     """
     def __init__(self, id_automobiliste, universite_destination, heure_depart, places_offertes, engin, 
-                 id_annonce=None, statut='active', passagers_reserves=None, position_depart=None, date_publication=None, has_reservations=False):
+                 id_annonce=None, statut='active', passagers_reserves=None, position_depart=None, date_publication=None, has_reservations=False, depart_prevu=None,
+                 position_destination=None, distance_universite_km=None, version=0):
         """
         Initialise une nouvelle instance d'Annonce.
 
@@ -25,6 +30,11 @@ class Annonce:
             position_depart (dict, optional): Dictionnaire contenant la latitude et longitude du point de départ de l'automobiliste. Defaults to None.
             date_publication (str, optional): La date et l'heure de publication de l'annonce au format ISO. Defaults to None.
             has_reservations (bool, optional): Indique si l'annonce a eu au moins une réservation. Defaults to False.
+            depart_prevu (str, optional): La date et l'heure complètes du départ au format ISO.
+                Calculée à partir de heure_depart et de la date de publication si None. Defaults to None.
+            position_destination (dict, optional): Dictionnaire contenant la latitude et longitude de l'université de destination. Defaults to None.
+            distance_universite_km (float, optional): Distance entre le point de départ et l'université, calculée à la publication. Defaults to None.
+            version (int, optional): Numéro de version, incrémenté à chaque mise à jour (voir reserver_place). Defaults to 0.
         """
         self.id_annonce = id_annonce if id_annonce else str(uuid.uuid4()) # Générer un ID unique si non fourni
         self.id_automobiliste = id_automobiliste
@@ -39,6 +49,12 @@ class Annonce:
         # Enregistrer la date et l'heure de publication au format ISO pour faciliter la comparaison
         self.date_publication = date_publication if date_publication else datetime.now().isoformat()
         self.has_reservations = has_reservations # Ajout du flag pour les réservations
+        # Départ complet (date et heure), calculé une seule fois: c'est la clé de l'index trié des départs
+        self.depart_prevu = depart_prevu if depart_prevu else calculer_depart_prevu(heure_depart, self.date_publication)
+        # Le départ et la destination ne changent plus après la publication: la distance n'est calculée qu'une fois
+        self.position_destination = position_destination
+        self.distance_universite_km = distance_universite_km
+        self.version = version
 
     def to_dict(self):
         """
@@ -56,7 +72,11 @@ class Annonce:
             "passagers_reserves": self.passagers_reserves,
             "position_depart": self.position_depart,
             "date_publication": self.date_publication,
-            "has_reservations": self.has_reservations # Ajout de la date de publication
+            "has_reservations": self.has_reservations, # Ajout de la date de publication
+            "depart_prevu": self.depart_prevu,
+            "position_destination": self.position_destination,
+            "distance_universite_km": self.distance_universite_km,
+            "version": self.version
         }
 
     @classmethod
@@ -75,12 +95,48 @@ class Annonce:
             data.get("passagers_reserves"),
             data.get("position_depart"),
             data.get("date_publication"),
-            data.get("has_reservations", False) # Charger le flag has_reservations
+            data.get("has_reservations", False), # Charger le flag has_reservations
+            data.get("depart_prevu"),
+            data.get("position_destination"),
+            data.get("distance_universite_km"),
+            data.get("version", 0)
         )
         # Assurer que places_disponibles est correctement chargé ou réinitialisé
         annonce.places_disponibles = data.get("places_disponibles", data["places_offertes"])
         return annonce
 
+def calculer_depart_prevu(heure_depart, date_publication):
+    """
+    Calcule la date et l'heure complètes du départ à partir de l'heure "HH:MM" et de la publication:
+    le jour de la publication, ou le lendemain si l'heure est déjà passée à la publication
+    (ex: publiée à 23:30 pour "06:30", l'annonce part le lendemain à 06:30).
+
+    Args:
+        heure_depart (str): L'heure de départ au format "HH:MM".
+        date_publication (str): La date et l'heure de publication au format ISO.
+
+    Returns:
+        str: Le départ au format ISO (à la seconde), ou None si l'heure n'est pas au bon format.
+    """
+    try:
+        publication = datetime.fromisoformat(date_publication)
+        heure = datetime.strptime(heure_depart, "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+    depart = datetime.combine(publication.date(), heure)
+    if depart < publication.replace(second=0, microsecond=0):
+        depart += timedelta(days=1)
+    return depart.isoformat(timespec="seconds")
+
+# Index secondaires maintenus par le stockage: une recherche n'examine que les annonces candidates
+declare_index(ANNONCES_FILE, "statut")
+declare_index(ANNONCES_FILE, "statut", "universite_destination")
+declare_index(ANNONCES_FILE, "id_automobiliste")
+declare_index(ANNONCES_FILE, "depart_prevu") # Retrouve sans parcours les annonces à compléter (depart_prevu absent)
+# Index triés sur le départ: les recherches par plage horaire se font par dichotomie
+declare_sorted_index(ANNONCES_FILE, "depart_prevu", partition=("statut",))
+declare_sorted_index(ANNONCES_FILE, "depart_prevu", partition=("statut", "universite_destination"))
+
 # --- Fonctions de gestion des annonces (CRUD) ---
 
 def get_all_annonces():
@@ -98,53 +154,224 @@ def save_all_annonces(annonces):
     annonces_data = [annonce.to_dict() for annonce in annonces]
     save_annonces(annonces_data)
 
-def add_annonce(annonce: Annonce):
+def add_annonce(annonce: Annonce, transaction=None):
     """
     Ajoute une nouvelle annonce au système.
+    Seul l'enregistrement de l'annonce est ajouté au journal, le fichier n'est pas réécrit.
     """
-    annonces = get_all_annonces()
-    annonces.append(annonce)
-    save_all_annonces(annonces)
+    acces(transaction).upsert_record(ANNONCES_FILE, annonce.to_dict(), key="id_annonce")
 
-def get_annonce_by_id(annonce_id: str):
+def get_annonce_by_id(annonce_id: str, transaction=None):
     """
     Récupère une annonce par son identifiant unique.
     """
-    annonces = get_all_annonces()
-    for annonce in annonces:
-        if annonce.id_annonce == annonce_id:
-            return annonce
-    return None
+    data = acces(transaction).get_record(ANNONCES_FILE, annonce_id, key="id_annonce")
+    return Annonce.from_dict(data) if data else None
+
+def update_annonce(updated_annonce: Annonce, transaction=None):
+    """
+    Met à jour une annonce existante. Son numéro de version est incrémenté.
+    Dans une transaction, l'écriture est conditionnée au numéro de version de l'annonce telle qu'elle a été lue
+    (compare-and-swap): si elle a été modifiée entre-temps, la validation lève ConflitEcriture.
+    """
+    if get_annonce_by_id(updated_annonce.id_annonce, transaction) is None:
+        return False
+    if transaction is not None:
+        transaction.verifier(ANNONCES_FILE, updated_annonce.id_annonce, "id_annonce", "version", updated_annonce.version, defaut=0)
+    updated_annonce.version += 1
+    acces(transaction).upsert_record(ANNONCES_FILE, updated_annonce.to_dict(), key="id_annonce")
+    return True
+
+# Nombre maximal d'essais d'une réservation de place en cas d'écritures concurrentes (autres processus)
+TENTATIVES_RESERVATION = 50
+
+# Verrou par annonce: les réservations d'une même annonce sont faites une à une dans ce processus
+_verrous_annonces = weakref.WeakValueDictionary()
+_verrou_verrous = threading.Lock()
+
+def _verrou_annonce(annonce_id):
+    with _verrou_verrous:
+        verrou = _verrous_annonces.get(annonce_id)
+        if verrou is None:
+            verrou = _verrous_annonces[annonce_id] = threading.Lock()
+        return verrou
+
+def reserver_place(annonce_id, email_passager, ecritures=None):
+    """
+    Réserve une place sur une annonce sans jamais dépasser le nombre de places offertes,
+    même avec des réservations simultanées (threads ou processus partageant le répertoire de données).
+
+    Dans ce processus, les réservations d'une même annonce passent une à une (verrou par annonce).
+    Entre processus, l'écriture est conditionnée au numéro de version lu (compare-and-swap):
+    si l'annonce a été modifiée entre-temps, la réservation est recommencée sur l'annonce relue.
+
+    Args:
+        annonce_id (str): L'ID de l'annonce.
+        email_passager (str): L'email du passager.
+        ecritures (callable, optional): Fonction (transaction, annonce) appelée après la mise à jour de
+            l'annonce pour ajouter d'autres écritures (réservation, historiques), validées avec elle
+            en une seule fois. Defaults to None.
+
+    Returns:
+        tuple: (bool, str, Annonce) - True si la place est réservée, avec un message et l'annonce
+        mise à jour (None si l'annonce est introuvable).
+    """
+    with _verrou_annonce(annonce_id):
+        for essai in range(TENTATIVES_RESERVATION):
+            tx = Transaction()
+            annonce = get_annonce_by_id(annonce_id, tx)
+            if not annonce:
+                return False, "Annonce non trouvée.", None
+            if annonce.places_disponibles <= 0:
+                return False, "Plus de places disponibles sur cette annonce.", annonce
+            if email_passager in annonce.passagers_reserves:
+                return False, "Vous avez déjà réservé ce trajet.", annonce
 
-def update_annonce(updated_annonce: Annonce):
+            annonce.places_disponibles -= 1
+            annonce.passagers_reserves.append(email_passager)
+            annonce.has_reservations = True # Marquer l'annonce comme ayant eu au moins une réservation
+            update_annonce(annonce, tx) # Conditionnée au numéro de version lu
+            if ecritures is not None:
+                ecritures(tx, annonce)
+            try:
+                tx.commit()
+                return True, "Réservation effectuée avec succès.", annonce
+            except ConflitEcriture:
+                # Un autre processus a modifié l'annonce: attendre un peu, puis la relire
+                time.sleep(random.uniform(0, 0.002 * (essai + 1)))
+        return False, "L'annonce est très demandée, veuillez réessayer.", annonce
+
+def modifier_annonce(annonce_id, modification):
     """
-    Met à jour une annonce existante.
+    Modifie une annonce avec les mêmes garanties que reserver_place: les modifications d'une même annonce
+    passent une à une dans ce processus, et l'écriture est conditionnée au numéro de version lu (voir
+    update_annonce): si l'annonce a été modifiée entre-temps, la modification est recommencée sur l'annonce relue.
+
+    Args:
+        annonce_id (str): L'ID de l'annonce.
+        modification (callable): Fonction (transaction, annonce) qui modifie l'annonce, l'écrit avec update_annonce
+            et ajoute les autres écritures. Si elle retourne une valeur fausse, rien n'est écrit.
+
+    Returns:
+        Le résultat de la modification, ou None si l'annonce est introuvable.
+
+    Raises:
+        ConflitEcriture: Si l'annonce est encore modifiée ailleurs après TENTATIVES_RESERVATION essais.
     """
-    annonces = get_all_annonces()
-    for i, annonce in enumerate(annonces):
-        if annonce.id_annonce == updated_annonce.id_annonce:
-            annonces[i] = updated_annonce
-            save_all_annonces(annonces)
-            return True
-    return False
+    with _verrou_annonce(annonce_id):
+        for essai in range(TENTATIVES_RESERVATION):
+            tx = Transaction()
+            annonce = get_annonce_by_id(annonce_id, tx)
+            if not annonce:
+                return None
+            resultat = modification(tx, annonce)
+            if not resultat:
+                return resultat
+            try:
+                tx.commit()
+                return resultat
+            except ConflitEcriture:
+                if essai == TENTATIVES_RESERVATION - 1:
+                    raise
+                time.sleep(random.uniform(0, 0.002 * (essai + 1)))
 
 def delete_annonce(annonce_id: str):
     """
     Supprime une annonce par son identifiant unique.
     """
-    annonces = get_all_annonces()
-    initial_len = len(annonces)
-    annonces = [annonce for annonce in annonces if annonce.id_annonce != annonce_id]
-    if len(annonces) < initial_len:
-        save_all_annonces(annonces)
-        return True
-    return False
+    if get_annonce_by_id(annonce_id) is None:
+        return False
+    delete_record(ANNONCES_FILE, annonce_id, key="id_annonce")
+    return True
+
+def get_annonces_by_statut(statut):
+    """
+    Récupère toutes les annonces ayant le statut donné.
+    """
+    return find_annonces(statut=statut)
+
+def find_annonces(statut=None, universite=None, automobiliste=None):
+    """
+    Recherche les annonces par statut, université de destination et/ou automobiliste.
+    Les critères fournis sont résolus par les index secondaires (intersectés entre eux),
+    sans parcourir toutes les annonces.
+
+    Args:
+        statut (str, optional): Le statut recherché (ex: 'en_attente').
+        universite (str, optional): Le nom exact de l'université de destination.
+        automobiliste (str, optional): L'identifiant (email) de l'automobiliste.
+
+    Returns:
+        list: Une liste d'objets Annonce, dans l'ordre de publication.
+    """
+    criteres = {}
+    if statut is not None:
+        criteres["statut"] = statut
+    if universite is not None:
+        criteres["universite_destination"] = universite
+    if automobiliste is not None:
+        criteres["id_automobiliste"] = automobiliste
+    return [Annonce.from_dict(data) for data in find_records(ANNONCES_FILE, **criteres)]
 
 def get_active_annonces():
     """
     Récupère toutes les annonces actives (statut 'active').
     """
-    annonces = get_all_annonces()
-    return [annonce for annonce in annonces if annonce.statut == 'active']
+    return [Annonce.from_dict(data) for data in find_records(ANNONCES_FILE, statut='active')]
 
 
+
+
+def completer_depart_prevu():
+    """
+    Complète les annonces enregistrées sans départ complet (depart_prevu) en le calculant
+    à partir de leur heure de départ et de leur date de publication. Les annonces à compléter
+    sont trouvées par l'index sur depart_prevu, et toutes sont écrites en une seule fois.
+    Si l'une d'elles est modifiée entre-temps, rien n'est écrit: elles seront complétées à l'appel suivant.
+
+    Returns:
+        int: Le nombre d'annonces complétées.
+    """
+    tx = Transaction()
+    completees = 0
+    for data in find_records(ANNONCES_FILE, depart_prevu=None):
+        depart = calculer_depart_prevu(data.get("heure_depart"), data.get("date_publication"))
+        if depart is None:
+            continue
+        tx.verifier(ANNONCES_FILE, data["id_annonce"], "id_annonce", "version", data.get("version", 0), defaut=0)
+        data["depart_prevu"] = depart
+        data["version"] = data.get("version", 0) + 1
+        tx.upsert_record(ANNONCES_FILE, data, key="id_annonce")
+        completees += 1
+    if completees:
+        try:
+            tx.commit()
+        except ConflitEcriture:
+            return 0
+    return completees
+
+def find_annonces_par_depart(debut=None, fin=None, statut=None, universite=None):
+    """
+    Recherche les annonces dont le départ est compris dans [debut, fin), triées par départ.
+    Avec un statut (et éventuellement une université), la recherche utilise l'index trié des
+    départs: une dichotomie pour trouver le premier départ puis un parcours de la plage.
+
+    Args:
+        debut (datetime, optional): Départ au plus tôt (inclus). Defaults to None.
+        fin (datetime, optional): Départ au plus tard (exclu). Defaults to None.
+        statut (str, optional): Le statut recherché (ex: 'en_attente'). Defaults to None.
+        universite (str, optional): Le nom exact de l'université de destination. Defaults to None.
+
+    Returns:
+        list: Une liste d'objets Annonce, triée par départ.
+    """
+    # Les annonces enregistrées sans départ complet (avant son ajout) n'apparaîtraient pas dans l'index trié
+    completer_depart_prevu()
+    criteres = {}
+    if statut is not None:
+        criteres["statut"] = statut
+    if universite is not None:
+        criteres["universite_destination"] = universite
+    debut = debut.isoformat(timespec="seconds") if debut is not None else None
+    fin = fin.isoformat(timespec="seconds") if fin is not None else None
+    return [Annonce.from_dict(data) for data in range_records(ANNONCES_FILE, "depart_prevu", debut, fin, **criteres)]
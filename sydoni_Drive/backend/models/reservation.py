@@ -5,7 +5,7 @@ class Reservation:
     """
     Représente une réservation de trajet effectuée par un passager.
     """
-    def __init__(self, id_automobiliste, id_passager, heure_depart, statut, id_reservation=None, points_attribues=0):
+    def __init__(self, id_automobiliste, id_passager, heure_depart, statut, id_reservation=None, points_attribues=0, id_annonce=None):
         """
         Initialise une nouvelle instance de réservation.
 
@@ -16,6 +16,7 @@ class Reservation:
             statut (str): Le statut de la réservation (ex: 'en_attente', 'confirmee', 'annulee', 'terminee').
             id_reservation (str, optional): L'identifiant unique de la réservation. Généré si None.
             points_attribues (int, optional): Points attribués à l'automobiliste pour cette réservation. Defaults to 0.
+            id_annonce (str, optional): L'identifiant de l'annonce réservée. Defaults to None.
         """
         self.id_reservation = id_reservation if id_reservation else str(uuid.uuid4()) # Générer un ID unique
         self.id_automobiliste = id_automobiliste
@@ -23,6 +24,7 @@ class Reservation:
         self.heure_depart = heure_depart
         self.statut = statut  
         self.points_attribues = points_attribues
+        self.id_annonce = id_annonce
 
     def to_dict(self):
         """
@@ -34,7 +36,8 @@ class Reservation:
             "id_passager": self.id_passager,
             "heure_depart": self.heure_depart,
             "statut": self.statut,
-            "points_attribues": self.points_attribues
+            "points_attribues": self.points_attribues,
+            "id_annonce": self.id_annonce
         }
 
     @classmethod
@@ -48,7 +51,8 @@ class Reservation:
             data["heure_depart"],
             data["statut"],
             data.get("id_reservation"), # Récupérer l'ID si présent
-            data.get("points_attribues", 0)
+            data.get("points_attribues", 0),
+            data.get("id_annonce") # Absent des réservations enregistrées avant ce champ
         )
 
 
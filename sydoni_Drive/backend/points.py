@@ -0,0 +1,164 @@
+import random
+import time
+import uuid
+from datetime import datetime
+from stockage import (USERS_FILE, POINTS_FILE, SOLDES_FILE, Transaction, ConflitEcriture, acces, declare_index,
+                      find_records, get_record, load_data, save_data)
+
+# POINTS_FILE: mouvements ajoutés à la suite, jamais modifiés ni supprimés
+# {"id_mouvement", "email", "delta", "motif", "id_trajet", "horodatage"}
+# SOLDES_FILE: soldes matérialisés {"email", "solde", "mouvements", "universite", "engin"}, tenus à jour
+# à chaque mouvement (l'université et l'engin servent au classement, voir backend.classement)
+
+# Motif du mouvement qui reprend les points enregistrés sur le compte avant le journal
+MOTIF_REPRISE = "Reprise du solde existant"
+
+# Nombre maximal d'essais d'une attribution en cas d'attributions simultanées au même utilisateur
+TENTATIVES_CREDIT = 50
+
+declare_index(POINTS_FILE, "email")
+
+def _mouvement(email, delta, motif, id_trajet=None):
+    return {
+        "id_mouvement": str(uuid.uuid4()),
+        "email": email,
+        "delta": delta,
+        "motif": motif,
+        "id_trajet": id_trajet,
+        "horodatage": datetime.now().isoformat(),
+    }
+
+def _profil(utilisateur):
+    """
+    Champs de l'utilisateur recopiés sur son solde pour le classement.
+    """
+    utilisateur = utilisateur or {}
+    return {"universite": utilisateur.get("universite"), "engin": utilisateur.get("engin")}
+
+def _crediter(tx, email, delta, motif, id_trajet):
+    """
+    Ajoute à la transaction le mouvement et le nouveau solde, conditionnés au nombre de mouvements lu.
+    """
+    solde = tx.get_record(SOLDES_FILE, email, key="email")
+    # Le solde ne doit pas avoir changé (ni été créé) d'ici la validation: sinon une attribution simultanée serait perdue
+    tx.verifier(SOLDES_FILE, email, "email", "mouvements", solde["mouvements"] if solde is not None else None)
+    utilisateur = tx.get_record(USERS_FILE, email, key="email")
+    if solde is None:
+        reprise = utilisateur.get("points", 0) if utilisateur else 0
+        solde = {"email": email, "solde": 0, "mouvements": 0}
+        if reprise:
+            tx.upsert_record(POINTS_FILE, _mouvement(email, reprise, MOTIF_REPRISE), key="id_mouvement")
+            solde = {"email": email, "solde": reprise, "mouvements": 1}
+
+    tx.upsert_record(POINTS_FILE, _mouvement(email, delta, motif, id_trajet), key="id_mouvement")
+    nouveau = {"email": email, "solde": solde["solde"] + delta, "mouvements": solde["mouvements"] + 1, **_profil(utilisateur)}
+    tx.upsert_record(SOLDES_FILE, nouveau, key="email")
+    return nouveau["solde"]
+
+def crediter_points(email, delta, motif, id_trajet=None, transaction=None):
+    """
+    Ajoute un mouvement au journal des points et met à jour le solde de l'utilisateur.
+    Seuls le mouvement et le solde sont écrits (aucune réécriture du fichier des utilisateurs).
+    Au premier mouvement d'un compte, les points déjà enregistrés sur celui-ci sont repris
+    dans le journal, pour que le solde reste égal à la somme des mouvements.
+    L'écriture du solde est conditionnée à son nombre de mouvements (compare-and-swap): si une autre
+    attribution au même utilisateur est validée entre-temps, l'attribution est recommencée sur le solde relu.
+
+    Args:
+        email (str): Email de l'utilisateur, tel qu'enregistré.
+        delta (int): Nombre de points à ajouter (négatif pour en retirer).
+        motif (str): La raison du mouvement (ex: "Trajet terminé").
+        id_trajet (str, optional): L'ID du trajet concerné. Defaults to None.
+        transaction (Transaction, optional): Transaction en cours ; l'écriture est alors faite à sa validation,
+            qui lève ConflitEcriture en cas d'attribution simultanée (à l'appelant de recommencer).
+
+    Returns:
+        int: Le nouveau solde de l'utilisateur.
+    """
+    if transaction is not None:
+        return _crediter(transaction, email, delta, motif, id_trajet)
+    for essai in range(TENTATIVES_CREDIT):
+        tx = Transaction()
+        solde = _crediter(tx, email, delta, motif, id_trajet)
+        try:
+            # Mouvement et solde sont écrits ensemble, en une seule entrée du journal
+            tx.commit()
+            return solde
+        except ConflitEcriture:
+            if essai == TENTATIVES_CREDIT - 1:
+                raise
+            time.sleep(random.uniform(0, 0.002 * (essai + 1)))
+
+def get_solde(email, transaction=None):
+    """
+    Retourne le solde de points d'un utilisateur, lu dans la table des soldes.
+
+    Args:
+        email (str): Email de l'utilisateur, tel qu'enregistré.
+        transaction (Transaction, optional): Transaction en cours dans laquelle lire le solde.
+
+    Returns:
+        int or None: Le solde, ou None si aucun mouvement n'a encore été enregistré pour ce compte.
+    """
+    solde = acces(transaction).get_record(SOLDES_FILE, email, key="email")
+    return solde["solde"] if solde is not None else None
+
+def get_mouvements(email):
+    """
+    Retourne les mouvements de points d'un utilisateur, du plus ancien au plus récent.
+
+    Args:
+        email (str): Email de l'utilisateur, tel qu'enregistré.
+
+    Returns:
+        list: Des dictionnaires {"id_mouvement", "email", "delta", "motif", "id_trajet", "horodatage"}.
+    """
+    return find_records(POINTS_FILE, email=email)
+
+def reprendre_points_existants():
+    """
+    Migration vers le journal des points: chaque utilisateur ayant des points enregistrés sur son compte
+    mais aucun solde reçoit le mouvement de reprise de ces points et son solde, pour figurer dans les
+    classements sans attendre sa prochaine attribution. Toutes les reprises sont écrites en une seule fois.
+    Si l'un des soldes est créé entre-temps, rien n'est écrit: la reprise est à relancer.
+
+    Returns:
+        int: Le nombre de comptes repris.
+    """
+    tx = Transaction()
+    reprises = 0
+    for utilisateur in load_data(USERS_FILE, default_value=[], readonly=True):
+        email, points = utilisateur.get("email"), utilisateur.get("points", 0)
+        if not points or tx.get_record(SOLDES_FILE, email, key="email") is not None:
+            continue
+        tx.verifier(SOLDES_FILE, email, "email", "mouvements", None) # Le solde ne doit pas avoir été créé entre-temps
+        tx.upsert_record(POINTS_FILE, _mouvement(email, points, MOTIF_REPRISE), key="id_mouvement")
+        tx.upsert_record(SOLDES_FILE, {"email": email, "solde": points, "mouvements": 1, **_profil(utilisateur)}, key="email")
+        reprises += 1
+    if reprises:
+        try:
+            tx.commit()
+        except ConflitEcriture:
+            return 0
+    return reprises
+
+def recalculer_soldes():
+    """
+    Rejoue tout le journal des points et réécrit la table des soldes à partir de celui-ci
+    (vérification ou reconstruction après une perte de la table), puis reprend les points
+    des comptes absents du journal (voir reprendre_points_existants).
+
+    Returns:
+        dict: email -> solde recalculé.
+    """
+    soldes = {}
+    for mouvement in load_data(POINTS_FILE, default_value=[], readonly=True):
+        solde = soldes.get(mouvement["email"])
+        if solde is None:
+            utilisateur = get_record(USERS_FILE, mouvement["email"], key="email")
+            solde = soldes[mouvement["email"]] = {"email": mouvement["email"], "solde": 0, "mouvements": 0, **_profil(utilisateur)}
+        solde["solde"] += mouvement["delta"]
+        solde["mouvements"] += 1
+    save_data(SOLDES_FILE, list(soldes.values()))
+    reprendre_points_existants()
+    return {solde["email"]: solde["solde"] for solde in load_data(SOLDES_FILE, default_value=[], readonly=True)}
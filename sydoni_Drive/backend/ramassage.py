@@ -0,0 +1,181 @@
+import threading
+from backend.distance import matrice_distances
+from backend.detour import VITESSE_MOYENNE_KMH
+from backend.routage import charger_reseau
+from backend.models.annonce import get_annonce_by_id
+from backend.universites import get_coordonnees_universite
+from stockage import HISTORIQUES_FILE, load_data
+
+# Au-delà de ce nombre d'arrêts, l'ordre exact (programmation dynamique) est remplacé par une heuristique
+ARRETS_MAX_EXACT = 10
+
+INFINI = float("inf")
+
+def _cout_chemin(couts, ordre):
+    """
+    Coût du chemin départ (0) -> arrêts dans l'ordre donné -> arrivée (dernier indice).
+    """
+    chemin = [0] + list(ordre) + [len(couts) - 1]
+    return sum(couts[u][v] for u, v in zip(chemin, chemin[1:]))
+
+def _ordre_exact(couts):
+    """
+    Ordre optimal des arrêts (programmation dynamique de Held-Karp, O(2^n n^2)).
+    dp[masque][j]: coût minimal pour partir du départ, visiter les arrêts du masque et finir sur l'arrêt j.
+    """
+    n = len(couts) - 2
+    if n == 0:
+        return []
+    complet = (1 << n) - 1
+    dp = [[INFINI] * n for _ in range(1 << n)]
+    precedent = [[-1] * n for _ in range(1 << n)]
+    for j in range(n):
+        dp[1 << j][j] = couts[0][j + 1]
+    for masque in range(1, complet + 1):
+        for j in range(n):
+            cout_j = dp[masque][j]
+            if cout_j == INFINI or not masque & (1 << j):
+                continue
+            for k in range(n):
+                if masque & (1 << k):
+                    continue
+                suivant = masque | (1 << k)
+                cout = cout_j + couts[j + 1][k + 1]
+                if cout < dp[suivant][k]:
+                    dp[suivant][k] = cout
+                    precedent[suivant][k] = j
+    dernier = min(range(n), key=lambda j: dp[complet][j] + couts[j + 1][n + 1])
+    if dp[complet][dernier] == INFINI:
+        # Un arrêt est inaccessible: aucun ordre n'a de coût fini
+        return _ordre_heuristique(couts)
+    # Remonter les prédécesseurs depuis le dernier arrêt
+    ordre, masque, j = [], complet, dernier
+    while j != -1:
+        ordre.append(j + 1)
+        masque, j = masque ^ (1 << j), precedent[masque][j]
+    return ordre[::-1]
+
+def _ordre_heuristique(couts):
+    """
+    Ordre approché des arrêts: plus proche voisin depuis le départ, amélioré par 2-opt
+    (inversion de segments tant que le coût du chemin complet diminue).
+    """
+    n = len(couts) - 2
+    restants = set(range(1, n + 1))
+    ordre, courant = [], 0
+    while restants:
+        courant = min(restants, key=lambda k: couts[courant][k])
+        ordre.append(courant)
+        restants.discard(courant)
+
+    # Le coût complet est recalculé à chaque essai: les coûts routiers ne sont pas symétriques
+    meilleur = _cout_chemin(couts, ordre)
+    ameliore = True
+    while ameliore:
+        ameliore = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                essai = ordre[:i] + ordre[i:j + 1][::-1] + ordre[j + 1:]
+                cout = _cout_chemin(couts, essai)
+                if cout < meilleur - 1e-9:
+                    ordre, meilleur, ameliore = essai, cout, True
+    return ordre
+
+def _matrice_couts(points, critere):
+    """
+    Matrice des coûts entre les points: par la route avec le réseau local, à vol d'oiseau sinon.
+    Le coût est en kilomètres ("distance") ou en minutes ("duree").
+    """
+    reseau = charger_reseau()
+    if reseau is None:
+        distances = matrice_distances(points, points)
+        if critere == "duree":
+            return [[distance / VITESSE_MOYENNE_KMH * 60 for distance in ligne] for ligne in distances]
+        return distances
+    # Une recherche inverse par point d'arrivée donne les coûts depuis tous les autres points
+    indice = 0 if critere == "distance" else 1
+    couts = [[INFINI] * len(points) for _ in points]
+    for j, (lat, lon) in enumerate(points):
+        for i, trajet in enumerate(reseau.couts_vers(lat, lon, points, critere)):
+            if trajet is not None:
+                couts[i][j] = 0.0 if i == j else trajet[indice]
+    return couts
+
+def ordonner_arrets(depart, arrets, arrivee, critere="distance"):
+    """
+    Calcule l'ordre dans lequel un automobiliste doit prendre ses passagers entre son départ et l'arrivée.
+    L'ordre est exact jusqu'à ARRETS_MAX_EXACT arrêts, approché (plus proche voisin et 2-opt) au-delà.
+
+    Args:
+        depart (tuple): La position de départ (latitude, longitude).
+        arrets (list): Les positions de prise en charge (latitude, longitude).
+        arrivee (tuple): La position d'arrivée (latitude, longitude).
+        critere (str, optional): "distance" (km) ou "duree" (minutes). Defaults to "distance".
+
+    Returns:
+        dict: {"ordre": indices des arrêts dans l'ordre de passage, "cout": coût total du chemin
+        (infini si un arrêt est inaccessible), "exact": True si l'ordre est optimal}.
+    """
+    if critere not in ("distance", "duree"):
+        raise ValueError(f"Critère inconnu: {critere}")
+    couts = _matrice_couts([tuple(depart)] + [tuple(arret) for arret in arrets] + [tuple(arrivee)], critere)
+    exact = len(arrets) <= ARRETS_MAX_EXACT
+    ordre = _ordre_exact(couts) if exact else _ordre_heuristique(couts)
+    return {"ordre": [k - 1 for k in ordre], "cout": _cout_chemin(couts, ordre), "exact": exact}
+
+# Plans de ramassage calculés: id_annonce -> (clé des réservations, plan)
+_plans = {}
+_verrou = threading.Lock()
+
+def planifier_ramassage(id_annonce, critere="distance"):
+    """
+    Retourne le plan de ramassage d'une annonce: l'ordre de prise en charge des passagers réservés,
+    du départ de l'automobiliste jusqu'à l'université. Les positions des passagers sont celles
+    enregistrées à la réservation.
+    Le plan est mis en cache pour l'ensemble de réservations courant: toute réservation ajoutée
+    ou retirée change la clé, et le plan est alors recalculé.
+
+    Args:
+        id_annonce (str): L'ID de l'annonce.
+        critere (str, optional): "distance" (km) ou "duree" (minutes). Defaults to "distance".
+
+    Returns:
+        dict: {"passagers": emails dans l'ordre de prise en charge, "etapes": positions (latitude, longitude)
+        du départ à l'université, "cout": coût total, "exact": bool}, ou None si l'annonce, sa position
+        de départ ou son université est introuvable.
+    """
+    annonce = get_annonce_by_id(id_annonce)
+    if annonce is None or not annonce.position_depart:
+        return None
+    if annonce.position_destination:
+        arrivee = (annonce.position_destination["latitude"], annonce.position_destination["longitude"])
+    else:
+        arrivee = get_coordonnees_universite(annonce.universite_destination)
+        if arrivee is None:
+            return None
+    depart = (annonce.position_depart["latitude"], annonce.position_depart["longitude"])
+
+    historiques = load_data(HISTORIQUES_FILE, default_value={}, readonly=True)
+    passagers, arrets = [], []
+    for email in annonce.passagers_reserves:
+        position = historiques.get(email, {}).get(id_annonce, {}).get("position_passager")
+        if position:
+            passagers.append(email)
+            arrets.append((position["latitude"], position["longitude"]))
+
+    cle = (critere, depart, arrivee, tuple(zip(passagers, arrets)))
+    with _verrou:
+        en_cache = _plans.get(id_annonce)
+        if en_cache is not None and en_cache[0] == cle:
+            return en_cache[1]
+
+    resultat = ordonner_arrets(depart, arrets, arrivee, critere)
+    plan = {
+        "passagers": [passagers[k] for k in resultat["ordre"]],
+        "etapes": [depart] + [arrets[k] for k in resultat["ordre"]] + [arrivee],
+        "cout": resultat["cout"],
+        "exact": resultat["exact"],
+    }
+    with _verrou:
+        _plans[id_annonce] = (cle, plan)
+    return plan
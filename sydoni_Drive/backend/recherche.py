@@ -0,0 +1,142 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+# Similarité minimale (trigrammes communs / trigrammes distincts) pour qu'un mot approchant soit retenu
+SIMILARITE_MIN = 0.3
+
+# Scores d'un mot de la requête selon sa correspondance avec un mot indexé
+SCORE_EXACT = 1.0
+SCORE_PREFIXE = 0.9
+
+def normaliser_texte(texte):
+    """
+    Normalise un texte pour les comparaisons: casse ignorée, accents retirés, espaces réduits.
+
+    Args:
+        texte (str): Le texte à normaliser.
+
+    Returns:
+        str: Le texte normalisé (ex: "Université  Norbert" -> "universite norbert").
+    """
+    decompose = unicodedata.normalize("NFKD", texte.casefold())
+    return " ".join("".join(c for c in decompose if not unicodedata.combining(c)).split())
+
+def mots(texte):
+    """
+    Découpe un texte normalisé en mots (lettres et chiffres), ex: "Technology(BIT)" -> ["technology", "bit"].
+    """
+    return re.findall(r"[0-9a-z]+", normaliser_texte(texte))
+
+def trigrammes(mot):
+    """
+    Trigrammes d'un mot, complété par des espaces pour que le début du mot compte davantage.
+    """
+    complete = f"  {mot} "
+    return {complete[i:i + 3] for i in range(len(complete) - 2)}
+
+class IndexTexte:
+    """
+    Index de recherche approximative sur des textes courts (noms, alias, sigles).
+    Chaque mot indexé est retrouvé par préfixe (liste triée) ou par trigrammes (index inversé),
+    ce qui tolère les fautes de frappe. Les entrées peuvent être ajoutées et retirées une à une.
+    """
+    def __init__(self):
+        self.textes = {} # Clé -> ensemble des mots indexés
+        self.cles_par_mot = {} # Mot -> ensemble des clés qui le contiennent
+        self.mots_par_trigramme = {} # Trigramme -> ensemble des mots
+        self.mots_tries = [] # Mots distincts triés, pour la recherche par préfixe
+
+    def __len__(self):
+        return len(self.textes)
+
+    def add(self, cle, textes):
+        """
+        Indexe une entrée (remplace l'entrée existante de même clé).
+
+        Args:
+            cle (hashable): La clé retournée par les recherches.
+            textes (iterable): Les textes de l'entrée (nom, alias, sigles...).
+        """
+        self.discard(cle)
+        ensemble = {mot for texte in textes for mot in mots(texte)}
+        self.textes[cle] = ensemble
+        for mot in ensemble:
+            cles = self.cles_par_mot.get(mot)
+            if cles is None:
+                cles = self.cles_par_mot[mot] = set()
+                insort(self.mots_tries, mot)
+                for trigramme in trigrammes(mot):
+                    self.mots_par_trigramme.setdefault(trigramme, set()).add(mot)
+            cles.add(cle)
+
+    def discard(self, cle):
+        """
+        Retire une entrée de l'index (sans effet si elle est absente).
+        """
+        for mot in self.textes.pop(cle, ()):
+            cles = self.cles_par_mot[mot]
+            cles.discard(cle)
+            if cles:
+                continue
+            # Plus aucune entrée ne contient ce mot
+            del self.cles_par_mot[mot]
+            del self.mots_tries[bisect_left(self.mots_tries, mot)]
+            for trigramme in trigrammes(mot):
+                mots_trigramme = self.mots_par_trigramme[trigramme]
+                mots_trigramme.discard(mot)
+                if not mots_trigramme:
+                    del self.mots_par_trigramme[trigramme]
+
+    def _mots_proches(self, mot):
+        """
+        Mots indexés proches d'un mot de la requête, avec leur score: exact, préfixe, ou similarité de trigrammes.
+        """
+        scores = {}
+        i = bisect_left(self.mots_tries, mot)
+        while i < len(self.mots_tries) and self.mots_tries[i].startswith(mot):
+            indexe = self.mots_tries[i]
+            scores[indexe] = SCORE_EXACT if indexe == mot else SCORE_PREFIXE
+            i += 1
+        trigrammes_mot = trigrammes(mot)
+        communs = {}
+        for trigramme in trigrammes_mot:
+            for indexe in self.mots_par_trigramme.get(trigramme, ()):
+                communs[indexe] = communs.get(indexe, 0) + 1
+        for indexe, nombre in communs.items():
+            if indexe in scores:
+                continue
+            similarite = nombre / (len(trigrammes_mot) + len(trigrammes(indexe)) - nombre)
+            if similarite >= SIMILARITE_MIN:
+                # Une faute de frappe ne vaut jamais une correspondance exacte ou par préfixe
+                scores[indexe] = similarite * SCORE_PREFIXE
+        return scores
+
+    def rechercher(self, texte, limit=10):
+        """
+        Recherche les entrées correspondant au texte, classées par pertinence.
+        Le score d'une entrée est la moyenne, sur les mots de la requête, du meilleur score
+        obtenu par un de ses mots (1 pour un mot identique, moins pour un préfixe ou un mot approchant).
+
+        Args:
+            texte (str): Le texte recherché (ex: "norbert zongo", "unz", "unz koudougou").
+            limit (int, optional): Le nombre maximal de résultats. Defaults to 10.
+
+        Returns:
+            list: Des couples (score entre 0 et 1, clé), du plus pertinent au moins pertinent.
+        """
+        mots_requete = mots(texte)
+        if not mots_requete:
+            return []
+        totaux = {}
+        for mot in mots_requete:
+            meilleurs = {}
+            for indexe, score in self._mots_proches(mot).items():
+                for cle in self.cles_par_mot[indexe]:
+                    if score > meilleurs.get(cle, 0.0):
+                        meilleurs[cle] = score
+            for cle, score in meilleurs.items():
+                totaux[cle] = totaux.get(cle, 0.0) + score
+        resultats = sorted(((total / len(mots_requete), cle) for cle, total in totaux.items()),
+                           key=lambda resultat: (-resultat[0], str(resultat[1])))
+        return resultats[:limit]
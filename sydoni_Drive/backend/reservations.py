@@ -1,12 +1,27 @@
 import json
 import os
 from backend.models.reservation import Reservation
-from backend.models.annonce import get_annonce_by_id, update_annonce # Importation de update_annonce
-from stockage import load_data, save_data # Importation des fonctions génériques de stockage
+from backend.models.annonce import reserver_place, modifier_annonce, get_annonce_by_id, update_annonce
+from stockage import HISTORIQUES_FILE, load_data, save_data, find_records, Transaction, acces, declare_index, set_historique # Importation des fonctions génériques de stockage
 
 # Chemin du fichier de stockage des réservations
 RESERVATION_FILE = os.path.join("data", "reservations.json")
 
+# Statuts possibles d'une réservation
+STATUTS_RESERVATION = ("en_attente", "confirmee", "annulee", "terminee")
+# Statut d'une nouvelle réservation, qui est aussi l'état du trajet dans les historiques
+STATUT_INITIAL = "en_attente"
+# Statut d'une réservation annulée: la place est rendue à l'annonce
+STATUT_ANNULEE = "annulee"
+# Statuts des réservations qui occupent une place
+STATUTS_ACTIFS = ("en_attente", "confirmee")
+
+# Index secondaires: réservations d'un passager, d'un automobiliste, d'une annonce.
+# Les recherches par id_reservation passent par l'index clé -> position du stockage.
+declare_index(RESERVATION_FILE, "id_passager")
+declare_index(RESERVATION_FILE, "id_automobiliste")
+declare_index(RESERVATION_FILE, "id_annonce")
+
 # Assurez-vous que le répertoire 'data' existe (déjà géré par stockage.py)
 # os.makedirs("data", exist_ok=True)
 
@@ -26,45 +41,82 @@ def sauvegarder_reservations(reservations):
     reservations_data = [res.to_dict() for res in reservations]
     save_data(RESERVATION_FILE, reservations_data)
 
-def creer_reservation(id_passager, id_annonce):
+def reserver(id_annonce, id_passager, position_passager=None):
     """
-    Crée une nouvelle réservation pour une annonce donnée.
+    Réserve une place sur une annonce: c'est le seul chemin de réservation de l'application.
+    La réservation, l'annonce (places et passagers) et les historiques du passager et de l'automobiliste
+    sont écrits ensemble, en une seule fois, sans risque de surréservation (voir reserver_place).
 
     Args:
-        id_passager (str): L'ID de l'utilisateur passager.
         id_annonce (str): L'ID de l'annonce de covoiturage.
+        id_passager (str): L'email du passager.
+        position_passager (dict, optional): {"latitude", "longitude"} du passager, point de prise en charge
+            utilisé par le plan de ramassage. Defaults to None.
 
     Returns:
-        tuple: (True, Reservation) si la réservation est réussie, (False, str) sinon.
+        tuple: (bool, str, Reservation) - True si la réservation est réussie, avec un message
+        et la réservation créée (None en cas d'échec).
     """
-    annonce = get_annonce_by_id(id_annonce)
-    if not annonce:
-        return False, "Annonce introuvable."
+    reservations = []
 
-    if annonce.places_disponibles <= 0:
-        return False, "Aucune place disponible sur cette annonce."
+    def ecrire_reservation(tx, annonce):
+        # L'heure de départ est tirée de l'annonce; la réservation attend la confirmation de l'automobiliste
+        nouvelle_reservation = Reservation(
+            id_automobiliste=annonce.id_automobiliste,
+            id_passager=id_passager,
+            heure_depart=annonce.heure_depart,
+            statut=STATUT_INITIAL,
+            id_annonce=annonce.id_annonce
+        )
+        tx.upsert_record(RESERVATION_FILE, nouvelle_reservation.to_dict(), key="id_reservation")
+        reservations.append(nouvelle_reservation) # Une réservation par essai: seule la dernière est écrite
 
-    # Créer la réservation
-    # L'heure de départ et le statut initial sont tirés de l'annonce
-    nouvelle_reservation = Reservation(
-        id_automobiliste=annonce.id_automobiliste,
-        id_passager=id_passager,
-        heure_depart=annonce.heure_depart,
-        statut="en_attente" # Statut initial de la réservation
-    )
+        # Ajouter le trajet à l'historique du passager
+        set_historique(id_passager, annonce.id_annonce, {
+            "id": annonce.id_annonce,
+            "role": "passager",
+            "universite": annonce.universite_destination,
+            "heure_depart": annonce.heure_depart,
+            "etat": STATUT_INITIAL, # Le trajet est en attente de confirmation par l'automobiliste
+            "points": 0, # Les passagers ne gagnent pas de points
+            "notes_moyenne": "N/A",
+            "automobiliste_email": annonce.id_automobiliste,
+            "position_passager": position_passager,
+            "id_reservation": nouvelle_reservation.id_reservation
+        }, transaction=tx)
 
-    reservations = charger_reservations()
-    reservations.append(nouvelle_reservation)
-    sauvegarder_reservations(reservations)
+        # Mettre à jour l'historique de l'automobiliste pour refléter la réservation
+        set_historique(annonce.id_automobiliste, annonce.id_annonce, {
+            "id": annonce.id_annonce,
+            "role": "automobiliste",
+            "universite": annonce.universite_destination,
+            "heure_depart": annonce.heure_depart,
+            "etat": STATUT_INITIAL,
+            "places_offertes": annonce.places_offertes,
+            "places_disponibles": annonce.places_disponibles,
+            "passagers_reserves": annonce.passagers_reserves,
+            "has_reservations": annonce.has_reservations,
+            "points": 0, # Les points seront attribués à la fin du trajet
+            "notes_moyenne": "N/A",
+            "position_depart": annonce.position_depart
+        }, transaction=tx)
 
-    # Mettre à jour le nombre de places disponibles dans l'annonce
-    annonce.places_disponibles -= 1
-    # Ajouter le passager à la liste des passagers réservés pour cette annonce
-    annonce.passagers_reserves.append(id_passager)
-    annonce.has_reservations = True # Marquer l'annonce comme ayant eu au moins une réservation
-    update_annonce(annonce) # Utiliser update_annonce
+    success, message, _ = reserver_place(id_annonce, id_passager, ecrire_reservation)
+    return success, message, reservations[-1] if success else None
 
-    return True, nouvelle_reservation
+def creer_reservation(id_passager, id_annonce):
+    """
+    Crée une nouvelle réservation pour une annonce donnée (voir reserver).
+
+    Args:
+        id_passager (str): L'ID de l'utilisateur passager.
+        id_annonce (str): L'ID de l'annonce de covoiturage.
+
+    Returns:
+        tuple: (True, Reservation) si la réservation est réussie, (False, str) sinon.
+    """
+    success, message, reservation = reserver(id_annonce, id_passager)
+    return (True, reservation) if success else (False, message)
 
 def get_reservations_by_user(user_id, is_automobiliste=False):
     """
@@ -77,34 +129,159 @@ def get_reservations_by_user(user_id, is_automobiliste=False):
     Returns:
         list: Une liste d'objets Reservation.
     """
-    reservations = charger_reservations()
-    if is_automobiliste:
-        return [res for res in reservations if res.id_automobiliste == user_id]
-    else:
-        return [res for res in reservations if res.id_passager == user_id]
+    champ = "id_automobiliste" if is_automobiliste else "id_passager"
+    return [Reservation.from_dict(data) for data in find_records(RESERVATION_FILE, **{champ: user_id})]
+
+def get_reservation_by_id(reservation_id, transaction=None):
+    """
+    Récupère une réservation par son ID.
+
+    Args:
+        reservation_id (str): L'ID de la réservation.
+        transaction (Transaction, optional): Transaction en cours dans laquelle lire la réservation.
+
+    Returns:
+        Reservation or None: La réservation si elle existe, sinon None.
+    """
+    data = acces(transaction).get_record(RESERVATION_FILE, reservation_id, key="id_reservation")
+    return Reservation.from_dict(data) if data else None
+
+def get_reservations_by_annonce(id_annonce):
+    """
+    Récupère les réservations faites sur une annonce.
 
-def mettre_a_jour_statut_reservation(reservation_id, nouveau_statut):
+    Args:
+        id_annonce (str): L'ID de l'annonce.
+
+    Returns:
+        list: Une liste d'objets Reservation.
+    """
+    return [Reservation.from_dict(data) for data in find_records(RESERVATION_FILE, id_annonce=id_annonce)]
+
+def _annuler(tx, annonce, reservation_ids):
+    """
+    Annule dans la transaction les réservations actives données de l'annonce (lue dans la transaction):
+    chaque passager est retiré de l'annonce et sa place rendue, et les historiques du passager et
+    de l'automobiliste sont mis à jour. L'annonce est écrite avec update_annonce (compare-and-swap).
+
+    Returns:
+        int: Le nombre de réservations annulées.
+    """
+    annulees = 0
+    historiques = None
+    for reservation_id in reservation_ids:
+        reservation = get_reservation_by_id(reservation_id, tx)
+        if reservation is None or reservation.id_annonce != annonce.id_annonce or reservation.statut not in STATUTS_ACTIFS:
+            continue
+        reservation.statut = STATUT_ANNULEE
+        tx.upsert_record(RESERVATION_FILE, reservation.to_dict(), key="id_reservation")
+        if reservation.id_passager in annonce.passagers_reserves:
+            annonce.passagers_reserves.remove(reservation.id_passager)
+            annonce.places_disponibles += 1
+        if historiques is None:
+            historiques = tx.load_data(HISTORIQUES_FILE, default_value={})
+        entree = historiques.get(reservation.id_passager, {}).get(annonce.id_annonce)
+        if entree is not None and entree.get("id_reservation") == reservation.id_reservation:
+            set_historique(reservation.id_passager, annonce.id_annonce, dict(entree, etat=STATUT_ANNULEE), tx)
+        annulees += 1
+    if annulees:
+        update_annonce(annonce, tx)
+        entree = historiques.get(annonce.id_automobiliste, {}).get(annonce.id_annonce)
+        if entree is not None:
+            set_historique(annonce.id_automobiliste, annonce.id_annonce, dict(
+                entree, places_disponibles=annonce.places_disponibles, passagers_reserves=annonce.passagers_reserves), tx)
+    return annulees
+
+def annuler_reservations(id_annonce, reservation_ids):
+    """
+    Annule des réservations d'une annonce: la réservation, l'annonce (places et passagers) et les historiques
+    du passager et de l'automobiliste sont écrits ensemble, en une seule fois, comme pour la réservation
+    (voir reserver). Les réservations déjà annulées ou terminées ne sont pas modifiées.
+
+    Args:
+        id_annonce (str): L'ID de l'annonce.
+        reservation_ids (iterable): Les IDs des réservations à annuler.
+
+    Returns:
+        int: Le nombre de réservations annulées.
+    """
+    reservation_ids = list(reservation_ids)
+    return modifier_annonce(id_annonce, lambda tx, annonce: _annuler(tx, annonce, reservation_ids)) or 0
+
+def mettre_a_jour_statut_reservation(reservation_id, nouveau_statut, transaction=None):
     """
     Met à jour le statut d'une réservation.
+    La réservation est retrouvée par son ID et seule elle est réécrite, sauf en cas d'annulation:
+    la place est alors rendue à l'annonce (voir annuler_reservations).
 
     Args:
         reservation_id (str): L'ID de la réservation à mettre à jour.
         nouveau_statut (str): Le nouveau statut (ex: 'confirmee', 'annulee', 'terminee').
+        transaction (Transaction, optional): Transaction en cours ; l'écriture est alors faite à sa validation.
 
     Returns:
-        bool: True si la mise à jour est réussie, False sinon.
-    """
-    reservations = charger_reservations()
-    for i, res in enumerate(reservations):
-        # Assurez-vous d'avoir un moyen d'identifier une réservation de manière unique, ex: un ID unique
-        # Pour l'instant, nous allons utiliser une combinaison d'IDs pour l'exemple
-        # Dans une vraie application, la classe Reservation devrait avoir un ID unique.
-        # Ici, nous allons simuler la recherche par id_automobiliste et id_passager pour l'exemple.
-        # Il faudra adapter cela une fois que la classe Reservation aura un ID unique.
-        if str(res.id_automobiliste) + str(res.id_passager) == reservation_id: # Ceci est un un placeholder, à remplacer par un vrai ID
-            reservations[i].statut = nouveau_statut
-            sauvegarder_reservations(reservations)
-            return True
-    return False
+        bool: True si la mise à jour est réussie, False sinon (réservation introuvable ou statut inconnu).
+    """
+    if nouveau_statut not in STATUTS_RESERVATION:
+        return False
+    reservation = get_reservation_by_id(reservation_id, transaction)
+    if reservation is None:
+        return False
+    if nouveau_statut == STATUT_ANNULEE and reservation.statut in STATUTS_ACTIFS:
+        if transaction is None:
+            return annuler_reservations(reservation.id_annonce, [reservation_id]) == 1
+        annonce = get_annonce_by_id(reservation.id_annonce, transaction)
+        if annonce is not None:
+            return _annuler(transaction, annonce, [reservation_id]) == 1
+    reservation.statut = nouveau_statut
+    acces(transaction).upsert_record(RESERVATION_FILE, reservation.to_dict(), key="id_reservation")
+    return True
+
+def mettre_a_jour_statuts_reservations(reservation_ids, nouveau_statut):
+    """
+    Met à jour le statut de plusieurs réservations en une seule écriture
+    (une par annonce en cas d'annulation, voir annuler_reservations).
+
+    Args:
+        reservation_ids (iterable): Les IDs des réservations à mettre à jour.
+        nouveau_statut (str): Le nouveau statut.
+
+    Returns:
+        int: Le nombre de réservations mises à jour.
+    """
+    if nouveau_statut == STATUT_ANNULEE:
+        # Chaque annonce est relue et réécrite une seule fois pour toutes ses réservations annulées
+        par_annonce, nombre = {}, 0
+        for reservation_id in reservation_ids:
+            reservation = get_reservation_by_id(reservation_id)
+            if reservation is None:
+                continue
+            if reservation.statut in STATUTS_ACTIFS:
+                par_annonce.setdefault(reservation.id_annonce, []).append(reservation_id)
+            elif mettre_a_jour_statut_reservation(reservation_id, nouveau_statut):
+                nombre += 1
+        return nombre + sum(annuler_reservations(id_annonce, ids) for id_annonce, ids in par_annonce.items())
+    tx = Transaction()
+    nombre = sum(1 for reservation_id in reservation_ids if mettre_a_jour_statut_reservation(reservation_id, nouveau_statut, tx))
+    tx.commit()
+    return nombre
+
+def mettre_a_jour_statut_reservations_annonce(id_annonce, nouveau_statut, statuts=("en_attente", "confirmee")):
+    """
+    Met à jour le statut de toutes les réservations d'une annonce en une seule écriture
+    (ex: confirmer ou annuler toutes les réservations d'un trajet). En cas d'annulation, les places
+    sont rendues à l'annonce et les historiques mis à jour dans la même écriture (voir annuler_reservations).
 
+    Args:
+        id_annonce (str): L'ID de l'annonce.
+        nouveau_statut (str): Le nouveau statut (ex: 'confirmee', 'annulee').
+        statuts (tuple, optional): Seules les réservations dans l'un de ces statuts sont modifiées.
+            Defaults to ("en_attente", "confirmee").
 
+    Returns:
+        int: Le nombre de réservations mises à jour.
+    """
+    return mettre_a_jour_statuts_reservations(
+        [reservation.id_reservation for reservation in get_reservations_by_annonce(id_annonce) if reservation.statut in statuts],
+        nouveau_statut
+    )
@@ -0,0 +1,581 @@
+import heapq
+import marshal
+import os
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from math import floor, cos, radians
+from backend.distance import calculer_distance_km
+
+# Extrait OpenStreetMap (format XML .osm) du réseau routier, lu localement sans accès réseau
+RESEAU_FILE = "data/reseau_koudougou.osm"
+
+# Vitesses par défaut (km/h) selon le type de voie, utilisées quand maxspeed n'est pas renseigné
+VITESSES_KMH = {
+    "motorway": 90, "trunk": 80, "primary": 60, "secondary": 50, "tertiary": 40,
+    "unclassified": 30, "road": 30, "residential": 25, "service": 15, "track": 15, "living_street": 10,
+}
+# Vitesse utilisée pour rejoindre le réseau depuis un point qui n'est pas sur une route
+VITESSE_ACCES_KMH = 15
+
+# Côté (en degrés) des cellules de la grille de recherche du nœud le plus proche
+PAS_GRILLE = 0.005
+
+def _vitesse(tags):
+    """
+    Vitesse (km/h) d'une voie OSM, ou None si la voie n'est pas carrossable.
+    """
+    highway = tags.get("highway", "")
+    type_voie = highway[:-5] if highway.endswith("_link") else highway
+    if type_voie not in VITESSES_KMH:
+        return None
+    maxspeed = tags.get("maxspeed", "").strip()
+    chiffres = "".join(c for c in maxspeed.split(" ")[0] if c.isdigit())
+    if chiffres:
+        return int(chiffres) * (1.609 if maxspeed.endswith("mph") else 1)
+    return VITESSES_KMH[type_voie]
+
+def _sens(tags):
+    """
+    Sens de circulation d'une voie OSM: 1 (sens du tracé), -1 (sens inverse) ou 0 (double sens).
+    """
+    oneway = tags.get("oneway", "")
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway == "no":
+        return 0
+    return 1 if tags.get("junction") == "roundabout" or tags.get("highway") == "motorway" else 0
+
+def _csr(nb_noeuds, aretes):
+    """
+    Range des arêtes (origine, destination, longueur, durée, données) en tableaux compacts
+    (représentation CSR): les arêtes sortant du nœud u sont aux indices debut[u] à debut[u + 1].
+    """
+    aretes = sorted(aretes, key=lambda arete: arete[0])
+    debut = array("q", [0]) * (nb_noeuds + 1)
+    for arete in aretes:
+        debut[arete[0] + 1] += 1
+    for u in range(nb_noeuds):
+        debut[u + 1] += debut[u]
+    return debut, aretes
+
+class ReseauRoutier:
+    """
+    Graphe orienté du réseau routier stocké en tableaux compacts (CSR): pour chaque nœud, ses
+    arêtes sortantes sont contiguës dans les tableaux cible, longueur (m) et duree (s).
+    Calcule des plus courts chemins (A*, Dijkstra bidirectionnel, ou hiérarchies de contraction
+    après un prétraitement optionnel) en distance ou en durée.
+    """
+    def __init__(self, points, aretes):
+        """
+        Args:
+            points (list): Les nœuds, couples (latitude, longitude).
+            aretes (list): Les arêtes orientées (origine, destination, longueur en m, durée en s),
+                origine et destination étant des indices dans points.
+        """
+        self.lat = array("d", (lat for lat, _ in points))
+        self.lon = array("d", (lon for _, lon in points))
+        n = len(points)
+        self.debut, triees = _csr(n, aretes)
+        self.cible = array("q", (arete[1] for arete in triees))
+        self.longueur = array("d", (arete[2] for arete in triees))
+        self.duree = array("d", (arete[3] for arete in triees))
+        # Graphe inverse (arêtes entrantes) pour la recherche arrière du Dijkstra bidirectionnel
+        self.debut_inv, inverses = _csr(n, [(v, u, l, d) for u, v, l, d, *_ in triees])
+        self.source_inv = array("q", (arete[1] for arete in inverses))
+        self.longueur_inv = array("d", (arete[2] for arete in inverses))
+        self.duree_inv = array("d", (arete[3] for arete in inverses))
+        # Vitesse maximale (m/s), pour l'heuristique admissible de l'A* en durée
+        self.vitesse_max = max((l / d for l, d in zip(self.longueur, self.duree) if d > 0), default=1.0)
+        self.ch = None # Hiérarchie de contraction, construite par contracter()
+        # Grille des nœuds (cellule -> indices) pour l'accrochage d'une position, et ses bornes (cellules extrêmes)
+        self._grille = {}
+        for i, (la, lo) in enumerate(zip(self.lat, self.lon)):
+            self._grille.setdefault((floor(la / PAS_GRILLE), floor(lo / PAS_GRILLE)), []).append(i)
+        if self._grille:
+            self._bornes_grille = (min(i for i, _ in self._grille), max(i for i, _ in self._grille),
+                                   min(j for _, j in self._grille), max(j for _, j in self._grille))
+
+    def __len__(self):
+        return len(self.lat)
+
+    @classmethod
+    def depuis_osm(cls, chemin):
+        """
+        Construit le réseau à partir d'un extrait OpenStreetMap au format XML (.osm).
+        Seules les voies carrossables (tag highway) sont retenues, en respectant les sens uniques.
+
+        Args:
+            chemin (str): Le chemin du fichier .osm.
+
+        Returns:
+            ReseauRoutier: Le réseau construit.
+        """
+        coordonnees = {} # id OSM -> (latitude, longitude)
+        voies = [] # (liste d'id OSM, vitesse en km/h, sens)
+        for _, element in ET.iterparse(chemin, events=("end",)):
+            if element.tag == "node":
+                coordonnees[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+                element.clear()
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                vitesse = _vitesse(tags)
+                if vitesse is not None:
+                    voies.append(([nd.get("ref") for nd in element.iter("nd")], vitesse, _sens(tags)))
+                element.clear()
+
+        indices, points, aretes = {}, [], []
+        def indice(id_osm):
+            if id_osm not in indices:
+                indices[id_osm] = len(points)
+                points.append(coordonnees[id_osm])
+            return indices[id_osm]
+
+        for refs, vitesse, sens in voies:
+            refs = [ref for ref in refs if ref in coordonnees]
+            for a, b in zip(refs, refs[1:]):
+                u, v = indice(a), indice(b)
+                longueur = calculer_distance_km(*points[u], *points[v]) * 1000
+                duree = longueur / (vitesse / 3.6)
+                if sens >= 0:
+                    aretes.append((u, v, longueur, duree))
+                if sens <= 0:
+                    aretes.append((v, u, longueur, duree))
+        return cls(points, aretes)
+
+    # --- Sauvegarde compacte, pour éviter de relire l'extrait OSM à chaque démarrage ---
+
+    def sauvegarder(self, chemin):
+        """
+        Sauvegarde les tableaux du réseau (et la hiérarchie de contraction si elle existe) dans un fichier binaire.
+        """
+        donnees = {nom: getattr(self, nom).tobytes() for nom in ("lat", "lon", "cible", "longueur", "duree")}
+        donnees["debut"] = self.debut.tobytes()
+        donnees["ch"] = self.ch
+        with open(chemin, "wb") as f:
+            marshal.dump(donnees, f)
+
+    @classmethod
+    def charger(cls, chemin):
+        """
+        Charge un réseau sauvegardé par sauvegarder().
+        """
+        with open(chemin, "rb") as f:
+            donnees = marshal.load(f)
+        tableaux = {}
+        for nom, code in (("lat", "d"), ("lon", "d"), ("cible", "q"), ("longueur", "d"), ("duree", "d"), ("debut", "q")):
+            tableaux[nom] = array(code)
+            tableaux[nom].frombytes(donnees[nom])
+        debut = tableaux["debut"]
+        aretes = [(u, tableaux["cible"][i], tableaux["longueur"][i], tableaux["duree"][i])
+                  for u in range(len(debut) - 1) for i in range(debut[u], debut[u + 1])]
+        reseau = cls(list(zip(tableaux["lat"], tableaux["lon"])), aretes)
+        reseau.ch = donnees["ch"]
+        return reseau
+
+    # --- Accrochage d'une position au réseau ---
+
+    def noeud_le_plus_proche(self, lat, lon):
+        """
+        Retourne l'indice du nœud le plus proche d'une position (None si le réseau est vide).
+        """
+        if not self._grille:
+            return None
+        ci, cj = floor(lat / PAS_GRILLE), floor(lon / PAS_GRILLE)
+        # Au-delà de cet anneau, toutes les cellules occupées ont été examinées
+        i_min, i_max, j_min, j_max = self._bornes_grille
+        r_max = max(ci - i_min, i_max - ci, cj - j_min, j_max - cj)
+        meilleur = None
+        for r in range(r_max + 1):
+            for i in range(ci - r, ci + r + 1):
+                pas_j = 1 if i in (ci - r, ci + r) else 2 * r
+                for j in range(cj - r, cj + r + 1, pas_j):
+                    for noeud in self._grille.get((i, j), ()):
+                        distance = calculer_distance_km(lat, lon, self.lat[noeud], self.lon[noeud])
+                        if meilleur is None or distance < meilleur[0]:
+                            meilleur = (distance, noeud)
+            # Les cellules au-delà de l'anneau r sont à au moins r cellules (en latitude ou en longitude)
+            borne_km = r * PAS_GRILLE * 111.195 * cos(radians(min(abs(lat) + (r + 1) * PAS_GRILLE, 90.0)))
+            if meilleur is not None and meilleur[0] <= borne_km:
+                break
+        return meilleur[1]
+
+    # --- Plus courts chemins ---
+
+    def _poids(self, critere, inverse=False):
+        if critere not in ("duree", "distance"):
+            raise ValueError(f"Critère inconnu: {critere}")
+        if inverse:
+            return self.duree_inv if critere == "duree" else self.longueur_inv
+        return self.duree if critere == "duree" else self.longueur
+
+    def _heuristique(self, cible, critere):
+        lat_c, lon_c = self.lat[cible], self.lon[cible]
+        facteur = 1000.0 / self.vitesse_max if critere == "duree" else 1000.0
+        return lambda n: calculer_distance_km(self.lat[n], self.lon[n], lat_c, lon_c) * facteur
+
+    def astar(self, source, cible, critere="duree"):
+        """
+        Plus court chemin par A* (heuristique: distance à vol d'oiseau, divisée par la vitesse maximale en durée).
+
+        Returns:
+            tuple: (coût, liste des nœuds du chemin), ou None si la cible n'est pas atteignable.
+        """
+        poids = self._poids(critere)
+        h = self._heuristique(cible, critere)
+        couts = {source: 0.0}
+        parents = {source: None}
+        file = [(h(source), source)]
+        fermes = set()
+        while file:
+            _, u = heapq.heappop(file)
+            if u in fermes:
+                continue
+            if u == cible:
+                return couts[u], self._remonter(parents, cible)
+            fermes.add(u)
+            for i in range(self.debut[u], self.debut[u + 1]):
+                v = self.cible[i]
+                cout = couts[u] + poids[i]
+                if cout < couts.get(v, float("inf")):
+                    couts[v] = cout
+                    parents[v] = u
+                    heapq.heappush(file, (cout + h(v), v))
+        return None
+
+    def dijkstra_bidirectionnel(self, source, cible, critere="duree"):
+        """
+        Plus court chemin par Dijkstra bidirectionnel (recherche avant depuis la source et
+        arrière depuis la cible, arrêtée quand les deux fronts ne peuvent plus améliorer le meilleur chemin).
+
+        Returns:
+            tuple: (coût, liste des nœuds du chemin), ou None si la cible n'est pas atteignable.
+        """
+        if source == cible:
+            return 0.0, [source]
+        cotes = (
+            (self.debut, self.cible, self._poids(critere)),
+            (self.debut_inv, self.source_inv, self._poids(critere, inverse=True)),
+        )
+        couts = ({source: 0.0}, {cible: 0.0})
+        parents = ({source: None}, {cible: None})
+        files = ([(0.0, source)], [(0.0, cible)])
+        fermes = (set(), set())
+        meilleur, rencontre = float("inf"), None
+        while files[0] and files[1]:
+            if files[0][0][0] + files[1][0][0] >= meilleur:
+                break
+            sens = 0 if files[0][0][0] <= files[1][0][0] else 1
+            cout_u, u = heapq.heappop(files[sens])
+            if u in fermes[sens]:
+                continue
+            fermes[sens].add(u)
+            debut, voisins, poids = cotes[sens]
+            for i in range(debut[u], debut[u + 1]):
+                v = voisins[i]
+                cout = cout_u + poids[i]
+                if cout < couts[sens].get(v, float("inf")):
+                    couts[sens][v] = cout
+                    parents[sens][v] = u
+                    heapq.heappush(files[sens], (cout, v))
+                if v in couts[1 - sens] and cout + couts[1 - sens][v] < meilleur:
+                    meilleur, rencontre = cout + couts[1 - sens][v], v
+        if rencontre is None:
+            return None
+        avant = self._remonter(parents[0], rencontre)
+        arriere = self._remonter(parents[1], rencontre)
+        return meilleur, avant + arriere[-2::-1]
+
+    @staticmethod
+    def _remonter(parents, noeud):
+        chemin = []
+        while noeud is not None:
+            chemin.append(noeud)
+            noeud = parents[noeud]
+        return chemin[::-1]
+
+    # --- Hiérarchies de contraction (prétraitement optionnel) ---
+
+    def contracter(self, critere="duree", voisins_temoins=60):
+        """
+        Prétraite le réseau en hiérarchie de contraction: les nœuds sont retirés un à un (les moins
+        importants d'abord) en ajoutant des raccourcis qui préservent les plus courts chemins.
+        Les requêtes (plus_court_chemin) n'explorent ensuite que des arêtes montantes et prennent
+        quelques millisecondes.
+
+        Args:
+            critere (str, optional): "duree" ou "distance". Defaults to "duree".
+            voisins_temoins (int, optional): Nombre maximal de nœuds explorés par recherche de chemin témoin. Defaults to 60.
+        """
+        n = len(self)
+        poids = self._poids(critere)
+        sortants = [dict() for _ in range(n)] # u -> {v: (poids, milieu)}
+        entrants = [dict() for _ in range(n)]
+        for u in range(n):
+            for i in range(self.debut[u], self.debut[u + 1]):
+                v = self.cible[i]
+                if v != u and poids[i] < sortants[u].get(v, (float("inf"),))[0]:
+                    sortants[u][v] = entrants[v][u] = (poids[i], -1)
+
+        def raccourcis(v):
+            ajouts = []
+            for u, (poids_uv, _) in entrants[v].items():
+                if not sortants[v]:
+                    break
+                limite = poids_uv + max(p for p, _ in sortants[v].values())
+                # Recherche de chemins témoins depuis u, sans passer par v
+                couts, file, explores = {u: 0.0}, [(0.0, u)], 0
+                while file and explores < voisins_temoins:
+                    cout_x, x = heapq.heappop(file)
+                    if cout_x > limite:
+                        break
+                    if cout_x > couts.get(x, float("inf")):
+                        continue
+                    explores += 1
+                    for y, (p, _) in sortants[x].items():
+                        if y != v and cout_x + p < couts.get(y, float("inf")):
+                            couts[y] = cout_x + p
+                            heapq.heappush(file, (cout_x + p, y))
+                for w, (poids_vw, _) in sortants[v].items():
+                    if w != u and poids_uv + poids_vw < couts.get(w, float("inf")):
+                        ajouts.append((u, w, poids_uv + poids_vw))
+            return ajouts
+
+        contractes = [0] * n # Nombre de voisins déjà contractés (répartit la contraction dans le graphe)
+        def priorite(v):
+            return len(raccourcis(v)) - len(entrants[v]) - len(sortants[v]) + contractes[v]
+
+        file = [(priorite(v), v) for v in range(n)]
+        heapq.heapify(file)
+        rang = [0] * n
+        montants_avant = [[] for _ in range(n)] # v -> [(w, poids, milieu)] avec rang[w] > rang[v]
+        montants_arriere = [[] for _ in range(n)] # v -> [(u, poids, milieu)] pour les arêtes u -> v, rang[u] > rang[v]
+        ordre = 0
+        while file:
+            _, v = heapq.heappop(file)
+            nouvelle = priorite(v)
+            if file and nouvelle > file[0][0]:
+                heapq.heappush(file, (nouvelle, v)) # Priorité périmée: réinsérer
+                continue
+            rang[v] = ordre
+            ordre += 1
+            for u, w, p in raccourcis(v):
+                if p < sortants[u].get(w, (float("inf"),))[0]:
+                    sortants[u][w] = entrants[w][u] = (p, v)
+            for w, (p, milieu) in sortants[v].items():
+                montants_avant[v].append((w, p, milieu))
+                del entrants[w][v]
+                contractes[w] += 1
+            for u, (p, milieu) in entrants[v].items():
+                montants_arriere[v].append((u, p, milieu))
+                del sortants[u][v]
+                contractes[u] += 1
+            sortants[v], entrants[v] = {}, {}
+
+        milieux = {}
+        for v in range(n):
+            for w, _, milieu in montants_avant[v]:
+                if milieu >= 0:
+                    milieux[(v, w)] = milieu
+            for u, _, milieu in montants_arriere[v]:
+                if milieu >= 0:
+                    milieux[(u, v)] = milieu
+        self.ch = {
+            "critere": critere,
+            "avant": [[(w, p) for w, p, _ in aretes] for aretes in montants_avant],
+            "arriere": [[(u, p) for u, p, _ in aretes] for aretes in montants_arriere],
+            "milieux": milieux,
+        }
+
+    def _requete_ch(self, source, cible):
+        graphes = (self.ch["avant"], self.ch["arriere"])
+        couts = ({source: 0.0}, {cible: 0.0})
+        parents = ({source: None}, {cible: None})
+        files = ([(0.0, source)], [(0.0, cible)])
+        meilleur, rencontre = (0.0, source) if source == cible else (float("inf"), None)
+        while files[0] or files[1]:
+            for sens in (0, 1):
+                if not files[sens]:
+                    continue
+                cout_u, u = heapq.heappop(files[sens])
+                if cout_u >= meilleur:
+                    files[sens].clear() # Ce front ne peut plus améliorer le meilleur chemin
+                    continue
+                if cout_u > couts[sens][u]:
+                    continue
+                if u in couts[1 - sens] and cout_u + couts[1 - sens][u] < meilleur:
+                    meilleur, rencontre = cout_u + couts[1 - sens][u], u
+                for v, p in graphes[sens][u]:
+                    if cout_u + p < couts[sens].get(v, float("inf")):
+                        couts[sens][v] = cout_u + p
+                        parents[sens][v] = u
+                        heapq.heappush(files[sens], (cout_u + p, v))
+        if rencontre is None:
+            return None
+        # Remonter les deux demi-chemins puis développer les raccourcis
+        avant = self._remonter(parents[0], rencontre)
+        arriere = self._remonter(parents[1], rencontre)[::-1]
+        noeuds = avant + arriere[1:]
+        chemin = [noeuds[0]]
+        for u, w in zip(noeuds, noeuds[1:]):
+            chemin.extend(self._developper(u, w)[1:])
+        return meilleur, chemin
+
+    def _developper(self, u, w):
+        milieu = self.ch["milieux"].get((u, w))
+        if milieu is None:
+            return [u, w]
+        return self._developper(u, milieu) + self._developper(milieu, w)[1:]
+
+    def plus_court_chemin(self, source, cible, critere="duree"):
+        """
+        Plus court chemin entre deux nœuds: hiérarchie de contraction si elle a été construite
+        pour ce critère, Dijkstra bidirectionnel sinon.
+
+        Returns:
+            tuple: (coût, liste des nœuds du chemin), ou None si la cible n'est pas atteignable.
+        """
+        if self.ch is not None and self.ch["critere"] == critere:
+            return self._requete_ch(source, cible)
+        return self.dijkstra_bidirectionnel(source, cible, critere)
+
+    def _arete(self, u, v, critere):
+        poids = self._poids(critere)
+        return min((i for i in range(self.debut[u], self.debut[u + 1]) if self.cible[i] == v), key=lambda i: poids[i])
+
+    def itineraire(self, lat1, lon1, lat2, lon2, critere="duree"):
+        """
+        Calcule l'itinéraire routier entre deux positions, accrochées aux nœuds les plus proches du réseau.
+
+        Args:
+            lat1 (float): Latitude du départ.
+            lon1 (float): Longitude du départ.
+            lat2 (float): Latitude de l'arrivée.
+            lon2 (float): Longitude de l'arrivée.
+            critere (str, optional): "duree" (le plus rapide) ou "distance" (le plus court). Defaults to "duree".
+
+        Returns:
+            dict: {"distance_km", "duree_min", "polyline": [(latitude, longitude)]}, ou None si aucun chemin n'existe.
+        """
+        source, cible = self.noeud_le_plus_proche(lat1, lon1), self.noeud_le_plus_proche(lat2, lon2)
+        if source is None or cible is None:
+            return None
+        resultat = self.plus_court_chemin(source, cible, critere)
+        if resultat is None:
+            return None
+        _, noeuds = resultat
+        distance_m = duree_s = 0.0
+        for u, v in zip(noeuds, noeuds[1:]):
+            i = self._arete(u, v, critere)
+            distance_m += self.longueur[i]
+            duree_s += self.duree[i]
+        # Trajets d'accès entre les positions et le réseau
+        acces_km = (calculer_distance_km(lat1, lon1, self.lat[source], self.lon[source])
+                    + calculer_distance_km(self.lat[cible], self.lon[cible], lat2, lon2))
+        polyline = [(lat1, lon1)] + [(self.lat[n], self.lon[n]) for n in noeuds] + [(lat2, lon2)]
+        return {
+            "distance_km": distance_m / 1000 + acces_km,
+            "duree_min": duree_s / 60 + acces_km / VITESSE_ACCES_KMH * 60,
+            "polyline": polyline,
+        }
+
+    def couts_vers(self, lat, lon, points, critere="duree"):
+        """
+        Calcule en une seule recherche les trajets de plusieurs positions vers une même destination:
+        un Dijkstra sur le graphe inverse depuis la destination, arrêté quand toutes les positions
+        sont atteintes.
+
+        Args:
+            lat (float): Latitude de la destination.
+            lon (float): Longitude de la destination.
+            points (list): Les positions de départ, couples (latitude, longitude).
+            critere (str, optional): "duree" (le plus rapide) ou "distance" (le plus court). Defaults to "duree".
+
+        Returns:
+            list: Pour chaque position, un couple (distance en km, durée en minutes), ou None si elle n'atteint pas la destination.
+        """
+        cible = self.noeud_le_plus_proche(lat, lon)
+        if cible is None:
+            return [None] * len(points)
+        sources = [self.noeud_le_plus_proche(la, lo) for la, lo in points]
+        poids = self._poids(critere, inverse=True)
+        # Coût selon le critère, puis distance (m) et durée (s) le long du chemin retenu
+        couts = {cible: (0.0, 0.0, 0.0)}
+        restants = set(sources)
+        file = [(0.0, cible)]
+        fermes = set()
+        while file and restants:
+            cout_u, u = heapq.heappop(file)
+            if u in fermes:
+                continue
+            fermes.add(u)
+            restants.discard(u)
+            _, longueur_u, duree_u = couts[u]
+            for i in range(self.debut_inv[u], self.debut_inv[u + 1]):
+                v = self.source_inv[i]
+                cout = cout_u + poids[i]
+                if cout < couts.get(v, (float("inf"),))[0]:
+                    couts[v] = (cout, longueur_u + self.longueur_inv[i], duree_u + self.duree_inv[i])
+                    heapq.heappush(file, (cout, v))
+        acces_cible_km = calculer_distance_km(self.lat[cible], self.lon[cible], lat, lon)
+        resultats = []
+        for (la, lo), source in zip(points, sources):
+            if source not in fermes:
+                resultats.append(None)
+                continue
+            _, longueur, duree = couts[source]
+            acces_km = acces_cible_km + calculer_distance_km(la, lo, self.lat[source], self.lon[source])
+            resultats.append((longueur / 1000 + acces_km, duree / 60 + acces_km / VITESSE_ACCES_KMH * 60))
+        return resultats
+
+# --- Réseau de l'application, chargé une seule fois ---
+
+_reseau = None
+_reseau_charge = False
+_verrou = threading.Lock()
+
+def charger_reseau(chemin=RESEAU_FILE):
+    """
+    Charge le réseau routier local (une seule fois par processus). Une version compacte
+    (fichier .graphe) est enregistrée à côté de l'extrait OSM pour accélérer les chargements suivants.
+
+    Args:
+        chemin (str, optional): Le chemin de l'extrait OSM. Defaults to RESEAU_FILE.
+
+    Returns:
+        ReseauRoutier: Le réseau, ou None si l'extrait OSM est absent.
+    """
+    global _reseau, _reseau_charge
+    with _verrou:
+        if _reseau_charge:
+            return _reseau
+        _reseau_charge = True
+        compact = chemin + ".graphe"
+        if os.path.exists(compact) and (not os.path.exists(chemin) or os.path.getmtime(compact) >= os.path.getmtime(chemin)):
+            _reseau = ReseauRoutier.charger(compact)
+        elif os.path.exists(chemin):
+            _reseau = ReseauRoutier.depuis_osm(chemin)
+            _reseau.sauvegarder(compact)
+        return _reseau
+
+def utiliser_reseau(reseau):
+    """
+    Remplace le réseau de l'application (ex: réseau prétraité par contracter(), ou réseau de test).
+    """
+    global _reseau, _reseau_charge
+    with _verrou:
+        _reseau, _reseau_charge = reseau, True
+
+def calculer_itineraire(lat1, lon1, lat2, lon2, critere="duree"):
+    """
+    Calcule l'itinéraire routier entre deux positions avec le réseau local.
+
+    Returns:
+        dict: {"distance_km", "duree_min", "polyline"}, ou None si le réseau est absent ou si aucun chemin n'existe.
+    """
+    reseau = charger_reseau()
+    if reseau is None:
+        return None
+    return reseau.itineraire(lat1, lon1, lat2, lon2, critere)
@@ -0,0 +1,272 @@
+import heapq
+from datetime import datetime
+from math import cos, radians, floor
+from backend.distance import distances_depuis_point, PointsPrepares
+from backend.models.annonce import ANNONCES_FILE, get_annonce_by_id
+from stockage import declare_derived_index, query_derived_index
+
+# Longueur d'un degré de latitude en kilomètres
+KM_PAR_DEGRE = 111.195
+
+# Taille (en kilomètres) du côté des cellules de la grille
+TAILLE_CELLULE_KM = 1.0
+
+# Statuts des annonces encore ouvertes à la réservation
+STATUTS_OUVERTS = ("en_attente",)
+
+class Grille:
+    """
+    Index spatial par grille uniforme de positions, partitionné (ex: par université de destination).
+    Les enregistrements indexés sont décrits par trois fonctions: leur clé, leur position
+    (latitude, longitude), ou None pour ne pas les indexer, et leur partition.
+    Une recherche n'examine que les cellules proches du point demandé: son coût dépend
+    du nombre de positions autour de ce point et non du nombre total de positions.
+    """
+    def __init__(self, cle, position, partition=lambda record: None, taille_cellule_km=TAILLE_CELLULE_KM):
+        """
+        Args:
+            cle (callable): Retourne la clé d'un enregistrement (identifiant retourné par les recherches).
+            position (callable): Retourne la position (latitude, longitude) d'un enregistrement, ou None.
+            partition (callable, optional): Retourne la partition d'un enregistrement. Defaults to aucune partition.
+            taille_cellule_km (float, optional): Le côté des cellules en kilomètres. Defaults to TAILLE_CELLULE_KM.
+        """
+        self.pas = taille_cellule_km / KM_PAR_DEGRE # Côté des cellules en degrés
+        self.cle, self.position, self.partition = cle, position, partition
+        self.positions = {} # Clé -> (latitude, longitude, partition, cellule)
+        self.cellules = {} # Partition -> {cellule: ensemble de clés}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cellule(self, lat, lon):
+        return (floor(lat / self.pas), floor(lon / self.pas))
+
+    def add(self, record):
+        """
+        Indexe un enregistrement s'il a une position.
+        """
+        position = self.position(record)
+        if position is None:
+            return
+        lat, lon = position
+        cle, partition, cellule = self.cle(record), self.partition(record), self.cellule(lat, lon)
+        self.positions[cle] = (lat, lon, partition, cellule)
+        self.cellules.setdefault(partition, {}).setdefault(cellule, set()).add(cle)
+
+    def discard(self, record):
+        """
+        Retire un enregistrement de l'index (sans effet s'il n'y est pas).
+        """
+        cle = self.cle(record)
+        entree = self.positions.pop(cle, None)
+        if entree is None:
+            return
+        _, _, partition, cellule = entree
+        grille = self.cellules[partition]
+        grille[cellule].discard(cle)
+        if not grille[cellule]:
+            del grille[cellule]
+            if not grille:
+                del self.cellules[partition]
+
+    def _grilles(self, partition):
+        if partition is None:
+            return list(self.cellules.values())
+        grille = self.cellules.get(partition)
+        return [grille] if grille else []
+
+    def _distances(self, lat, lon, ids, filtre=None):
+        """
+        Calcule en un seul appel par lot les distances entre le point et les positions données
+        (celles retenues par le filtre, s'il est fourni).
+        """
+        ids = list(ids) if filtre is None else [cle for cle in ids if filtre(cle)]
+        points = PointsPrepares(self.positions[cle][:2] for cle in ids)
+        return zip(distances_depuis_point(lat, lon, points), ids)
+
+    def _anneau(self, grilles, centre, r):
+        """
+        Retourne les clés des cellules situées exactement à r cellules du centre.
+        """
+        ci, cj = centre
+        ids = []
+        for grille in grilles:
+            if r == 0:
+                ids.extend(grille.get(centre, ()))
+                continue
+            for i in range(ci - r, ci + r + 1):
+                pas_j = 1 if i in (ci - r, ci + r) else 2 * r
+                for j in range(cj - r, cj + r + 1, pas_j):
+                    ids.extend(grille.get((i, j), ()))
+        return ids
+
+    def plus_proches(self, lat, lon, k, partition=None, filtre=None):
+        """
+        Recherche les k positions les plus proches du point donné.
+        Les anneaux de cellules sont parcourus du centre vers l'extérieur jusqu'à ce qu'aucune
+        cellule non visitée ne puisse contenir une position plus proche que la k-ième trouvée.
+
+        Args:
+            lat (float): Latitude du point en degrés.
+            lon (float): Longitude du point en degrés.
+            k (int): Le nombre maximal de positions à retourner.
+            partition (any, optional): Ne chercher que dans cette partition (ex: une université). Defaults to None.
+            filtre (callable, optional): Ne retenir que les clés pour lesquelles il retourne True. Defaults to None.
+
+        Returns:
+            list: Des couples (distance en km, clé), du plus proche au plus éloigné.
+        """
+        grilles = self._grilles(partition)
+        nb_cellules = sum(len(grille) for grille in grilles)
+        if k <= 0 or nb_cellules == 0:
+            return []
+        centre = self.cellule(lat, lon)
+        meilleurs = [] # Tas des k meilleurs candidats: (-distance, cle)
+        r = 0
+        visitees = 0
+        while True:
+            if 8 * r >= nb_cellules - visitees:
+                # Parcourir les anneaux coûterait plus cher que d'examiner les cellules restantes
+                ids = [cle for grille in grilles for cellule, contenu in grille.items()
+                       if max(abs(cellule[0] - centre[0]), abs(cellule[1] - centre[1])) >= r for cle in contenu]
+                self._retenir(meilleurs, k, self._distances(lat, lon, ids, filtre))
+                break
+            ids = self._anneau(grilles, centre, r)
+            visitees += 1 if r == 0 else 8 * r
+            self._retenir(meilleurs, k, self._distances(lat, lon, ids, filtre))
+            # Toute cellule au-delà de l'anneau r est à au moins r cellules (en latitude ou en longitude)
+            borne_km = r * self.pas * KM_PAR_DEGRE * max(cos(radians(min(abs(lat) + (r + 1) * self.pas, 90.0))), 0.0)
+            if len(meilleurs) == k and -meilleurs[0][0] <= borne_km:
+                break
+            r += 1
+        return sorted((-distance, cle) for distance, cle in meilleurs)
+
+    @staticmethod
+    def _retenir(meilleurs, k, candidats):
+        for distance, cle in candidats:
+            if len(meilleurs) < k:
+                heapq.heappush(meilleurs, (-distance, cle))
+            elif distance < -meilleurs[0][0]:
+                heapq.heapreplace(meilleurs, (-distance, cle))
+
+    def dans_rayon(self, lat, lon, rayon_km, partition=None, filtre=None):
+        """
+        Recherche les positions à moins de rayon_km du point donné.
+
+        Args:
+            lat (float): Latitude du point en degrés.
+            lon (float): Longitude du point en degrés.
+            rayon_km (float): Le rayon de recherche en kilomètres.
+            partition (any, optional): Ne chercher que dans cette partition (ex: une université). Defaults to None.
+            filtre (callable, optional): Ne retenir que les clés pour lesquelles il retourne True. Defaults to None.
+
+        Returns:
+            list: Des couples (distance en km, clé), du plus proche au plus éloigné.
+        """
+        grilles = self._grilles(partition)
+        ci, cj = self.cellule(lat, lon)
+        di = int(rayon_km / (self.pas * KM_PAR_DEGRE)) + 1
+        cos_lat = max(cos(radians(min(abs(lat) + (di + 1) * self.pas, 90.0))), 1e-6)
+        dj = int(rayon_km / (self.pas * KM_PAR_DEGRE * cos_lat)) + 1
+        ids = []
+        for grille in grilles:
+            if (2 * di + 1) * (2 * dj + 1) > len(grille):
+                # Rayon plus grand que la zone occupée: examiner directement les cellules occupées
+                ids.extend(cle for (i, j), contenu in grille.items()
+                           if abs(i - ci) <= di and abs(j - cj) <= dj for cle in contenu)
+            else:
+                for i in range(ci - di, ci + di + 1):
+                    for j in range(cj - dj, cj + dj + 1):
+                        ids.extend(grille.get((i, j), ()))
+        return sorted((distance, cle) for distance, cle in self._distances(lat, lon, ids, filtre)
+                      if distance <= rayon_km)
+
+class GrilleSpatiale(Grille):
+    """
+    Grille des positions de départ des annonces ouvertes (statut ouvert et places disponibles),
+    partitionnée par université de destination. Le départ prévu de chaque annonce est conservé:
+    une annonce dont le départ est passé reste indexée, mais est écartée des recherches (voir a_venir).
+    """
+    def __init__(self, taille_cellule_km=TAILLE_CELLULE_KM, statuts=STATUTS_OUVERTS):
+        """
+        Args:
+            taille_cellule_km (float, optional): Le côté des cellules en kilomètres. Defaults to TAILLE_CELLULE_KM.
+            statuts (tuple, optional): Les statuts des annonces indexées. Defaults to STATUTS_OUVERTS.
+        """
+        super().__init__(lambda record: record.get("id_annonce"), self._depart_ouvert,
+                         lambda record: record.get("universite_destination"), taille_cellule_km)
+        self.statuts = statuts
+        self.departs = {} # Identifiant d'annonce -> départ prévu (ISO), pour les annonces indexées
+
+    def add(self, record):
+        super().add(record)
+        cle = self.cle(record)
+        if cle in self.positions:
+            self.departs[cle] = record.get("depart_prevu")
+
+    def discard(self, record):
+        super().discard(record)
+        self.departs.pop(self.cle(record), None)
+
+    def a_venir(self, maintenant):
+        """
+        Filtre des recherches: ne retient que les annonces dont le départ prévu n'est pas passé
+        (ou inconnu).
+
+        Args:
+            maintenant (str): L'instant de la recherche au format ISO.
+        """
+        return lambda cle: (self.departs.get(cle) or maintenant) >= maintenant
+
+    def _depart_ouvert(self, record):
+        position = record.get("position_depart")
+        if (record.get("statut") not in self.statuts or record.get("places_disponibles", 0) <= 0
+                or not position or position.get("latitude") is None or position.get("longitude") is None):
+            return None
+        return position["latitude"], position["longitude"]
+
+# L'index est construit par le stockage à la première recherche, puis tenu à jour à chaque
+# écriture d'annonce (publication, réservation, fin de trajet, suppression)
+declare_derived_index(ANNONCES_FILE, "departs", GrilleSpatiale)
+
+def _annonces(resultats):
+    annonces = []
+    for distance, id_annonce in resultats:
+        annonce = get_annonce_by_id(id_annonce)
+        if annonce is not None:
+            annonces.append((annonce, distance))
+    return annonces
+
+def annonces_les_plus_proches(lat, lon, k, universite=None):
+    """
+    Recherche les k annonces ouvertes, au départ à venir, dont le départ est le plus proche d'un point.
+
+    Args:
+        lat (float): Latitude du point en degrés.
+        lon (float): Longitude du point en degrés.
+        k (int): Le nombre maximal d'annonces.
+        universite (str, optional): Ne chercher que les annonces vers cette université. Defaults to None.
+
+    Returns:
+        list: Des couples (objet Annonce, distance en km), du plus proche au plus éloigné.
+    """
+    maintenant = datetime.now().isoformat(timespec="seconds")
+    return _annonces(query_derived_index(ANNONCES_FILE, "departs",
+                                         lambda grille: grille.plus_proches(lat, lon, k, universite, grille.a_venir(maintenant))))
+
+def annonces_dans_rayon(lat, lon, rayon_km, universite=None):
+    """
+    Recherche les annonces ouvertes, au départ à venir, dont le départ est à moins de rayon_km d'un point.
+
+    Args:
+        lat (float): Latitude du point en degrés.
+        lon (float): Longitude du point en degrés.
+        rayon_km (float): Le rayon de recherche en kilomètres.
+        universite (str, optional): Ne chercher que les annonces vers cette université. Defaults to None.
+
+    Returns:
+        list: Des couples (objet Annonce, distance en km), du plus proche au plus éloigné.
+    """
+    maintenant = datetime.now().isoformat(timespec="seconds")
+    return _annonces(query_derived_index(ANNONCES_FILE, "departs",
+                                         lambda grille: grille.dans_rayon(lat, lon, rayon_km, universite, grille.a_venir(maintenant))))
@@ -1,11 +1,14 @@
 import json
 import os
+import random
+import time
 from datetime import datetime, timedelta
 from backend.distance import calculer_distance_km
 from backend.universites import get_coordonnees_universite
 from backend.users import get_user_by_email, update_user_points
-from backend.models.annonce import Annonce, get_all_annonces, add_annonce, update_annonce, delete_annonce, get_annonce_by_id
-from stockage import load_historiques, save_historiques
+from backend.models.annonce import Annonce, get_all_annonces, add_annonce, update_annonce, get_annonce_by_id, find_annonces_par_depart
+from backend.reservations import reserver
+from stockage import ANNONCES_FILE, HISTORIQUES_FILE, Transaction, ConflitEcriture, load_historiques, set_historique
 
 # Constantes pour les états de trajet
 EN_ATTENTE = "en_attente"
@@ -13,12 +16,58 @@ EN_COURS = "en_cours"
 TERMINE = "termine"
 ANNULE = "annule"
 
+# Nombre maximal d\"essais d\"une fin ou d\"une notation de trajet en cas d\"écritures concurrentes
+TENTATIVES_TRAJET = 50
+
 # --- Fonctions de gestion de l\"historique utilisateur (agrégé) ---
 
 
 # --- Fonctions de gestion des trajets (basées sur les Annonces) ---
 
-def publier_trajet(email_automobiliste, universite, heure_depart_str, places_disponibles, latitude_depart, longitude_depart):
+def _destination_et_distance(universite, latitude_depart, longitude_depart):
+    """
+    Calcule la position de l\"université de destination et sa distance au point de départ.
+
+    Returns:
+        tuple: (dict {latitude, longitude}, float) ou (None, None) si l\"université ou le départ est inconnu.
+    """
+    coords_univ = get_coordonnees_universite(universite)
+    if coords_univ is None or latitude_depart is None or longitude_depart is None:
+        return None, None
+    latitude_univ, longitude_univ = coords_univ
+    distance = calculer_distance_km(latitude_depart, longitude_depart, latitude_univ, longitude_univ)
+    return {"latitude": latitude_univ, "longitude": longitude_univ}, distance
+
+def completer_distances_annonces():
+    """
+    Complète les annonces publiées avant l\"enregistrement de la destination et de la distance
+    départ-université. Toutes les annonces complétées sont écrites en une seule fois.
+    Si l\"une d\"elles est modifiée entre-temps, rien n\"est écrit: elles seront complétées à l\"appel suivant.
+
+    Returns:
+        int: Le nombre d\"annonces complétées.
+    """
+    tx = Transaction()
+    completees = 0
+    for annonce in get_all_annonces():
+        if annonce.distance_universite_km is not None or not annonce.position_depart:
+            continue
+        position_destination, distance = _destination_et_distance(
+            annonce.universite_destination, annonce.position_depart.get("latitude"), annonce.position_depart.get("longitude"))
+        if distance is None:
+            continue
+        annonce.position_destination = position_destination
+        annonce.distance_universite_km = distance
+        update_annonce(annonce, tx)
+        completees += 1
+    if completees:
+        try:
+            tx.commit()
+        except ConflitEcriture:
+            return 0
+    return completees
+
+def publier_trajet(email_automobiliste, universite, heure_depart_str, places_disponibles, latitude_depart, longitude_depart, date_depart=None):
     """
     Permet à un automobiliste de publier une nouvelle annonce de trajet.
     Cette fonction crée une nouvelle instance de la classe Annonce et la sauvegarde.
@@ -30,6 +79,8 @@ def publier_trajet(email_automobiliste, universite, heure_depart_str, places_dis
         places_disponibles (int): Le nombre de places offertes par l\"automobiliste.
         latitude_depart (float): Latitude du point de départ de l\"automobiliste.
         longitude_depart (float): Longitude du point de départ de l\"automobiliste.
+        date_depart (date, optional): Le jour du départ. Si None, le jour de la publication, ou le lendemain
+            si l\"heure de départ est déjà passée. Defaults to None.
 
     Returns:
         tuple: (bool, str, str) - True si la publication est réussie, False sinon, avec un message et l\"ID de l\"annonce.
@@ -40,6 +91,15 @@ def publier_trajet(email_automobiliste, universite, heure_depart_str, places_dis
         if not automobiliste or automobiliste.role != "automobiliste":
             return False, "Seul un automobiliste peut publier un trajet.", None
 
+        # Le départ complet est calculé une seule fois, à la publication
+        depart_prevu = None
+        if date_depart is not None:
+            heure = datetime.strptime(heure_depart_str, "%H:%M").time()
+            depart_prevu = datetime.combine(date_depart, heure).isoformat(timespec="seconds")
+
+        # La destination et la distance départ-université sont calculées une seule fois, à la publication
+        position_destination, distance_universite_km = _destination_et_distance(universite, latitude_depart, longitude_depart)
+
         # Création de l\"objet Annonce
         nouvelle_annonce = Annonce(
             id_automobiliste=email_automobiliste,
@@ -48,7 +108,10 @@ def publier_trajet(email_automobiliste, universite, heure_depart_str, places_dis
             places_offertes=places_disponibles,
             engin=automobiliste.engin, # Récupérer l\"engin de l\"automobiliste
             position_depart={"latitude": latitude_depart, "longitude": longitude_depart},
-            statut=EN_ATTENTE # Définir explicitement le statut à EN_ATTENTE
+            statut=EN_ATTENTE, # Définir explicitement le statut à EN_ATTENTE
+            depart_prevu=depart_prevu,
+            position_destination=position_destination,
+            distance_universite_km=distance_universite_km
         )
         add_annonce(nouvelle_annonce)
 
@@ -72,68 +135,9 @@ def reserver_trajet(annonce_id, email_passager, lat_passager, lon_passager):
     Returns:
         tuple: (bool, str) - True si la réservation est réussie, False sinon, avec un message.
     """
-    annonce = get_annonce_by_id(annonce_id)
-    if not annonce:
-        return False, "Annonce non trouvée."
-
-    if annonce.places_disponibles <= 0:
-        return False, "Plus de places disponibles sur cette annonce."
-
-    # Vérifier si le passager a déjà réservé cette annonce
-    if email_passager in annonce.passagers_reserves:
-        return False, "Vous avez déjà réservé ce trajet."
-
-    # Mettre à jour l\"annonce
-    annonce.places_disponibles -= 1
-    annonce.passagers_reserves.append(email_passager)
-    annonce.has_reservations = True # Marquer l\"annonce comme ayant eu au moins une réservation
-    update_annonce(annonce)
-
-    # Enregistrer la réservation dans l\"historique du passager
-    historiques = load_historiques()
-    if email_passager not in historiques:
-        historiques[email_passager] = {}
-    
-    # Ajouter le trajet à l\"historique du passager
-    historiques[email_passager][annonce.id_annonce] = {
-        "id": annonce.id_annonce,
-        "role": "passager",
-        "universite": annonce.universite_destination,
-        "heure_depart": annonce.heure_depart,
-        "etat": EN_ATTENTE, # Le trajet est en attente de confirmation par l\"automobiliste
-        "points": 0, # Les passagers ne gagnent pas de points
-        "notes_moyenne": "N/A",
-        "automobiliste_email": annonce.id_automobiliste,
-        "position_passager": {"latitude": lat_passager, "longitude": lon_passager}
-    }
-    save_historiques(historiques)
-
-    # Mettre à jour l\"historique de l\"automobiliste pour refléter la réservation
-    historiques_automobiliste = load_historiques()
-    if annonce.id_automobiliste not in historiques_automobiliste:
-        historiques_automobiliste[annonce.id_automobiliste] = {}
-    
-    # Trouver l\"annonce correspondante dans l\"historique de l\"automobiliste et la mettre à jour
-    # Si l\"annonce n\"est pas encore dans l\"historique de l\"automobiliste (ce qui ne devrait pas arriver si publier_trajet l\"ajoute)
-    # Nous allons la créer ou la mettre à jour.
-    historiques_automobiliste[annonce.id_automobiliste][annonce.id_annonce] = {
-        "id": annonce.id_annonce,
-        "role": "automobiliste",
-        "universite": annonce.universite_destination,
-        "heure_depart": annonce.heure_depart,
-        "etat": EN_ATTENTE,
-        "places_offertes": annonce.places_offertes,
-        "places_disponibles": annonce.places_disponibles,
-        "passagers_reserves": annonce.passagers_reserves,
-        "has_reservations": annonce.has_reservations,
-        "points": 0, # Les points seront attribués à la fin du trajet
-        "notes_moyenne": "N/A",
-        "position_depart": annonce.position_depart
-    }
-
-    save_historiques(historiques_automobiliste)
-
-    return True, "Réservation effectuée avec succès."
+    # Réservation, annonce et historiques sont écrits ensemble par le chemin de réservation unique
+    success, message, _ = reserver(annonce_id, email_passager, {"latitude": lat_passager, "longitude": lon_passager})
+    return success, message
 
 def terminer_trajet(trajet_id):
     """
@@ -145,7 +149,19 @@ def terminer_trajet(trajet_id):
     Returns:
         tuple: (bool, str) - True si le trajet est terminé avec succès, False sinon.
     """
-    annonce = get_annonce_by_id(trajet_id)
+    # Annonce, points et historiques sont écrits ensemble, en une seule fois, à la fin, à condition
+    # que l\"annonce et le solde de l\"automobiliste n\"aient pas changé depuis leur lecture: sinon tout est relu
+    for essai in range(TENTATIVES_TRAJET):
+        try:
+            return _terminer_trajet(trajet_id)
+        except ConflitEcriture:
+            if essai == TENTATIVES_TRAJET - 1:
+                return False, "Le trajet est en cours de modification, veuillez réessayer."
+            time.sleep(random.uniform(0, 0.002 * (essai + 1)))
+
+def _terminer_trajet(trajet_id):
+    tx = Transaction()
+    annonce = get_annonce_by_id(trajet_id, tx)
     if not annonce:
         return False, "Trajet non trouvé."
 
@@ -154,7 +170,7 @@ def terminer_trajet(trajet_id):
 
     # Mettre à jour le statut de l\"annonce
     annonce.statut = TERMINE
-    update_annonce(annonce)
+    update_annonce(annonce, tx)
 
     # Attribution des points à l\"automobiliste
     points_gagnes = 0
@@ -165,7 +181,7 @@ def terminer_trajet(trajet_id):
     # et de comparer l\"heure de publication avec l\"heure de départ réelle (ou l\"heure actuelle si le trajet est terminé)
     # On doit s\"assurer que la date_publication est bien un objet datetime pour la comparaison
     date_publication_dt = datetime.fromisoformat(annonce.date_publication)
-    heure_depart_dt = datetime.strptime(annonce.heure_depart, "%H:%M").replace(year=date_publication_dt.year, month=date_publication_dt.month, day=date_publication_dt.day)
+    heure_depart_dt = datetime.fromisoformat(annonce.depart_prevu) if annonce.depart_prevu else date_publication_dt
 
     # Si l\"heure de départ est déjà passée par rapport à l\"heure actuelle, on utilise l\"heure actuelle pour le calcul
     if heure_depart_dt < datetime.now():
@@ -188,22 +204,27 @@ def terminer_trajet(trajet_id):
 
     # Mettre à jour les points de l\"automobiliste
     if points_gagnes > 0:
-        update_user_points(annonce.id_automobiliste, points_gagnes)
+        update_user_points(annonce.id_automobiliste, points_gagnes, tx, motif="Trajet terminé", id_trajet=annonce.id_annonce)
 
     # Mettre à jour l\"historique de l\"automobiliste et des passagers
-    historiques = load_historiques()
+    # Seules les entrées modifiées sont écrites dans le journal.
+    historiques = tx.load_data(HISTORIQUES_FILE, default_value={})
     
     # Pour l\"automobiliste
     if annonce.id_automobiliste in historiques and annonce.id_annonce in historiques[annonce.id_automobiliste]:
-        historiques[annonce.id_automobiliste][annonce.id_annonce]["etat"] = TERMINE
-        historiques[annonce.id_automobiliste][annonce.id_annonce]["points"] += points_gagnes # Ajouter les points gagnés
+        entree = historiques[annonce.id_automobiliste][annonce.id_annonce]
+        entree["etat"] = TERMINE
+        entree["points"] += points_gagnes # Ajouter les points gagnés
+        set_historique(annonce.id_automobiliste, annonce.id_annonce, entree, tx)
     
     # Pour les passagers réservés
     for passager_email in annonce.passagers_reserves:
         if passager_email in historiques and annonce.id_annonce in historiques[passager_email]:
-            historiques[passager_email][annonce.id_annonce]["etat"] = TERMINE
-    save_historiques(historiques)
+            entree = historiques[passager_email][annonce.id_annonce]
+            entree["etat"] = TERMINE
+            set_historique(passager_email, annonce.id_annonce, entree, tx)
 
+    tx.commit()
     message_combined = ". ".join(message_points)
     return True, f"Trajet terminé avec succès. {message_combined}"
 
@@ -219,9 +240,24 @@ def noter_trajet(trajet_id, email_passager, note):
     Returns:
         tuple: (bool, str) - True si la notation est réussie, False sinon.
     """
-    annonce = get_annonce_by_id(trajet_id)
+    # Points et historiques sont écrits ensemble, en une seule fois, à la fin, à condition que l\"annonce
+    # et le solde de l\"automobiliste n\"aient pas changé depuis leur lecture: sinon tout est relu
+    # (une note donnée entre-temps par le même passager est alors refusée)
+    for essai in range(TENTATIVES_TRAJET):
+        try:
+            return _noter_trajet(trajet_id, email_passager, note)
+        except ConflitEcriture:
+            if essai == TENTATIVES_TRAJET - 1:
+                return False, "Le trajet est en cours de modification, veuillez réessayer."
+            time.sleep(random.uniform(0, 0.002 * (essai + 1)))
+
+def _noter_trajet(trajet_id, email_passager, note):
+    tx = Transaction()
+    annonce = get_annonce_by_id(trajet_id, tx)
     if not annonce:
         return False, "Trajet non trouvé."
+    # L\"annonce n\"est pas réécrite: son statut et ses passagers lus doivent rester valables jusqu\"à l\"écriture
+    tx.verifier(ANNONCES_FILE, trajet_id, "id_annonce", "version", annonce.version, defaut=0)
 
     if annonce.statut != TERMINE:
         return False, "Ce trajet n\"est pas encore terminé et ne peut pas être noté."
@@ -229,20 +265,22 @@ def noter_trajet(trajet_id, email_passager, note):
     if email_passager not in annonce.passagers_reserves:
         return False, "Vous ne pouvez noter que les trajets que vous avez réservés."
 
+    # Attribution des points à l\"automobiliste en fonction de la note. Le solde est lu avant les historiques:
+    # une note validée après cette lecture fait échouer la validation, une note validée avant est vue ci-dessous
+    points_note = note * 2
+    update_user_points(annonce.id_automobiliste, points_note, tx, motif=f"Note de {note}/5", id_trajet=trajet_id)
+
     # Vérifier si le passager a déjà noté ce trajet (pour éviter les notes multiples)
-    historiques = load_historiques()
+    historiques = tx.load_data(HISTORIQUES_FILE, default_value={})
     if email_passager in historiques and trajet_id in historiques[email_passager]:
         if "note_donnee" in historiques[email_passager][trajet_id] and historiques[email_passager][trajet_id]["note_donnee"]:
             return False, "Vous avez déjà noté ce trajet."
 
-    # Attribution des points à l\"automobiliste en fonction de la note
-    points_note = note * 2
-    update_user_points(annonce.id_automobiliste, points_note)
-
     # Mettre à jour l\"historique du passager pour marquer la note donnée
     if email_passager in historiques and trajet_id in historiques[email_passager]:
-        historiques[email_passager][trajet_id]["note_donnee"] = True # Marquer que la note a été donnée
-    save_historiques(historiques)
+        entree = historiques[email_passager][trajet_id]
+        entree["note_donnee"] = True # Marquer que la note a été donnée
+        set_historique(email_passager, trajet_id, entree, tx)
 
     # Mettre à jour la note moyenne de l\"automobiliste pour ce trajet (dans l\"historique de l\"automobiliste)
     # Pour une implémentation plus robuste, il faudrait stocker toutes les notes et calculer la moyenne.
@@ -250,36 +288,26 @@ def noter_trajet(trajet_id, email_passager, note):
     if annonce.id_automobiliste in historiques and trajet_id in historiques[annonce.id_automobiliste]:
         # Pour simplifier, on met à jour la note moyenne directement avec la dernière note reçue.
         # Dans une vraie application, il faudrait calculer une moyenne pondérée de toutes les notes.
-        historiques[annonce.id_automobiliste][trajet_id]["notes_moyenne"] = note
-    save_historiques(historiques)
+        entree = historiques[annonce.id_automobiliste][trajet_id]
+        entree["notes_moyenne"] = note
+        set_historique(annonce.id_automobiliste, trajet_id, entree, tx)
 
+    tx.commit()
     return True, f"Trajet noté avec succès. L\'automobiliste a gagné {points_note} points."
 
-def get_annonces_disponibles():
+def get_annonces_disponibles(universite=None):
     """
-    Récupère toutes les annonces actives qui ont encore des places disponibles.
+    Récupère toutes les annonces en attente dont le départ n\"est pas passé et qui ont encore des places disponibles.
+
+    Args:
+        universite (str, optional): Si fourni, ne retourne que les annonces vers cette université.
 
     Returns:
-        list: Une liste d\"objets Annonce disponibles.
+        list: Une liste d\"objets Annonce disponibles, triée par départ.
     """
-    annonces = get_all_annonces()
-    # Filtrer les annonces pour ne garder que celles qui sont actives et ont des places disponibles
-    # et dont l\"heure de départ n\"est pas passée
-    annonces_filtrees = []
-    now = datetime.now()
-    for annonce in annonces:
-        try:
-            # Combiner la date d\"aujourd\"hui avec l\"heure de départ de l\"annonce
-            # Assurez-vous que l\"année, le mois et le jour sont corrects pour la comparaison
-            heure_depart_dt = datetime.strptime(annonce.heure_depart, "%H:%M").replace(year=now.year, month=now.month, day=now.day)
-            
-            # Réactiver la condition de temps
-            if annonce.statut == EN_ATTENTE and annonce.places_disponibles > 0 and heure_depart_dt > now:
-                annonces_filtrees.append(annonce)
-        except ValueError: # Gérer les erreurs si le format de l\"heure est incorrect
-            print(f"Erreur de format d\"heure pour l\"annonce {annonce.id_annonce}: {annonce.heure_depart}")
-            continue
-    return annonces_filtrees
+    # L\"index trié des départs ne parcourt que les annonces en attente dont le départ est à venir
+    annonces = find_annonces_par_depart(debut=datetime.now(), statut=EN_ATTENTE, universite=universite)
+    return [annonce for annonce in annonces if annonce.places_disponibles > 0]
 
 def get_historique_utilisateur(email):
     """
@@ -1,12 +1,127 @@
-import json
-import os
-from stockage import load_data, save_data # Importation des fonctions génériques de stockage
+import re
+import threading
+import time
+from collections import namedtuple
+from backend.distance import preparer_point
+from backend.recherche import IndexTexte, normaliser_texte
+from stockage import load_data, save_data, data_token # Importation des fonctions génériques de stockage
 
 # Chemin du fichier de stockage des universités
 UNIVERSITES_FILE = "data/universites.json"
 
-# Assurez-vous que le répertoire 'data' existe (déjà géré par stockage.py)
-# os.makedirs("data", exist_ok=True)
+# Universités enregistrées au premier accès si le fichier est vide ou inexistant
+UNIVERSITES_INITIALES = [
+    {
+        "nom": "Burkina Institut of Technology(BIT)",
+        "latitude": 12.2419,
+        "longitude": -2.4083
+    },
+    {
+        "nom": "Université Norbert Zongo (UNZ)",
+        "latitude": 12.2400,
+        "longitude": -2.3990,
+        "alias": ["Université de Koudougou"]
+    },
+    {
+        "nom": "Institut Supérieur de Management de Koudougou (ISMK)",
+        "latitude": 12.2526,
+        "longitude": -2.3627
+    }
+]
+
+# Entrée du registre: coordonnées (latitude, longitude), valeurs précalculées pour Haversine
+# (latitude et longitude en radians, cosinus de la latitude) et autres noms (alias, sigles)
+Universite = namedtuple("Universite", ["nom", "coordonnees", "trig", "alias"])
+
+# Mots ignorés pour former le sigle d'un nom
+MOTS_VIDES = {"de", "des", "du", "d", "la", "le", "les", "l", "et", "of", "the", "and"}
+
+# Intervalle minimal (en secondes) entre deux contrôles du fichier par les recherches: les modifications
+# faites hors de sauvegarder_universites (autre processus) sont vues au plus tard après ce délai
+INTERVALLE_VERIFICATION = 2.0
+
+# Registre des universités, construit au premier accès (aucune lecture de fichier à l'import) et mis à jour
+# quand le fichier change: (jeton du fichier, nom normalisé -> Universite, index de recherche approximative
+# sur les noms, alias et sigles). Seules les entrées modifiées sont mises à jour, sous le verrou; le registre
+# est lu sans verrou, l'index sous le verrou.
+_etat = None
+_prochaine_verification = 0.0 # Instant (time.monotonic) du prochain contrôle du fichier
+_verrou = threading.Lock()
+
+# Les noms sont comparés casse et accents ignorés
+normaliser_nom = normaliser_texte
+
+def _sigle(nom):
+    """
+    Sigle formé des initiales d'un nom, sans les mots vides ni le sigle entre parenthèses
+    (ex: "Université Norbert Zongo (UNZ)" -> "UNZ").
+    """
+    sans_parentheses = re.sub(r"\(.*?\)", " ", normaliser_texte(nom))
+    return "".join(mot[0] for mot in re.findall(r"[a-z]+", sans_parentheses) if mot not in MOTS_VIDES).upper()
+
+def _entree(univ):
+    coordonnees = (float(univ["latitude"]), float(univ["longitude"]))
+    alias = tuple(univ.get("alias", ())) + (_sigle(univ["nom"]),)
+    return Universite(univ["nom"], coordonnees, preparer_point(*coordonnees), alias)
+
+def _mettre_a_jour(registre, index, universites):
+    """
+    Met le registre et l'index en accord avec la liste d'universités donnée:
+    seules les entrées ajoutées, modifiées ou retirées sont réindexées. À appeler sous le verrou.
+    """
+    nouvelles = {}
+    for univ in universites:
+        universite = _entree(univ)
+        nouvelles[normaliser_nom(universite.nom)] = universite
+    for cle in [cle for cle in registre if cle not in nouvelles]:
+        del registre[cle]
+        index.discard(cle)
+    for cle, universite in nouvelles.items():
+        if registre.get(cle) != universite:
+            registre[cle] = universite
+            index.add(cle, (universite.nom,) + universite.alias)
+
+def _lire():
+    """
+    Lit la liste des universités et le jeton du fichier, initialisé avec UNIVERSITES_INITIALES
+    s'il est vide ou inexistant.
+    """
+    universites = load_data(UNIVERSITES_FILE, default_value=[], readonly=True)
+    if not universites:
+        universites = UNIVERSITES_INITIALES
+        save_data(UNIVERSITES_FILE, universites)
+    return universites, data_token(UNIVERSITES_FILE)
+
+def _appliquer(universites, jeton):
+    """
+    Met à jour l'état (créé au premier appel) avec la liste d'universités lue sous le jeton donné.
+    À appeler sous le verrou.
+    """
+    global _etat
+    registre, index = (_etat[1], _etat[2]) if _etat is not None else ({}, IndexTexte())
+    _mettre_a_jour(registre, index, universites)
+    _etat = (jeton, registre, index)
+
+def _get_etat():
+    """
+    Retourne le registre des universités et son index, en les chargeant au premier appel.
+    Le fichier n'est contrôlé qu'une fois par INTERVALLE_VERIFICATION au plus: entre deux contrôles,
+    une recherche ne fait aucune entrée-sortie. S'il a changé depuis (autre processus, suppression),
+    les entrées modifiées sont mises à jour.
+    """
+    global _prochaine_verification
+    etat = _etat
+    if etat is not None and time.monotonic() < _prochaine_verification:
+        return etat[1], etat[2]
+    with _verrou:
+        if _etat is None or time.monotonic() >= _prochaine_verification:
+            if _etat is None or _etat[0] != data_token(UNIVERSITES_FILE):
+                _appliquer(*_lire())
+            _prochaine_verification = time.monotonic() + INTERVALLE_VERIFICATION
+        return _etat[1], _etat[2]
+
+def _get_registre():
+    return _get_etat()[0]
 
 def charger_universites():
     """
@@ -16,9 +131,7 @@ def charger_universites():
     Returns:
         list: Une liste de dictionnaires représentant les universités.
     """
-    # Si le fichier universites.json est vide ou n'existe pas, on peut initialiser avec des données par défaut
-    # ou s'assurer que le fichier est créé avec les universités initiales.
-    # Pour l'instant, nous allons charger ce qui est dans le fichier.
+    _get_registre() # Initialise le fichier au premier accès
     return load_data(UNIVERSITES_FILE, default_value=[])
 
 def sauvegarder_universites(universites):
@@ -29,74 +142,51 @@ def sauvegarder_universites(universites):
     Args:
         universites (list): Une liste de dictionnaires représentant les universités.
     """
-    save_data(UNIVERSITES_FILE, universites)
+    with _verrou:
+        save_data(UNIVERSITES_FILE, universites)
+        # Le registre est mis à jour tout de suite, sans attendre le prochain contrôle du fichier
+        if universites:
+            _appliquer(universites, data_token(UNIVERSITES_FILE))
+        else:
+            _appliquer(*_lire())
+
+def get_universite(nom_universite):
+    """
+    Récupère l'entrée du registre d'une université par son nom (casse et accents ignorés).
+
+    Args:
+        nom_universite (str): Le nom de l'université à rechercher.
+
+    Returns:
+        Universite: L'entrée (nom, coordonnees, trig, alias), ou None si l'université est inconnue.
+    """
+    return _get_registre().get(normaliser_nom(nom_universite))
 
 def get_coordonnees_universite(nom_universite):
     """
     Récupère les coordonnées (latitude, longitude) d'une université par son nom.
 
     Args:
-        nom_universite (str): Le nom de l'université à rechercher.
+        nom_universite (str): Le nom de l'université à rechercher (casse et accents ignorés).
 
     Returns:
-        tuple: Un tuple (latitude, longitude) si l'université est trouvée, sinon (None, None).
+        tuple: Un tuple (latitude, longitude) si l'université est trouvée, sinon None.
     """
-    universites = charger_universites()
-    for univ in universites:
-        if univ["nom"].lower() == nom_universite.lower():
-            return univ["latitude"], univ["longitude"]
-    return None, None
-
-# Les universités initiales peuvent être stockées directement dans le fichier JSON
-# ou utilisées pour initialiser le fichier si celui-ci est vide.
-# Il est préférable de ne pas avoir une liste hardcodée ici si elle est aussi dans le JSON.
-# Pour l'exemple, si le fichier est vide, nous pourrions l'initialiser:
-# if not os.path.exists(UNIVERSITES_FILE) or os.path.getsize(UNIVERSITES_FILE) == 0:
-#     initial_universites = [
-#         {
-#             "nom": "Burkina Institut of Technology(BIT)",
-#             "latitude": 12.2419,
-#             "longitude": -2.4083
-#         },
-#         {
-#             "nom": "Université Norbert Zongo (UNZ)",
-#             "latitude": 12.2400,
-#             "longitude": -2.3990
-#         },
-#         {
-#             "nom": "Institut Supérieur de Management de Koudougou (ISMK)",
-#             "latitude": 12.2526,
-#             "longitude": -2.3627
-#         }
-#     ]
-#     sauvegarder_universites(initial_universites)
-
-# Note: La liste UNIVERSITES hardcodée dans le fichier original n'est pas utilisée
-# si les données sont chargées depuis un fichier. Il est recommandé de la supprimer
-# ou de l'utiliser uniquement pour l'initialisation du fichier JSON.
-
-
-
-
-# Initialisation du fichier universites.json si vide ou inexistant
-if not os.path.exists(UNIVERSITES_FILE) or os.path.getsize(UNIVERSITES_FILE) == 0:
-    initial_universites = [
-        {
-            "nom": "Burkina Institut of Technology(BIT)",
-            "latitude": 12.2419,
-            "longitude": -2.4083
-        },
-        {
-            "nom": "Université Norbert Zongo (UNZ)",
-            "latitude": 12.2400,
-            "longitude": -2.3990
-        },
-        {
-            "nom": "Institut Supérieur de Management de Koudougou (ISMK)",
-            "latitude": 12.2526,
-            "longitude": -2.3627
-        }
-    ]
-    sauvegarder_universites(initial_universites)
+    universite = _get_registre().get(normaliser_nom(nom_universite))
+    return universite.coordonnees if universite is not None else None
 
+def rechercher_universites(texte, limit=5):
+    """
+    Recherche les universités correspondant à un texte libre: nom, alias ou sigle,
+    même incomplet ou avec des fautes de frappe (ex: "norbert zongo", "UNZ", "unz koudougou").
 
+    Args:
+        texte (str): Le texte saisi.
+        limit (int, optional): Le nombre maximal de résultats. Defaults to 5.
+
+    Returns:
+        list: Des couples (Universite, score entre 0 et 1), du plus pertinent au moins pertinent.
+    """
+    registre, index = _get_etat()
+    with _verrou: # L'index peut être mis à jour par un autre thread
+        return [(registre[cle], score) for score, cle in index.rechercher(texte, limit)]
@@ -1,7 +1,8 @@
 import json
 import os
 from backend.models.user import User
-from stockage import load_data, save_data # Importation des fonctions génériques de stockage
+from backend.points import crediter_points, get_solde
+from stockage import load_data, save_data, acces, declare_derived_index, query_derived_index # Importation des fonctions génériques de stockage
 
 # Chemin du fichier de stockage des utilisateurs
 USERS_FILE = "data/users.json"
@@ -9,6 +10,40 @@ USERS_FILE = "data/users.json"
 # Assurez-vous que le répertoire 'data' existe (déjà géré par stockage.py)
 # os.makedirs("data", exist_ok=True)
 
+def normaliser_email(email):
+    """
+    Normalise un email pour les comparaisons (espaces retirés, minuscules).
+    """
+    return email.strip().lower()
+
+class IndexEmails:
+    """
+    Index des utilisateurs par email normalisé: email normalisé -> email tel qu'enregistré.
+    Tenu à jour par le stockage à chaque écriture, il retrouve un compte quelle que soit
+    la casse de l'email saisi, sans parcourir les utilisateurs.
+    """
+    def __init__(self):
+        self.emails = {}
+
+    def add(self, record):
+        email = record.get("email")
+        if email:
+            self.emails[normaliser_email(email)] = email
+
+    def discard(self, record):
+        email = record.get("email")
+        if email and self.emails.get(normaliser_email(email)) == email:
+            del self.emails[normaliser_email(email)]
+
+declare_derived_index(USERS_FILE, "emails", IndexEmails)
+
+def _email_enregistre(email):
+    """
+    Retourne l'email enregistré correspondant à un email saisi (casse et espaces ignorés), ou None.
+    """
+    cle = normaliser_email(email)
+    return query_derived_index(USERS_FILE, "emails", lambda index: index.emails.get(cle))
+
 def load_users():
     """
     Charge les données des utilisateurs depuis le fichier JSON.
@@ -24,6 +59,12 @@ def save_users(users):
     users_data = [user.to_dict() for user in users]
     save_data(USERS_FILE, users_data)
 
+def save_user(user, transaction=None):
+    """
+    Enregistre (ajoute ou remplace) un seul utilisateur, sans réécrire tout le fichier.
+    """
+    acces(transaction).upsert_record(USERS_FILE, user.to_dict(), key="email")
+
 def register_user(nom, prenom, telephone, email, universite, role, engin=None, places_disponibles=None, mot_de_passe=None):
     """
     Enregistre un nouvel utilisateur.
@@ -42,18 +83,16 @@ def register_user(nom, prenom, telephone, email, universite, role, engin=None, p
     Returns:
         tuple: (True, message) si l'enregistrement est réussi, (False, message) sinon.
     """
-    users = load_users()
-
-    # Vérifier si l'email existe déjà
-    if any(user.email == email for user in users):
+    # Vérifier si l'email existe déjà (casse ignorée); les nouveaux comptes sont enregistrés sous l'email normalisé
+    email = normaliser_email(email)
+    if get_user_by_email(email) is not None:
         return False, "Un compte avec cet email existe déjà."
     
     # Créer un nouvel objet User
     # Pour l'instant, le mot de passe n'est pas stocké/haché. C'est une amélioration future.
     new_user = User(nom, prenom, email, telephone, universite, role, engin, places_disponibles)
     
-    users.append(new_user)
-    save_users(users)
+    save_user(new_user)
     return True, "Utilisateur enregistré avec succès."
 
 def login_user(email, mot_de_passe=None):
@@ -67,28 +106,37 @@ def login_user(email, mot_de_passe=None):
     Returns:
         tuple: (True, User, message, role) si la connexion est réussie, (False, None, message, None) sinon.
     """
-    users = load_users()
-    for user in users:
-        if user.email == email: # Pour l'instant, pas de vérification de mot de passe
-            # TODO: Implémenter la vérification sécurisée du mot de passe (hachage)
-            return True, user, "Connexion réussie !", user.role
+    user = get_user_by_email(email)
+    if user: # Pour l'instant, pas de vérification de mot de passe
+        # TODO: Implémenter la vérification sécurisée du mot de passe (hachage)
+        return True, user, "Connexion réussie !", user.role
     return False, None, "Email ou mot de passe incorrect.", None
 
-def get_user_by_email(email):
+def get_user_by_email(email, transaction=None):
     """
     Récupère un objet User par son email.
 
     Args:
-        email (str): Email de l'utilisateur à rechercher.
+        email (str): Email de l'utilisateur à rechercher (casse et espaces ignorés).
+        transaction (Transaction, optional): Transaction en cours dans laquelle lire l'utilisateur.
 
     Returns:
         User or None: L'objet User si trouvé, sinon None.
     """
-    users = load_users()
-    for user in users:
-        if user.email == email:
-            return user
-    return None
+    data = acces(transaction).get_record(USERS_FILE, email, key="email")
+    if data is None:
+        # Email saisi avec une autre casse: retrouver l'email enregistré par l'index
+        enregistre = _email_enregistre(email)
+        if enregistre is not None and enregistre != email:
+            data = acces(transaction).get_record(USERS_FILE, enregistre, key="email")
+    if not data:
+        return None
+    user = User.from_dict(data)
+    # Le solde du journal des points fait foi; les comptes sans mouvement gardent leurs points enregistrés
+    solde = get_solde(user.email, transaction)
+    if solde is not None:
+        user.points = solde
+    return user
 
 def update_user_role(email, new_role):
     """
@@ -101,31 +149,33 @@ def update_user_role(email, new_role):
     Returns:
         tuple: (True, message) si la mise à jour est réussie, (False, message) sinon.
     """
-    users = load_users()
-    for user in users:
-        if user.email == email:
-            user.role = new_role
-            save_users(users)
-            return True, "Rôle mis à jour avec succès."
+    user = get_user_by_email(email)
+    if user:
+        user.role = new_role
+        save_user(user)
+        return True, "Rôle mis à jour avec succès."
     return False, "Utilisateur non trouvé."
 
-def update_user_points(email, points_to_add):
+def update_user_points(email, points_to_add, transaction=None, motif="Ajustement", id_trajet=None):
     """
     Met à jour les points d'un utilisateur.
+    Les points sont ajoutés au journal des points (voir backend.points): seul un mouvement
+    et le solde de l'utilisateur sont écrits, le fichier des utilisateurs n'est pas réécrit.
 
     Args:
         email (str): Email de l'utilisateur.
         points_to_add (int): Nombre de points à ajouter (peut être négatif pour retirer des points).
+        transaction (Transaction, optional): Transaction en cours ; l'écriture est alors faite à sa validation.
+        motif (str, optional): La raison du mouvement, conservée dans le journal. Defaults to "Ajustement".
+        id_trajet (str, optional): L'ID du trajet qui a donné lieu aux points. Defaults to None.
 
     Returns:
         tuple: (True, message) si la mise à jour est réussie, (False, message) sinon.
     """
-    users = load_users()
-    for user in users:
-        if user.email == email:
-            user.points += points_to_add
-            save_users(users)
-            return True, f"Points de {email} mis à jour. Nouveau total: {user.points}"
+    user = get_user_by_email(email, transaction)
+    if user:
+        total = crediter_points(user.email, points_to_add, motif, id_trajet, transaction)
+        return True, f"Points de {email} mis à jour. Nouveau total: {total}"
     return False, "Utilisateur non trouvé."
 
 def get_user_role(email):
@@ -0,0 +1,75 @@
+import os
+import random
+import sys
+import time
+
+# Ce script compare, sur des données synthétiques de l'heure de pointe (1000 passagers, 5000 annonces),
+# l'affectation en lot (backend.affectation) à l'affectation "premier arrivé, premier servi".
+# Usage: python benchmarks/bench_affectation.py [nb_passagers] [nb_annonces]
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.affectation import calculer_affectation
+from backend.detour import calculer_detours, filtrer_par_detour, DETOUR_MAX_KM
+from backend.distance import calculer_distance_km
+from backend.models.annonce import Annonce
+
+UNIVERSITES = {
+    "Burkina Institut of Technology(BIT)": (12.2419, -2.4083),
+    "Université Norbert Zongo (UNZ)": (12.2400, -2.3990),
+    "Institut Supérieur de Management de Koudougou (ISMK)": (12.2526, -2.3627),
+}
+
+def generer(nb_passagers, nb_annonces, graine=7):
+    rng = random.Random(graine)
+    noms = list(UNIVERSITES)
+    point = lambda: (rng.uniform(12.15, 12.40), rng.uniform(-2.55, -2.25))
+    demandes = []
+    for i in range(nb_passagers):
+        lat, lon = point()
+        demandes.append({"id": f"passager{i}@example.com", "latitude": lat, "longitude": lon, "universite": rng.choice(noms)})
+    annonces = []
+    for i in range(nb_annonces):
+        lat, lon = point()
+        annonces.append(Annonce(f"auto{i}@example.com", rng.choice(noms), "07:00", rng.randint(1, 3), "voiture",
+                                position_depart={"latitude": lat, "longitude": lon}, statut="en_attente"))
+    return demandes, annonces
+
+def premier_arrive_premier_servi(demandes, annonces, distance_max_km):
+    """
+    Référence: chaque passager, dans l'ordre d'arrivée, prend l'annonce éligible la plus proche ayant encore une place.
+    L'éligibilité est celle de l'affectation en lot et de la recherche interactive (détour maximal).
+    """
+    places = {annonce.id_annonce: annonce.places_disponibles for annonce in annonces}
+    servis, distance_totale = 0, 0.0
+    for demande in demandes:
+        lat, lon = demande["latitude"], demande["longitude"]
+        ouvertes = [annonce for annonce in annonces
+                    if annonce.universite_destination == demande["universite"] and places[annonce.id_annonce] > 0]
+        detours = calculer_detours(lat, lon, ouvertes, *UNIVERSITES[demande["universite"]])
+        meilleure = None
+        for annonce, _ in filtrer_par_detour(ouvertes, detours, DETOUR_MAX_KM):
+            distance = calculer_distance_km(lat, lon, annonce.position_depart["latitude"], annonce.position_depart["longitude"])
+            if distance <= distance_max_km and (meilleure is None or distance < meilleure[0]):
+                meilleure = (distance, annonce.id_annonce)
+        if meilleure:
+            places[meilleure[1]] -= 1
+            servis += 1
+            distance_totale += meilleure[0]
+    return servis, distance_totale
+
+if __name__ == "__main__":
+    nb_passagers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nb_annonces = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    distance_max_km = 3.0
+    demandes, annonces = generer(nb_passagers, nb_annonces)
+
+    debut = time.perf_counter()
+    resultat = calculer_affectation(demandes, annonces, UNIVERSITES, distance_max_km=distance_max_km)
+    duree_lot = time.perf_counter() - debut
+    print(f"Affectation en lot ({nb_passagers} x {nb_annonces}): {len(resultat['affectations'])} passagers servis, "
+          f"{resultat['distance_totale']:.1f} km au total, {duree_lot * 1000:.0f} ms")
+
+    debut = time.perf_counter()
+    servis, distance_totale = premier_arrive_premier_servi(demandes, annonces, distance_max_km)
+    duree_fcfs = time.perf_counter() - debut
+    print(f"Premier arrivé, premier servi: {servis} passagers servis, {distance_totale:.1f} km au total, {duree_fcfs * 1000:.0f} ms")
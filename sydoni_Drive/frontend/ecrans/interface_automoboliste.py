@@ -2,9 +2,12 @@ import tkinter as tk
 import datetime
 from tkinter import ttk, messagebox
 from backend.trajets import publier_trajet, terminer_trajet, get_historique_utilisateur
+from backend.ramassage import planifier_ramassage
+from backend.classement import get_classement, get_rangs
 from backend.universites import charger_universites, get_coordonnees_universite
 from backend.users import get_user_by_email, update_user_role
-from backend.geolocalisation import get_current_location # Pour obtenir la position de l'automobiliste
+from backend.geolocalisation import get_current_location, get_coordinates_from_address, suivre_position # Pour obtenir la position de l'automobiliste
+from backend.geocodage import geocoder
 from frontend.ecrans.map_display import MapDisplayFrame # Importation du module d'affichage de la carte
 
 class InterfaceAutomobilisteFrame(tk.Frame):
@@ -27,6 +30,8 @@ class InterfaceAutomobilisteFrame(tk.Frame):
         self.user = None # L'objet User sera chargé via set_user_email
         self.automobiliste_lat = None # Latitude actuelle de l'automobiliste
         self.automobiliste_lon = None # Longitude actuelle de l'automobiliste
+        # Les nouvelles positions arrivent en arrière-plan: elles sont appliquées dans la boucle Tk
+        suivre_position(lambda position: self.after(0, self.on_location_update, position))
 
         # Charger la liste des universités disponibles depuis le backend
         self.universites = [univ["nom"] for univ in charger_universites()]
@@ -74,15 +79,23 @@ class InterfaceAutomobilisteFrame(tk.Frame):
             self.controller.show_frame("LoginRegisterFrame")
             return
         
-        # Tenter d'obtenir la position actuelle de l'automobiliste
+        # Dernière position connue (sans attendre le fournisseur de position)
+        # Si aucune n'est encore connue, utiliser des coordonnées par défaut: on_location_update les remplacera
         current_loc = get_current_location()
         if current_loc:
             self.automobiliste_lat, self.automobiliste_lon = current_loc
-        else:
-            # Coordonnées par défaut si la géolocalisation échoue (à remplacer par une vraie gestion d'erreur/saisie)
+        elif self.automobiliste_lat is None:
             self.automobiliste_lat = 12.3686 # Exemple de latitude
             self.automobiliste_lon = -1.5334 # Exemple de longitude
-            messagebox.showwarning("Géolocalisation", "Impossible d'obtenir votre position actuelle. Utilisation de coordonnées par défaut.")
+
+    def on_location_update(self, position):
+        """
+        Applique une nouvelle position reçue du fournisseur de position.
+
+        Args:
+            position (tuple): (latitude, longitude).
+        """
+        self.automobiliste_lat, self.automobiliste_lon = position
 
     def create_publication_tab(self, parent_frame):
         """
@@ -111,8 +124,22 @@ class InterfaceAutomobilisteFrame(tk.Frame):
         self.pub_places_disponibles_entry = ttk.Entry(parent_frame)
         self.pub_places_disponibles_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
 
+        # Champ Adresse de départ (facultatif): quartier, lieu ou rue, proposés pendant la saisie
+        ttk.Label(parent_frame, text="Adresse de départ (facultatif):").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.pub_adresse_var = tk.StringVar(parent_frame)
+        self.pub_adresse_dropdown = ttk.Combobox(parent_frame, textvariable=self.pub_adresse_var)
+        self.pub_adresse_dropdown.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        self.pub_adresse_dropdown.bind("<KeyRelease>", self.suggest_addresses)
+
         # Bouton Publier l'annonce
-        ttk.Button(parent_frame, text="Publier l'annonce", command=self.handle_publication).grid(row=3, column=0, columnspan=2, pady=10)
+        ttk.Button(parent_frame, text="Publier l'annonce", command=self.handle_publication).grid(row=4, column=0, columnspan=2, pady=10)
+
+    def suggest_addresses(self, event):
+        """
+        Propose les lieux correspondant à l'adresse en cours de saisie (géocodage hors ligne).
+        """
+        texte = self.pub_adresse_var.get()
+        self.pub_adresse_dropdown["values"] = [f"{lieu.nom}, {lieu.ville}" for lieu, _ in geocoder(texte)] if texte.strip() else []
 
     def handle_publication(self):
         """
@@ -144,9 +171,17 @@ class InterfaceAutomobilisteFrame(tk.Frame):
             messagebox.showerror("Erreur de publication", "Format d'heure invalide. Utilisez HH:MM (ex: 14:30).")
             return
 
-        # Utiliser la position actuelle de l'automobiliste
-        latitude_depart = self.automobiliste_lat
-        longitude_depart = self.automobiliste_lon
+        # Utiliser l'adresse saisie si elle est fournie, sinon la position actuelle de l'automobiliste
+        adresse = self.pub_adresse_var.get().strip()
+        if adresse:
+            coords_depart = get_coordinates_from_address(adresse)
+            if coords_depart is None:
+                messagebox.showerror("Erreur de publication", "Adresse de départ introuvable.")
+                return
+            latitude_depart, longitude_depart = coords_depart
+        else:
+            latitude_depart = self.automobiliste_lat
+            longitude_depart = self.automobiliste_lon
 
         # Appel de la fonction de publication du backend
         success, message = publier_trajet(self.user_email, universite, heure_depart, places_disponibles, latitude_depart, longitude_depart)
@@ -182,7 +217,7 @@ class InterfaceAutomobilisteFrame(tk.Frame):
             
             # Dessiner le chemin de l'automobiliste à l'université
             path_points = [(lat_depart, lon_depart), (lat_univ, lon_univ)]
-            self.map_display.draw_path(path_points, color="blue", width=5)
+            self.map_display.draw_route(path_points, color="blue", width=5)
             
             # Centrer la carte sur le trajet
             self.map_display.set_map_center((lat_depart + lat_univ) / 2, (lon_depart + lon_univ) / 2, zoom=10)
@@ -200,6 +235,10 @@ class InterfaceAutomobilisteFrame(tk.Frame):
         self.points_label = ttk.Label(parent_frame, text=f"Vos points: {self.user.points if self.user else 0}", font=("Helvetica", 12, "bold"))
         self.points_label.pack(pady=10)
 
+        # Rangs de l'automobiliste (général, dans son université, pour son engin) et tête du classement
+        self.classement_label = ttk.Label(parent_frame, text=self.texte_classement(), font=("Helvetica", 10))
+        self.classement_label.pack(pady=(0, 10))
+
         # Liste des trajets dans un Listbox
         self.historique_listbox = tk.Listbox(parent_frame, height=15, width=80)
         self.historique_listbox.pack(padx=10, pady=10, fill="both", expand=True)
@@ -244,9 +283,30 @@ class InterfaceAutomobilisteFrame(tk.Frame):
         """
         if self.historique_listbox.curselection():
             self.terminer_trajet_button.config(state=tk.NORMAL)
+            selected_text = self.historique_listbox.get(self.historique_listbox.curselection()[0])
+            if "Rôle: automobiliste" in selected_text:
+                self.display_pickups_on_map(selected_text.split("|")[0].split(":")[1].strip())
         else:
             self.terminer_trajet_button.config(state=tk.DISABLED)
 
+    def display_pickups_on_map(self, trajet_id):
+        """
+        Affiche sur la carte le trajet de l'automobiliste avec ses passagers réservés,
+        dans l'ordre de prise en charge calculé par le backend.
+        """
+        plan = planifier_ramassage(trajet_id)
+        if plan is None or not plan["passagers"]:
+            return
+        self.map_display.clear_all_markers_and_paths() # Effacer les anciens éléments
+        etapes = plan["etapes"]
+        self.map_display.add_marker(*etapes[0], text="Votre position")
+        for numero, (email, (lat, lon)) in enumerate(zip(plan["passagers"], etapes[1:-1]), start=1):
+            passager = get_user_by_email(email)
+            self.map_display.add_marker(lat, lon, text=f"{numero}. {passager.prenom if passager else email}")
+        self.map_display.add_marker(*etapes[-1], text="Université")
+        self.map_display.draw_route(etapes, color="blue", width=5)
+        self.map_display.set_map_center((etapes[0][0] + etapes[-1][0]) / 2, (etapes[0][1] + etapes[-1][1]) / 2, zoom=10)
+
     def handle_terminer_trajet(self):
         """
         Gère la logique pour marquer un trajet comme terminé.
@@ -318,6 +378,21 @@ class InterfaceAutomobilisteFrame(tk.Frame):
                 # Mettre à jour les labels d'affichage des points
                 self.points_label.config(text=f"Vos points: {self.user.points}")
                 self.param_points_label.config(text=f"Vos points: {self.user.points}")
+                self.classement_label.config(text=self.texte_classement())
+
+    def texte_classement(self):
+        """
+        Texte présentant les rangs de l'automobiliste et les trois premiers du classement général.
+        """
+        if not self.user:
+            return ""
+        rangs = get_rangs(self.user.email)
+        libelles = [("general", "Général"), ("universite", self.user.universite), ("engin", self.user.engin)]
+        parties = [f"{libelle}: {rangs[critere][0]}/{rangs[critere][1]}" for critere, libelle in libelles if rangs[critere]]
+        if not parties:
+            return "Classement: aucun point pour l'instant."
+        podium = ", ".join(f"{entree['rang']}. {entree['email']} ({entree['points']})" for entree in get_classement(3))
+        return f"Classement - {' | '.join(parties)}\nMeilleurs: {podium}"
 
     def logout(self):
         """
@@ -1,10 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from backend.trajets import get_annonces_disponibles, reserver_trajet, noter_trajet, get_historique_utilisateur
-from backend.universites import charger_universites, get_coordonnees_universite
+from backend.trajets import reserver_trajet, noter_trajet, get_historique_utilisateur
+from backend.universites import charger_universites, get_coordonnees_universite, rechercher_universites
 from backend.users import get_user_by_email, update_user_role
-from backend.distance import calculer_distance_km
-from backend.geolocalisation import get_current_location # Pour obtenir la position du passager
+from backend.matching import rechercher_trajets
+from backend.geolocalisation import get_current_location, suivre_position # Pour obtenir la position du passager
 from frontend.ecrans.map_display import MapDisplayFrame # Importation du module d'affichage de la carte
 
 class InterfacePassagerFrame(tk.Frame):
@@ -26,6 +26,8 @@ class InterfacePassagerFrame(tk.Frame):
         self.user = None # L'objet User sera chargé via set_user_email
         self.passager_lat = None # Latitude actuelle du passager
         self.passager_lon = None # Longitude actuelle du passager
+        # Les nouvelles positions arrivent en arrière-plan: elles sont appliquées dans la boucle Tk
+        suivre_position(lambda position: self.after(0, self.on_location_update, position))
 
         # Charger la liste des universités disponibles depuis le backend
         self.universites = [univ["nom"] for univ in charger_universites()]
@@ -78,16 +80,23 @@ class InterfacePassagerFrame(tk.Frame):
             self.controller.show_frame("LoginRegisterFrame")
             return
         
-        # Tenter d'obtenir la position actuelle du passager
-        # Pour la démo, si get_current_location() retourne None, utiliser des coordonnées par défaut
+        # Dernière position connue (sans attendre le fournisseur de position)
+        # Si aucune n'est encore connue, utiliser des coordonnées par défaut: on_location_update les remplacera
         current_loc = get_current_location()
         if current_loc:
             self.passager_lat, self.passager_lon = current_loc
-        else:
-            # Coordonnées par défaut si la géolocalisation échoue (à remplacer par une vraie gestion d'erreur/saisie)
+        elif self.passager_lat is None:
             self.passager_lat = 12.3686 # Exemple de latitude
             self.passager_lon = -1.5334 # Exemple de longitude
-            messagebox.showwarning("Géolocalisation", "Impossible d'obtenir votre position actuelle. Utilisation de coordonnées par défaut.")
+
+    def on_location_update(self, position):
+        """
+        Applique une nouvelle position reçue du fournisseur de position.
+
+        Args:
+            position (tuple): (latitude, longitude).
+        """
+        self.passager_lat, self.passager_lon = position
 
     def create_recherche_tab(self, parent_frame):
         """
@@ -100,8 +109,10 @@ class InterfacePassagerFrame(tk.Frame):
         # Champ pour la sélection de l'université de destination
         ttk.Label(parent_frame, text="Université de destination:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.search_universite_var = tk.StringVar(parent_frame)
-        self.search_universite_dropdown = ttk.Combobox(parent_frame, textvariable=self.search_universite_var, values=self.universites, state="readonly")
+        # Saisie libre: la liste propose les universités correspondant au texte tapé (nom, alias ou sigle)
+        self.search_universite_dropdown = ttk.Combobox(parent_frame, textvariable=self.search_universite_var, values=self.universites)
         self.search_universite_dropdown.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        self.search_universite_dropdown.bind("<KeyRelease>", self.filter_universites)
         if self.universites:
             self.search_universite_dropdown.set(self.universites[0])
 
@@ -120,6 +131,16 @@ class InterfacePassagerFrame(tk.Frame):
         # Stockage des annonces disponibles pour faciliter la récupération lors de la sélection
         self.available_annonces = [] 
 
+    def filter_universites(self, event):
+        """
+        Met à jour les propositions de la liste des universités selon le texte saisi.
+        """
+        texte = self.search_universite_var.get()
+        if texte.strip():
+            self.search_universite_dropdown["values"] = [universite.nom for universite, _ in rechercher_universites(texte)]
+        else:
+            self.search_universite_dropdown["values"] = self.universites
+
     def search_rides(self):
         """
         Recherche les annonces de trajets disponibles en fonction de l'université de destination
@@ -133,6 +154,12 @@ class InterfacePassagerFrame(tk.Frame):
         if not destination_universite:
             messagebox.showwarning("Recherche", "Veuillez sélectionner une université de destination.")
             return
+        if get_coordonnees_universite(destination_universite) is None:
+            # Texte libre: retenir l'université la plus pertinente
+            correspondances = rechercher_universites(destination_universite, limit=1)
+            if correspondances:
+                destination_universite = correspondances[0][0].nom
+                self.search_universite_var.set(destination_universite)
 
         # Récupérer les coordonnées de l'université de destination
         coords_univ = get_coordonnees_universite(destination_universite)
@@ -146,50 +173,28 @@ class InterfacePassagerFrame(tk.Frame):
         self.map_display.add_marker(latitude_univ, longitude_univ, text=destination_universite)
         self.map_display.set_map_center((self.passager_lat + latitude_univ) / 2, (self.passager_lon + longitude_univ) / 2, zoom=10)
 
-        # Récupérer toutes les annonces disponibles
-        all_annonces = get_annonces_disponibles()
-        
-        # Filtrer et évaluer les annonces
-        for annonce in all_annonces:
-            # Vérifier que l'annonce est pour la même université de destination
-            if annonce.universite_destination.lower() != destination_universite.lower():
-                continue
-
-            # Vérifier s'il reste des places disponibles
-            if annonce.places_disponibles <= 0:
-                continue
-
-            # Récupérer les coordonnées de départ de l'automobiliste pour cette annonce
-            # Note: annonce.position_depart est un dictionnaire {latitude, longitude}
+        # Le moteur de recherche du backend sélectionne, filtre et classe les trajets éligibles
+        for candidat in rechercher_trajets(self.passager_lat, self.passager_lon, destination_universite):
+            annonce = candidat["annonce"]
+            distance_passager_automobiliste = candidat["distance_passager_automobiliste"]
             lat_auto_depart = annonce.position_depart["latitude"]
             lon_auto_depart = annonce.position_depart["longitude"]
 
-            # Calculer la distance du passager à l'université de destination
-            distance_passager_univ = calculer_distance_km(self.passager_lat, self.passager_lon, latitude_univ, longitude_univ)
-            
-            # Calculer la distance de l'automobiliste (point de départ de l'annonce) à l'université de destination
-            distance_automobiliste_univ = calculer_distance_km(lat_auto_depart, lon_auto_depart, latitude_univ, longitude_univ)
-
-            # Condition de réservation: passager plus proche de l'université que l'automobiliste
-            if distance_passager_univ < distance_automobiliste_univ:
-                # L'annonce est éligible, l'ajouter à la liste affichée
-                automobiliste_user = get_user_by_email(annonce.id_automobiliste)
-                automobiliste_name = automobiliste_user.prenom if automobiliste_user else "Inconnu"
-                
-                # Calculer la distance du passager à l'automobiliste (pour affichage)
-                distance_passager_automobiliste = calculer_distance_km(self.passager_lat, self.passager_lon, lat_auto_depart, lon_auto_depart)
+            automobiliste_user = get_user_by_email(annonce.id_automobiliste)
+            automobiliste_name = automobiliste_user.prenom if automobiliste_user else "Inconnu"
 
-                display_text = (
-                    f"ID: {annonce.id_annonce[:8]}... | Automobiliste: {automobiliste_name} | Engin: {annonce.engin} | "
-                    f"Heure: {annonce.heure_depart} | Places: {annonce.places_disponibles} | "
-                    f"Distance à l'auto: {distance_passager_automobiliste:.2f} km"
-                )
-                self.rides_listbox.insert(tk.END, display_text)
-                self.available_annonces.append(annonce) # Stocker l'objet Annonce complet
+            display_text = (
+                f"ID: {annonce.id_annonce[:8]}... | Automobiliste: {automobiliste_name} | Engin: {annonce.engin} | "
+                f"Heure: {annonce.heure_depart} | Places: {annonce.places_disponibles} | "
+                f"Distance à l'auto: {distance_passager_automobiliste:.2f} km | "
+                f"Détour: {candidat['detour_km']:.1f} km ({candidat['detour_min']:.0f} min)"
+            )
+            self.rides_listbox.insert(tk.END, display_text)
+            self.available_annonces.append(annonce) # Stocker l'objet Annonce complet
 
-                # Dessiner le trajet de l'automobiliste en bleu
-                path_points_auto = [(lat_auto_depart, lon_auto_depart), (latitude_univ, longitude_univ)]
-                self.map_display.draw_path(path_points_auto, color="blue", width=3)
+            # Dessiner le trajet de l'automobiliste en bleu
+            path_points_auto = [(lat_auto_depart, lon_auto_depart), (latitude_univ, longitude_univ)]
+            self.map_display.draw_route(path_points_auto, color="blue", width=3)
 
         if not self.available_annonces:
             self.rides_listbox.insert(tk.END, "Aucun trajet disponible correspondant à vos critères.")
@@ -208,6 +213,8 @@ class InterfacePassagerFrame(tk.Frame):
             # Afficher la position du passager et de l'université
             destination_universite = self.search_universite_var.get()
             coords_univ = get_coordonnees_universite(destination_universite)
+            if coords_univ is None:
+                return
             latitude_univ, longitude_univ = coords_univ
 
             self.map_display.add_marker(self.passager_lat, self.passager_lon, text="Votre position")
@@ -218,7 +225,7 @@ class InterfacePassagerFrame(tk.Frame):
             lon_auto_depart = selected_annonce.position_depart["longitude"]
             self.map_display.add_marker(lat_auto_depart, lon_auto_depart, text=f"Départ {selected_annonce.engin}")
             path_points_auto = [(lat_auto_depart, lon_auto_depart), (latitude_univ, longitude_univ)]
-            self.map_display.draw_path(path_points_auto, color="blue", width=3)
+            self.map_display.draw_route(path_points_auto, color="blue", width=3)
 
             # Centrer la carte sur le trajet sélectionné
             self.map_display.set_map_center(
@@ -257,6 +264,8 @@ class InterfacePassagerFrame(tk.Frame):
 
             destination_universite = self.search_universite_var.get()
             coords_univ = get_coordonnees_universite(destination_universite)
+            if coords_univ is None:
+                return
             latitude_univ, longitude_univ = coords_univ
 
             # Marqueurs
@@ -272,7 +281,7 @@ class InterfacePassagerFrame(tk.Frame):
                 (lat_auto_depart, lon_auto_depart),
                 (latitude_univ, longitude_univ)
             ]
-            self.map_display.draw_path(path_points_reserved, color="orange", width=5)
+            self.map_display.draw_route(path_points_reserved, color="orange", width=5)
             self.map_display.set_map_center(
                 (self.passager_lat + lat_auto_depart + latitude_univ) / 3,
                 (self.passager_lon + lon_auto_depart + longitude_univ) / 3,
@@ -449,15 +458,10 @@ class InterfacePassagerFrame(tk.Frame):
         self.tkraise()
         self.update_reservations_tab()
         self.update_historique_tab()
-        # Mettre à jour la position du passager à chaque fois que la frame est affichée
+        # Mettre à jour la position du passager à chaque fois que la frame est affichée (dernière position connue)
         current_loc = get_current_location()
         if current_loc:
             self.passager_lat, self.passager_lon = current_loc
-        else:
-            # Coordonnées par défaut si la géolocalisation échoue (à remplacer par une vraie gestion d'erreur/saisie)
-            self.passager_lat = 12.3686 # Exemple de latitude
-            self.passager_lon = -1.5334 # Exemple de longitude
-            # messagebox.showwarning("Géolocalisation", "Impossible d'obtenir votre position actuelle. Utilisation de coordonnées par défaut.")
         self.search_rides() # Actualiser les annonces disponibles à chaque affichage
 
 
@@ -59,7 +59,7 @@ class LoginRegisterFrame(tk.Frame):
         if success:
             messagebox.showinfo("Connexion réussie", message)
             # Naviguer vers la page de choix de rôle en passant l'email de l'utilisateur
-            self.controller.show_frame("ChoixRoleFrame", user_email=email)
+            self.controller.show_frame("ChoixRoleFrame", user_email=user.email) # Email tel qu'enregistré
         else:
             messagebox.showerror("Erreur de connexion", message)
 
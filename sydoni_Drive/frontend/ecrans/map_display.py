@@ -1,5 +1,6 @@
 import tkinter as tk
 import tkintermapview
+from backend.routage import calculer_itineraire # Itinéraires sur le réseau routier local
 
 class MapDisplayFrame(tk.Frame):
     """
@@ -67,6 +68,25 @@ class MapDisplayFrame(tk.Frame):
         """
         return self.map_widget.set_path(path_points, color=color, width=width)
 
+    def draw_route(self, waypoints, color="blue", width=5):
+        """
+        Dessine l'itinéraire routier passant par les points donnés, calculé sur le réseau routier local.
+        Les étapes pour lesquelles aucun itinéraire n'est disponible sont tracées en ligne droite.
+
+        Args:
+            waypoints (list): Liste de tuples (latitude, longitude): départ, étapes éventuelles puis arrivée.
+            color (str, optional): Couleur du chemin. Par défaut "blue".
+            width (int, optional): Largeur du chemin. Par défaut 5.
+
+        Returns:
+            tkintermapview.CanvasPath: L'objet chemin créé.
+        """
+        path_points = [waypoints[0]]
+        for (lat1, lon1), (lat2, lon2) in zip(waypoints, waypoints[1:]):
+            itineraire = calculer_itineraire(lat1, lon1, lat2, lon2)
+            path_points.extend(itineraire["polyline"][1:] if itineraire else [(lat2, lon2)])
+        return self.draw_path(path_points, color=color, width=width)
+
     def clear_all_markers_and_paths(self):
         """
         Efface tous les marqueurs et chemins de la carte.
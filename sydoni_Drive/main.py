@@ -6,6 +6,7 @@ from frontend.ecrans.confidentialite import ConfidentialiteFrame
 from frontend.ecrans.interface_automoboliste import InterfaceAutomobilisteFrame
 from frontend.ecrans.interface_passager import InterfacePassagerFrame
 from frontend.historique import HistoriqueFrame
+from backend.points import reprendre_points_existants
 
 
 class SydoniDriveApp(tk.Tk):
@@ -63,6 +64,7 @@ class SydoniDriveApp(tk.Tk):
 
 # Point d'entrée de l'application
 if __name__ == "__main__":
+    reprendre_points_existants() # Les comptes d'avant le journal des points figurent dans les classements
     app = SydoniDriveApp()
     app.mainloop()
 
@@ -1,5 +1,16 @@
+import bisect
+import contextlib
 import json
+import marshal
 import os
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: les écritures ne sont alors protégées qu'entre les threads du processus
+    fcntl = None
 
 # Définition des chemins de fichiers pour le stockage des données
 USERS_FILE = "data/users.json"
@@ -7,42 +18,907 @@ TRAJETS_FILE = "data/trajets.json"
 RESERVATIONS_FILE = "data/reservations.json"
 HISTORIQUES_FILE = "data/historiques.json"
 ANNONCES_FILE = "data/annonces.json" # Nouveau fichier pour les annonces si elles sont séparées des trajets
+POINTS_FILE = "data/points.json" # Journal des points (mouvements ajoutés à la suite)
+SOLDES_FILE = "data/soldes.json" # Soldes de points matérialisés
+
+# Journal des modifications: chaque mutation ajoute une ligne (liste de deltas) à ce fichier,
+# placé dans le même répertoire que les fichiers de données qu'il concerne.
+JOURNAL_FILENAME = "journal.jsonl"
+# Nombre d'entrées du journal au-delà duquel il est replié dans les fichiers JSON (compaction)
+JOURNAL_COMPACTION_THRESHOLD = 500
+
+_verrou = threading.RLock() # Protège les écritures du journal et la compaction
+_journal_counts = {} # Chemin du journal -> nombre d'entrées écrites depuis la dernière compaction
+
+# Fichier verrouillé (flock) pendant les écritures d'un répertoire de données, pour que les processus
+# partageant ce répertoire n'écrivent pas en même temps
+LOCK_FILENAME = ".verrou"
+_verrous_repertoires = {} # Répertoire -> [descripteur du fichier verrou, profondeur d'imbrication]
+
+class ConflitEcriture(Exception):
+    """
+    Levée à la validation d'une transaction quand un enregistrement vérifié (voir Transaction.verifier)
+    a été modifié par une autre écriture depuis sa lecture. Aucune écriture de la transaction n'est faite.
+    """
+
+# Base SQLite utilisée à la place des fichiers JSON lorsque le backend SQLite est activé
+# (par use_sqlite_backend ou la variable d'environnement SYDONI_STOCKAGE=sqlite).
+DATABASE_FILE = "data/sydoni.db"
+_backend = None # None: fichiers JSON journalisés ; sinon instance de stockage_sqlite.SQLiteBackend
+_backend_configured = False
+
+# Cache des fichiers JSON déjà lus: chemin -> (jeton de validité, données, copie sérialisée par marshal).
+# Le jeton combine la taille et la date de modification du fichier et du journal (pour détecter
+# les écritures d'un autre processus) et un compteur de version incrémenté à chaque écriture locale.
+_cache = {}
+_versions = {} # Chemin -> compteur de version
+_cache_stats = {"hits": 0, "misses": 0}
 
 # Assurez-vous que le répertoire 'data' existe
 # os.makedirs("data", exist_ok=True) # Cette ligne est déplacée dans save_data pour garantir la création avant écriture
 
-def load_data(file_path, default_value=None):
+def _read_snapshot(file_path, default_value=None):
+    """
+    Lit le fichier JSON (l'instantané) sans tenir compte du journal.
+    """
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return default_value if default_value is not None else []
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"Erreur de décodage JSON dans {file_path}. Le fichier est peut-être corrompu.")
+        return default_value if default_value is not None else []
+
+def _write_snapshot(file_path, data):
+    """
+    Écrit un instantané complet de manière atomique (fichier temporaire puis renommage),
+    pour qu'un arrêt brutal ne laisse jamais un fichier JSON à moitié écrit.
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextlib.contextmanager
+def _verrou_repertoire(directory):
+    """
+    Verrou exclusif sur les écritures d'un répertoire de données: entre les threads (verrou du module)
+    et entre les processus (flock sur LOCK_FILENAME). Peut être pris plusieurs fois par le même thread.
+    """
+    directory = os.path.normpath(directory or ".")
+    with _verrou:
+        entree = _verrous_repertoires.get(directory)
+        if entree is None:
+            fd = None
+            if fcntl is not None:
+                os.makedirs(directory, exist_ok=True)
+                fd = os.open(os.path.join(directory, LOCK_FILENAME), os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            entree = _verrous_repertoires[directory] = [fd, 0]
+        entree[1] += 1
+        try:
+            yield
+        finally:
+            entree[1] -= 1
+            if entree[1] == 0:
+                del _verrous_repertoires[directory]
+                if entree[0] is not None:
+                    fcntl.flock(entree[0], fcntl.LOCK_UN)
+                    os.close(entree[0])
+
+def _journal_path(file_path):
+    """
+    Retourne le chemin du journal associé au répertoire d'un fichier de données.
+    """
+    return os.path.join(os.path.dirname(file_path), JOURNAL_FILENAME)
+
+def _read_journal(journal_path):
+    """
+    Lit toutes les entrées du journal et retourne la liste aplatie des deltas, dans l'ordre.
+    Une ligne illisible (écriture interrompue) est ignorée.
+    """
+    deltas = []
+    if not os.path.exists(journal_path):
+        return deltas
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                deltas.extend(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Entrée illisible ignorée dans le journal {journal_path}.")
+    return deltas
+
+def _replay(data, deltas):
+    """
+    Applique une suite de deltas à des données chargées depuis un instantané.
+
+    Les fichiers de type liste (utilisateurs, annonces, réservations) reçoivent des deltas
+    'upsert'/'delete' identifiés par un champ clé ; les fichiers de type dictionnaire
+    (historiques) reçoivent des deltas 'set'/'unset' identifiés par un chemin de clés.
+    """
+    if isinstance(data, dict):
+        for delta in deltas:
+            *parents, last = delta["path"]
+            node = data
+            if delta["op"] == "set":
+                for part in parents:
+                    node = node.setdefault(part, {})
+                node[last] = delta["value"]
+            elif delta["op"] == "unset":
+                for part in parents:
+                    node = node.get(part, {})
+                node.pop(last, None)
+        return data
+
+    records = list(data)
+    positions = {} # Champ clé -> {valeur de la clé: position dans records}
+    for delta in deltas:
+        key = delta["key"]
+        index = positions.get(key)
+        if index is None:
+            index = positions[key] = {record.get(key): i for i, record in enumerate(records)}
+        if delta["op"] == "upsert":
+            record = delta["value"]
+            i = index.get(record.get(key))
+            if i is None:
+                index[record.get(key)] = len(records)
+                records.append(record)
+            else:
+                records[i] = record
+        elif delta["op"] == "delete":
+            i = index.pop(delta["id"], None)
+            if i is not None:
+                records[i] = None
+    return [record for record in records if record is not None]
+
+def use_sqlite_backend(db_path=DATABASE_FILE):
+    """
+    Active le backend SQLite pour les utilisateurs, annonces, réservations, historiques et points.
+    Les autres fichiers (universités, trajets) restent en JSON.
+
+    Args:
+        db_path (str): Le chemin du fichier de base de données.
+    """
+    global _backend, _backend_configured
+    from stockage_sqlite import SQLiteBackend
+    if _backend is not None:
+        _backend.close()
+    _backend = SQLiteBackend(db_path)
+    _backend_configured = True
+
+def use_json_backend():
+    """
+    Revient au stockage par fichiers JSON journalisés (comportement par défaut).
+    """
+    global _backend, _backend_configured
+    if _backend is not None:
+        _backend.close()
+    _backend = None
+    _backend_configured = True
+
+def _backend_for(file_path):
+    """
+    Retourne le backend SQLite s'il est actif et qu'il gère ce fichier, sinon None.
+    Le choix du backend par variable d'environnement est fait à la première utilisation.
+    """
+    if not _backend_configured:
+        if os.environ.get("SYDONI_STOCKAGE") == "sqlite":
+            use_sqlite_backend(os.environ.get("SYDONI_DB", DATABASE_FILE))
+        else:
+            use_json_backend()
+    if _backend is not None and _backend.handles(file_path):
+        return _backend
+    return None
+
+def load_data(file_path, default_value=None, readonly=False):
     """
     Charge les données depuis un fichier JSON.
+    Les modifications encore présentes dans le journal sont rejouées sur l'instantané.
+    Le résultat est mis en cache: tant que le fichier n'a pas changé, il n'est pas relu.
 
     Args:
         file_path (str): Le chemin du fichier JSON.
         default_value (any): La valeur à retourner si le fichier n'existe pas ou est vide.
+        readonly (bool, optional): Si True, retourne directement les données du cache, sans copie.
+            L'appelant ne doit alors pas les modifier. Defaults to False.
 
     Returns:
         any: Les données chargées ou la valeur par défaut.
     """
-    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-        return default_value if default_value is not None else []
+    backend = _backend_for(file_path)
+    if backend is not None:
+        return backend.load(file_path, default_value)
+    entry = _cache_entry(file_path, default_value)
+    # Une copie indépendante est obtenue en désérialisant l'image marshal, bien plus rapide que json
+    return entry.data if readonly else marshal.loads(entry.serialized())
+
+def _load_json(file_path, default_value=None):
+    """
+    Charge un fichier JSON et rejoue les deltas du journal qui le concernent.
+    """
+    with _verrou:
+        data = _read_snapshot(file_path, default_value)
+        store = os.path.basename(file_path)
+        deltas = [delta for delta in _read_journal(_journal_path(file_path)) if delta["store"] == store]
+    if deltas:
+        data = _replay(data, deltas)
+    return data
+
+# Cache de lecture: un fichier n'est relu et décodé que s'il a changé depuis la dernière lecture
+
+class _EntreeCache:
+    """
+    Contenu décodé d'un fichier JSON, tenu à jour par les écritures de ce processus.
+    Pour les fichiers de type liste, un index clé -> position (construit à la première recherche
+    sur cette clé) permet de lire et de remplacer un enregistrement en temps constant.
+    """
+    def __init__(self, token, data):
+        self.token = token
+        self.data = data
+        self.positions = {} # Champ clé -> {valeur de la clé: position dans data}
+        self.secondaires = {} # Tuple de champs -> {tuple de valeurs: positions des enregistrements}
+        self.tries = {} # (champ trié, champs de partition) -> {valeurs de partition: [(valeur, position)] triée}
+        self.derives = {} # Nom -> index dérivé fourni par un modèle (ex: index spatial)
+        self._serialized = None # Image marshal de data, recalculée seulement si une copie est demandée
+
+    def serialized(self):
+        if self._serialized is None:
+            self._serialized = marshal.dumps(self.data)
+        return self._serialized
+
+    def position_index(self, key):
+        index = self.positions.get(key)
+        if index is None:
+            index = self.positions[key] = {record.get(key): i for i, record in enumerate(self.data)}
+        return index
+
+    def get(self, key, record_id):
+        i = self.position_index(key).get(record_id)
+        return None if i is None else self.data[i]
+
+    def secondary_index(self, fields):
+        index = self.secondaires.get(fields)
+        if index is None:
+            index = self.secondaires[fields] = {}
+            for i, record in enumerate(self.data):
+                index.setdefault(tuple(record.get(field) for field in fields), set()).add(i)
+        return index
+
+    def derived(self, name, factory):
+        index = self.derives.get(name)
+        if index is None:
+            index = self.derives[name] = factory()
+            for record in self.data:
+                index.add(record)
+        return index
+
+    def sorted_index(self, field, partition):
+        index = self.tries.get((field, partition))
+        if index is None:
+            index = self.tries[(field, partition)] = {}
+            for i, record in enumerate(self.data):
+                if record.get(field) is not None:
+                    index.setdefault(tuple(record.get(part) for part in partition), []).append((record[field], i))
+            for entries in index.values():
+                entries.sort()
+        return index
+
+    def range(self, field, debut, fin, criteria, partitions):
+        """
+        Retourne, triés par `field`, les enregistrements dont la valeur est dans [debut, fin)
+        et qui vérifient les critères. Si un index trié dont la partition est couverte par les
+        critères est déclaré, la recherche se fait par dichotomie suivie d'un parcours de la plage.
+        """
+        usable = [partition for partition in partitions if all(part in criteria for part in partition)]
+        if not usable:
+            candidates = sorted((record[field], i) for i, record in enumerate(self.data)
+                                if record.get(field) is not None)
+            start = 0
+        else:
+            partition = max(usable, key=len)
+            candidates = self.sorted_index(field, partition).get(tuple(criteria[part] for part in partition), [])
+            start = bisect.bisect_left(candidates, (debut,)) if debut is not None else 0
+        resultats = []
+        for value, i in candidates[start:] if start else candidates:
+            if fin is not None and value >= fin:
+                break
+            if debut is not None and value < debut:
+                continue
+            record = self.data[i]
+            if all(record.get(key) == expected for key, expected in criteria.items()):
+                resultats.append(record)
+        return resultats
+
+    def find(self, criteria, indexes):
+        """
+        Recherche les enregistrements correspondant aux critères. Les index dont tous les champs
+        font partie des critères fournissent des positions candidates, qui sont intersectées
+        (en partant de l'ensemble le plus petit) avant la vérification complète des critères.
+        """
+        buckets = []
+        for fields in indexes:
+            if all(field in criteria for field in fields):
+                bucket = self.secondary_index(fields).get(tuple(criteria[field] for field in fields))
+                if not bucket:
+                    return []
+                buckets.append(bucket)
+        if buckets:
+            buckets.sort(key=len)
+            positions = sorted(buckets[0].intersection(*buckets[1:]))
+        else:
+            positions = range(len(self.data))
+        return [self.data[i] for i in positions
+                if all(self.data[i].get(field) == value for field, value in criteria.items())]
+
+    def apply(self, deltas):
+        """
+        Applique à la copie en mémoire les deltas qui viennent d'être écrits dans le journal.
+        """
+        self._serialized = None
+        if isinstance(self.data, dict):
+            _replay(self.data, deltas)
+            return
+        for delta in deltas:
+            key = delta["key"]
+            index = self.position_index(key)
+            if delta["op"] == "upsert":
+                record = delta["value"]
+                i = index.get(record.get(key))
+                if i is None:
+                    i = len(self.data)
+                    self.data.append(record)
+                    for field, other in self.positions.items():
+                        other[record.get(field)] = i
+                else:
+                    old = self.data[i]
+                    self.data[i] = record
+                    for field, other in self.positions.items():
+                        if old.get(field) != record.get(field):
+                            other.pop(old.get(field), None)
+                            other[record.get(field)] = i
+                    for fields, secondaire in self.secondaires.items():
+                        ancienne = tuple(old.get(field) for field in fields)
+                        bucket = secondaire.get(ancienne)
+                        if bucket is not None:
+                            bucket.discard(i)
+                            if not bucket:
+                                del secondaire[ancienne]
+                    for derive in self.derives.values():
+                        derive.discard(old)
+                    for (field, partition), trie in self.tries.items():
+                        if old.get(field) is not None:
+                            entries = trie.get(tuple(old.get(part) for part in partition), [])
+                            j = bisect.bisect_left(entries, (old[field], i))
+                            if j < len(entries) and entries[j] == (old[field], i):
+                                del entries[j]
+                for fields, secondaire in self.secondaires.items():
+                    secondaire.setdefault(tuple(record.get(field) for field in fields), set()).add(i)
+                for (field, partition), trie in self.tries.items():
+                    if record.get(field) is not None:
+                        bisect.insort(trie.setdefault(tuple(record.get(part) for part in partition), []), (record[field], i))
+                for derive in self.derives.values():
+                    derive.add(record)
+            elif delta["op"] == "delete":
+                i = index.get(delta["id"])
+                if i is not None:
+                    for derive in self.derives.values():
+                        derive.discard(self.data[i])
+                    del self.data[i]
+                    # Les positions suivantes ont changé: les index sont reconstruits à la demande
+                    self.positions.clear()
+                    self.secondaires.clear()
+                    self.tries.clear()
+
+_index_declares = {} # Chemin -> tuples de champs indexés, déclarés par les modèles
+
+def declare_index(file_path, *fields):
+    """
+    Déclare un index secondaire sur un ou plusieurs champs d'un fichier de type liste.
+    Les recherches (find_records) dont les critères couvrent ces champs n'examinent alors
+    que les enregistrements candidats. L'index est construit à la première recherche puis
+    maintenu à chaque écriture.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        *fields (str): Les champs composant l'index (ex: "statut", "universite_destination").
+    """
+    indexes = _index_declares.setdefault(os.path.normpath(file_path), [])
+    if fields not in indexes:
+        indexes.append(tuple(fields))
+
+_index_tries = {} # Chemin -> {champ trié: partitions déclarées}
+
+def declare_sorted_index(file_path, field, partition=()):
+    """
+    Déclare un index trié sur un champ (ex: la date de départ), éventuellement partitionné
+    par d'autres champs (ex: le statut). Les recherches par plage (range_records) dont les
+    critères couvrent la partition se font alors par dichotomie.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        field (str): Le champ de tri. Ses valeurs doivent être comparables entre elles (ex: dates ISO).
+        partition (tuple, optional): Les champs de partition. Defaults to ().
+    """
+    partitions = _index_tries.setdefault(os.path.normpath(file_path), {}).setdefault(field, [])
+    if tuple(partition) not in partitions:
+        partitions.append(tuple(partition))
+
+_index_derives = {} # Chemin -> {nom: fabrique d'index dérivé}
+
+def declare_derived_index(file_path, name, factory):
+    """
+    Déclare un index calculé par un modèle à partir des enregistrements (ex: un index spatial
+    des positions de départ). L'index est construit à la première requête puis tenu à jour
+    à chaque écriture, comme les index secondaires.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        name (str): Le nom de l'index.
+        factory (callable): Crée un index vide exposant add(record) et discard(record).
+    """
+    _index_derives.setdefault(os.path.normpath(file_path), {})[name] = factory
+
+def query_derived_index(file_path, name, requete):
+    """
+    Exécute une requête sur un index dérivé, à jour du contenu du fichier.
+    L'index ne doit pas être conservé ni modifié par la requête.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        name (str): Le nom de l'index (déclaré par declare_derived_index).
+        requete (callable): Fonction recevant l'index et retournant le résultat.
+
+    Returns:
+        any: Le résultat de la requête.
+    """
+    factory = _index_derives[os.path.normpath(file_path)][name]
+    backend = _backend_for(file_path)
+    if backend is not None:
+        return backend.query_derived(file_path, name, factory, requete)
+    with _verrou:
+        return requete(_cache_entry(file_path, default_value=[]).derived(name, factory))
+
+def _stat_token(path):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        print(f"Erreur de décodage JSON dans {file_path}. Le fichier est peut-être corrompu.")
-        return default_value if default_value is not None else []
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _cache_token(file_path, default_type):
+    """
+    Jeton de validité d'une entrée du cache: taille et date de modification du fichier et du journal,
+    compteur de version local et type de la valeur par défaut.
+    """
+    return (_stat_token(file_path), _stat_token(_journal_path(file_path)),
+            _versions.get(os.path.normpath(file_path), 0), default_type)
+
+def data_token(file_path):
+    """
+    Retourne un jeton qui change à chaque écriture d'un fichier JSON, par ce processus ou par un autre.
+    Permet à un module de tenir une structure calculée à partir du fichier (ex: un registre)
+    et de la reconstruire seulement quand le fichier a changé.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+
+    Returns:
+        tuple: Le jeton, à comparer à celui obtenu lors du calcul précédent.
+    """
+    with _verrou:
+        return (os.path.normpath(file_path),) + _cache_token(file_path, None)[:3]
+
+def _bump_version(file_path):
+    """
+    Invalide l'entrée du cache d'un fichier après une écriture faite par ce processus.
+    """
+    cle = os.path.normpath(file_path)
+    _versions[cle] = _versions.get(cle, 0) + 1
+
+def _cache_entry(file_path, default_value=None):
+    """
+    Retourne l'entrée du cache d'un fichier JSON, en le relisant s'il a changé.
+    """
+    cle = os.path.normpath(file_path)
+    default_value = default_value if default_value is not None else []
+    with _verrou:
+        token = _cache_token(file_path, type(default_value))
+        entry = _cache.get(cle)
+        if entry is not None and entry.token == token:
+            _cache_stats["hits"] += 1
+            return entry
+        _cache_stats["misses"] += 1
+        entry = _cache[cle] = _EntreeCache(token, _load_json(file_path, default_value))
+        return entry
+
+def _valid_entries(directory):
+    """
+    Retourne les entrées du cache encore valides pour les fichiers d'un répertoire.
+    """
+    directory = os.path.normpath(directory or ".")
+    valides = {}
+    for cle, entry in _cache.items():
+        if os.path.normpath(os.path.dirname(cle) or ".") == directory and entry.token == _cache_token(cle, entry.token[3]):
+            valides[cle] = entry
+    return valides
+
+def cache_stats():
+    """
+    Retourne les compteurs du cache de lecture.
+
+    Returns:
+        dict: {"hits": lectures servies par le cache, "misses": lectures ayant nécessité de décoder le fichier}.
+    """
+    with _verrou:
+        return dict(_cache_stats)
+
+def clear_cache():
+    """
+    Vide le cache de lecture et remet ses compteurs à zéro.
+    """
+    with _verrou:
+        _cache.clear()
+        _cache_stats["hits"] = 0
+        _cache_stats["misses"] = 0
 
 def save_data(file_path, data):
     """
     Sauvegarde les données dans un fichier JSON.
+    Le journal en attente est d'abord replié dans les instantanés, puis le fichier est réécrit en entier.
 
     Args:
         file_path (str): Le chemin du fichier JSON.
         data (any): Les données à sauvegarder.
     """
-    # Assurez-vous que le répertoire existe avant d'écrire le fichier
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    backend = _backend_for(file_path)
+    if backend is not None:
+        backend.save(file_path, data)
+        return
+    with _verrou_repertoire(os.path.dirname(file_path)):
+        if os.path.exists(_journal_path(file_path)):
+            compact_journal(os.path.dirname(file_path))
+        _write_snapshot(file_path, data)
+        _bump_version(file_path)
+
+# Fonctions de journalisation: une mutation n'écrit que le delta de l'enregistrement concerné
+
+def _append_journal(file_path, deltas):
+    """
+    Ajoute une entrée (liste de deltas) concernant un fichier au journal de son répertoire.
+    """
+    store = os.path.basename(file_path)
+    for delta in deltas:
+        delta["store"] = store
+    _write_journal_entry(os.path.dirname(file_path), deltas)
+
+def _write_journal_entry(directory, deltas):
+    """
+    Écrit une entrée (liste de deltas déjà associés à leur fichier) en une seule écriture
+    synchronisée, puis déclenche la compaction si le seuil est atteint.
+    Une entrée est rejouée entièrement ou pas du tout.
+    """
+    journal_path = os.path.join(directory, JOURNAL_FILENAME)
+    line = (json.dumps(deltas) + "\n").encode("utf-8")
+    with _verrou_repertoire(directory):
+        os.makedirs(directory or ".", exist_ok=True)
+        if journal_path not in _journal_counts:
+            _journal_counts[journal_path] = _count_journal_entries(journal_path)
+        valides = _valid_entries(directory)
+        taille_avant = (_stat_token(journal_path) or (0, 0))[1]
+        with open(journal_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        for store in {delta["store"] for delta in deltas}:
+            _bump_version(os.path.join(directory, store))
+        # Si personne d'autre n'a écrit dans le journal entre-temps, les entrées du cache sont
+        # mises à jour sur place au lieu d'être relues ; sinon elles seront relues à la prochaine lecture.
+        if (_stat_token(journal_path) or (0, 0))[1] == taille_avant + len(line):
+            copies = _copie(deltas)
+            for cle, entry in valides.items():
+                store = os.path.basename(cle)
+                entry.apply([delta for delta in copies if delta["store"] == store])
+                entry.token = _cache_token(cle, entry.token[3])
+        _journal_counts[journal_path] += 1
+        if _journal_counts[journal_path] >= JOURNAL_COMPACTION_THRESHOLD:
+            compact_journal(directory)
+
+def _count_journal_entries(journal_path):
+    if not os.path.exists(journal_path):
+        return 0
+    with open(journal_path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+def upsert_record(file_path, record, key):
+    """
+    Ajoute ou remplace un enregistrement d'un fichier de type liste, identifié par le champ `key`.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        record (dict): L'enregistrement complet à écrire.
+        key (str): Le nom du champ servant d'identifiant (ex: "email", "id_annonce").
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        backend.upsert(file_path, record, key)
+        return
+    _append_journal(file_path, [{"op": "upsert", "key": key, "value": record}])
+
+def delete_record(file_path, record_id, key):
+    """
+    Supprime l'enregistrement dont le champ `key` vaut `record_id` d'un fichier de type liste.
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        backend.delete(file_path, record_id, key)
+        return
+    _append_journal(file_path, [{"op": "delete", "key": key, "id": record_id}])
+
+def set_entry(file_path, path, value):
+    """
+    Écrit `value` dans un fichier de type dictionnaire, au chemin de clés `path`
+    (ex: [email, id_annonce] pour les historiques).
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        backend.set_entry(file_path, path, value)
+        return
+    _append_journal(file_path, [{"op": "set", "path": list(path), "value": value}])
+
+# Fonctions de recherche: avec le backend SQLite, les critères sont évalués par la base (index)
+
+def get_record(file_path, record_id, key):
+    """
+    Récupère l'enregistrement dont le champ `key` vaut `record_id`.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        record_id (any): La valeur recherchée.
+        key (str): Le nom du champ servant d'identifiant.
+
+    Returns:
+        dict or None: L'enregistrement trouvé, sinon None.
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        return backend.get(file_path, record_id, key)
+    record = _cache_entry(file_path, default_value=[]).get(key, record_id)
+    return _copie(record) if record is not None else None
+
+def find_records(file_path, **criteria):
+    """
+    Récupère les enregistrements dont les champs valent les critères donnés (ex: statut="active").
+
+    Returns:
+        list: Les enregistrements correspondants, dans l'ordre de stockage.
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        return backend.find(file_path, **criteria)
+    indexes = _index_declares.get(os.path.normpath(file_path), [])
+    return [_copie(record) for record in _cache_entry(file_path, default_value=[]).find(criteria, indexes)]
+
+def range_records(file_path, field, debut=None, fin=None, **criteria):
+    """
+    Récupère, triés par `field`, les enregistrements dont la valeur de `field` est comprise
+    dans [debut, fin) et dont les autres champs valent les critères donnés.
+
+    Args:
+        file_path (str): Le chemin du fichier JSON.
+        field (str): Le champ de tri et de comparaison.
+        debut (any, optional): Borne inférieure incluse (None: pas de borne).
+        fin (any, optional): Borne supérieure exclue (None: pas de borne).
+
+    Returns:
+        list: Les enregistrements correspondants, triés par `field`.
+    """
+    backend = _backend_for(file_path)
+    if backend is not None:
+        return backend.range(file_path, field, debut, fin, **criteria)
+    partitions = _index_tries.get(os.path.normpath(file_path), {}).get(field, [])
+    return [_copie(record) for record in _cache_entry(file_path, default_value=[]).range(field, debut, fin, criteria, partitions)]
+
+def _copie(data):
+    """
+    Copie profonde rapide de données issues d'un fichier JSON.
+    """
+    return marshal.loads(marshal.dumps(data))
+
+def compact_journal(directory="data"):
+    """
+    Replie le journal d'un répertoire dans les fichiers JSON correspondants,
+    puis le vide. Les deltas étant idempotents, une compaction interrompue peut être relancée.
+
+    Args:
+        directory (str): Le répertoire contenant les données et leur journal.
+    """
+    journal_path = os.path.join(directory, JOURNAL_FILENAME)
+    with _verrou_repertoire(directory):
+        valides = _valid_entries(directory)
+        deltas = _read_journal(journal_path)
+        by_store = {}
+        for delta in deltas:
+            by_store.setdefault(delta["store"], []).append(delta)
+        for store, store_deltas in by_store.items():
+            file_path = os.path.join(directory, store)
+            default_value = {} if store_deltas[0]["op"] in ("set", "unset") else []
+            data = _replay(_read_snapshot(file_path, default_value), store_deltas)
+            _write_snapshot(file_path, data)
+            _bump_version(file_path)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        _journal_counts[journal_path] = 0
+        # Le contenu des fichiers est inchangé: les entrées du cache restent valables
+        for cle, entry in valides.items():
+            entry.token = _cache_token(cle, entry.token[3])
+
+# Unité de travail: une opération métier lit chaque fichier au plus une fois
+# et n'effectue qu'une seule écriture durable à la fin.
+
+def acces(transaction=None):
+    """
+    Retourne l'objet à utiliser pour lire et écrire les données: la transaction si elle est fournie,
+    sinon ce module (chaque écriture est alors immédiate). Les deux exposent les mêmes fonctions
+    (load_data, get_record, find_records, upsert_record, delete_record, set_entry).
+    """
+    return transaction if transaction is not None else sys.modules[__name__]
+
+class Transaction:
+    """
+    Unité de travail regroupant les lectures et écritures d'une opération métier.
+
+    Chaque fichier est chargé au plus une fois, les écritures sont appliquées à une copie de travail
+    et mémorisées sous forme de deltas. À la validation, tous les deltas sont écrits en une seule
+    entrée du journal (ou une seule transaction SQLite), ce qui les rend atomiques.
+
+    Utilisation:
+        with Transaction() as tx:
+            annonce = tx.get_record(ANNONCES_FILE, annonce_id, key="id_annonce")
+            tx.upsert_record(ANNONCES_FILE, annonce, key="id_annonce")
+    """
+    def __init__(self):
+        self._stores = {} # Fichier -> données complètes chargées (copie de travail)
+        self._records = {} # (fichier, clé, valeur) -> enregistrement lu ou écrit
+        self._deltas = [] # (fichier, delta) dans l'ordre des écritures
+        self._verifications = [] # (fichier, valeur de la clé, clé, champ, valeur attendue, défaut) vérifiés à la validation
+        self.dirty = set() # Fichiers modifiés par la transaction
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def load_data(self, file_path, default_value=None):
+        """
+        Charge un fichier une seule fois pour toute la transaction et retourne sa copie de travail.
+        """
+        if file_path not in self._stores:
+            data = load_data(file_path, default_value)
+            pending = [delta for path, delta in self._deltas if path == file_path]
+            self._stores[file_path] = _replay(data, pending) if pending else data
+        return self._stores[file_path]
+
+    def get_record(self, file_path, record_id, key):
+        """
+        Récupère un enregistrement, en tenant compte des écritures déjà faites dans la transaction.
+        """
+        if file_path in self._stores:
+            for record in self._stores[file_path]:
+                if record.get(key) == record_id:
+                    return record
+            return None
+        cache_key = (file_path, key, record_id)
+        if cache_key not in self._records:
+            self._records[cache_key] = get_record(file_path, record_id, key)
+        return self._records[cache_key]
+
+    def find_records(self, file_path, **criteria):
+        """
+        Recherche des enregistrements dans la copie de travail du fichier.
+        """
+        return [record for record in self.load_data(file_path, default_value=[])
+                if all(record.get(field) == value for field, value in criteria.items())]
+
+    def _write(self, file_path, delta):
+        self._deltas.append((file_path, delta))
+        self.dirty.add(file_path)
+        if file_path in self._stores:
+            self._stores[file_path] = _replay(self._stores[file_path], [delta])
+
+    def upsert_record(self, file_path, record, key):
+        """
+        Ajoute ou remplace un enregistrement (écrit à la validation).
+        """
+        self._write(file_path, {"op": "upsert", "key": key, "value": record})
+        self._records[(file_path, key, record.get(key))] = record
+
+    def delete_record(self, file_path, record_id, key):
+        """
+        Supprime un enregistrement (à la validation).
+        """
+        self._write(file_path, {"op": "delete", "key": key, "id": record_id})
+        self._records[(file_path, key, record_id)] = None
+
+    def set_entry(self, file_path, path, value):
+        """
+        Écrit une entrée d'un fichier de type dictionnaire (à la validation).
+        """
+        self._write(file_path, {"op": "set", "path": list(path), "value": value})
+
+    def verifier(self, file_path, record_id, key, champ, valeur, defaut=None):
+        """
+        Ajoute une condition à la validation (compare-and-swap): au moment de l'écriture, le champ `champ`
+        de l'enregistrement doit valoir `valeur` (`defaut` si le champ est absent). Avec `valeur` None,
+        l'enregistrement peut aussi être absent (il ne doit pas avoir été créé entre-temps).
+        Sinon la validation lève ConflitEcriture et rien n'est écrit.
+        Utilisé avec un numéro de version incrémenté à chaque écriture (ex: les annonces, les soldes de points).
+        """
+        self._verifications.append((file_path, record_id, key, champ, valeur, defaut))
+
+    def commit(self):
+        """
+        Écrit tous les deltas de la transaction en une seule fois: une entrée du journal par
+        répertoire de données, ou une transaction SQLite pour les fichiers gérés par la base.
+        Les conditions (voir verifier) sont contrôlées et les deltas écrits sous le verrou des
+        répertoires concernés, sans qu'un autre thread ou processus puisse écrire entre les deux.
+
+        Raises:
+            ConflitEcriture: Si une condition n'est plus remplie.
+        """
+        journal_entries = {} # Répertoire -> deltas
+        backend_deltas = []
+        for file_path, delta in self._deltas:
+            delta["store"] = os.path.basename(file_path)
+            if _backend_for(file_path) is not None:
+                backend_deltas.append(delta)
+            else:
+                journal_entries.setdefault(os.path.dirname(file_path), []).append(delta)
+        verifications_backend = [verification for verification in self._verifications if _backend_for(verification[0]) is not None]
+        verifications_json = [verification for verification in self._verifications if _backend_for(verification[0]) is None]
+        repertoires = set(journal_entries) | {os.path.dirname(verification[0]) for verification in verifications_json}
+        try:
+            with contextlib.ExitStack() as verrous:
+                # Toujours dans le même ordre, pour que deux transactions ne s'attendent pas mutuellement
+                for directory in sorted(os.path.normpath(directory or ".") for directory in repertoires):
+                    verrous.enter_context(_verrou_repertoire(directory))
+                for file_path, record_id, key, champ, valeur, defaut in verifications_json:
+                    # Relu sous le verrou: le cache est invalidé par les écritures des autres processus
+                    record = _cache_entry(file_path, default_value=[]).get(key, record_id)
+                    if (record.get(champ, defaut) if record is not None else None) != valeur:
+                        raise ConflitEcriture(f"{os.path.basename(file_path)}: {record_id} a été modifié entre-temps.")
+                if backend_deltas or verifications_backend:
+                    _backend.apply(backend_deltas, verifications_backend)
+                for directory, deltas in journal_entries.items():
+                    _write_journal_entry(directory, deltas)
+        finally:
+            self.rollback()
+
+    def rollback(self):
+        """
+        Abandonne les écritures en attente et la copie de travail.
+        """
+        self._stores.clear()
+        self._records.clear()
+        self._deltas.clear()
+        self._verifications.clear()
+        self.dirty.clear()
+
 
 # Fonctions spécifiques pour charger/sauvegarder chaque type de données
 
@@ -70,21 +946,58 @@ def load_historiques():
 def save_historiques(historiques):
     save_data(HISTORIQUES_FILE, historiques)
 
+def set_historique(email, trajet_id, entree, transaction=None):
+    """
+    Écrit l'entrée d'historique d'un utilisateur pour un trajet, sans réécrire tout le fichier.
+    """
+    acces(transaction).set_entry(HISTORIQUES_FILE, [email, trajet_id], entree)
+
 def load_annonces():
     return load_data(ANNONCES_FILE, default_value=[])
 
 def save_annonces(annonces):
     save_data(ANNONCES_FILE, annonces)
 
+def migrate_json_to_sqlite(db_path=DATABASE_FILE, data_dir="data"):
+    """
+    Migration unique des fichiers JSON (journal compris) vers une base SQLite.
+    Le contenu des tables est remplacé par celui des fichiers.
+
+    Args:
+        db_path (str): Le chemin de la base de données à remplir.
+        data_dir (str): Le répertoire contenant les fichiers JSON.
+
+    Returns:
+        dict: Le nombre d'enregistrements migrés par fichier.
+    """
+    from stockage_sqlite import SQLiteBackend, HISTORIQUES_STORE
+    backend = SQLiteBackend(db_path)
+    counts = {}
+    try:
+        for store in backend.stores():
+            file_path = os.path.join(data_dir, store)
+            default_value = {} if store == HISTORIQUES_STORE else []
+            data = _load_json(file_path, default_value)
+            backend.save(file_path, data)
+            counts[store] = sum(len(trajets) for trajets in data.values()) if isinstance(data, dict) else len(data)
+    finally:
+        backend.close()
+    return counts
+
 
 def clear_all_data():
     """
     Supprime tous les fichiers de données pour réinitialiser l'état du système.
     Utilisé principalement pour les tests.
     """
-    for file_path in [USERS_FILE, TRAJETS_FILE, RESERVATIONS_FILE, HISTORIQUES_FILE, ANNONCES_FILE]:
+    for file_path in [USERS_FILE, TRAJETS_FILE, RESERVATIONS_FILE, HISTORIQUES_FILE, ANNONCES_FILE,
+                      POINTS_FILE, SOLDES_FILE, _journal_path(USERS_FILE), os.path.join("data", LOCK_FILENAME)]:
         if os.path.exists(file_path):
             os.remove(file_path)
+    _journal_counts.clear()
+    clear_cache()
+    if _backend is not None:
+        _backend.clear()
     # Supprimer le répertoire data s'il est vide après suppression des fichiers
     if os.path.exists("data") and not os.listdir("data"):
         os.rmdir("data")
@@ -0,0 +1,371 @@
+import json
+import os
+import sqlite3
+import threading
+from stockage import ConflitEcriture
+
+# Tables remplaçant les fichiers JSON: nom du fichier -> table, clé primaire et colonnes extraites.
+# Les colonnes extraites sont celles sur lesquelles les recherches sont faites (et indexées) ;
+# l'enregistrement complet est conservé tel quel dans la colonne "data".
+TABLES = {
+    "users.json": {
+        "table": "users",
+        "key": "email",
+        "columns": ("email",),
+    },
+    "annonces.json": {
+        "table": "annonces",
+        "key": "id_annonce",
+        "columns": ("id_annonce", "statut", "universite_destination", "id_automobiliste", "depart_prevu"),
+    },
+    "reservations.json": {
+        "table": "reservations",
+        "key": "id_reservation",
+        "columns": ("id_reservation", "id_automobiliste", "id_passager", "statut", "id_annonce"),
+    },
+    "points.json": {
+        "table": "mouvements_points",
+        "key": "id_mouvement",
+        "columns": ("id_mouvement", "email", "id_trajet"),
+    },
+    "soldes.json": {
+        "table": "soldes",
+        "key": "email",
+        "columns": ("email",),
+    },
+}
+# Les historiques sont un dictionnaire {email: {id_trajet: entrée}} et ont leur propre table
+HISTORIQUES_STORE = "historiques.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS annonces (
+    id_annonce TEXT PRIMARY KEY,
+    statut TEXT,
+    universite_destination TEXT,
+    id_automobiliste TEXT,
+    depart_prevu TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_annonces_statut_universite ON annonces (statut, universite_destination);
+CREATE INDEX IF NOT EXISTS idx_annonces_universite ON annonces (universite_destination);
+CREATE INDEX IF NOT EXISTS idx_annonces_automobiliste ON annonces (id_automobiliste);
+CREATE INDEX IF NOT EXISTS idx_annonces_statut_depart ON annonces (statut, depart_prevu);
+CREATE INDEX IF NOT EXISTS idx_annonces_depart ON annonces (depart_prevu);
+CREATE TABLE IF NOT EXISTS reservations (
+    id_reservation TEXT PRIMARY KEY,
+    id_automobiliste TEXT,
+    id_passager TEXT,
+    statut TEXT,
+    id_annonce TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_annonce ON reservations (id_annonce);
+CREATE INDEX IF NOT EXISTS idx_reservations_automobiliste ON reservations (id_automobiliste);
+CREATE INDEX IF NOT EXISTS idx_reservations_passager ON reservations (id_passager);
+CREATE INDEX IF NOT EXISTS idx_reservations_statut ON reservations (statut);
+CREATE TABLE IF NOT EXISTS mouvements_points (
+    id_mouvement TEXT PRIMARY KEY,
+    email TEXT,
+    id_trajet TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mouvements_points_email ON mouvements_points (email);
+CREATE TABLE IF NOT EXISTS soldes (
+    email TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS historiques (
+    email TEXT NOT NULL,
+    id_trajet TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (email, id_trajet)
+);
+"""
+
+class SQLiteBackend:
+    """
+    Stockage des utilisateurs, annonces, réservations, historiques et points dans une base SQLite.
+    Expose les mêmes opérations que le stockage JSON (chargement, sauvegarde, mutation d'un
+    enregistrement) et permet en plus d'exécuter les recherches directement en SQL.
+    """
+    def __init__(self, db_path):
+        """
+        Initialise le backend. La base n'est ouverte qu'à la première opération.
+
+        Args:
+            db_path (str): Le chemin du fichier de base de données SQLite.
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.RLock() # Une seule connexion partagée entre les threads
+        self._derives = {} # Table -> {nom: index dérivé}, tenus à jour par les écritures de ce processus
+        self._data_version = None # PRAGMA data_version lors de la dernière vérification des index dérivés
+
+    def _connexion(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._ajouter_colonnes_manquantes()
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _verifier_derives(self, conn):
+        """
+        Abandonne les index dérivés si une autre connexion (un autre processus) a écrit dans la base
+        depuis la dernière vérification: PRAGMA data_version ne change qu'avec les écritures des autres
+        connexions, celles de ce backend étant déjà reportées sur les index.
+        """
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._derives.clear()
+            self._data_version = version
+
+    def _ajouter_colonnes_manquantes(self):
+        """
+        Met à niveau une base créée par une version précédente en ajoutant les colonnes extraites
+        apparues depuis (les valeurs sont reprises de la colonne "data").
+        """
+        for schema in TABLES.values():
+            existantes = {row[1] for row in self._conn.execute(f"PRAGMA table_info({schema['table']})")}
+            if not existantes:
+                continue # Table pas encore créée: le schéma complet sera appliqué
+            for column in schema["columns"]:
+                if column not in existantes:
+                    with self._conn:
+                        self._conn.execute(f"ALTER TABLE {schema['table']} ADD COLUMN {column} TEXT")
+                        self._conn.execute(f"UPDATE {schema['table']} SET {column} = json_extract(data, '$.{column}')")
+
+    def handles(self, file_path):
+        """
+        Indique si le fichier JSON donné est remplacé par une table de ce backend.
+        """
+        store = os.path.basename(file_path)
+        return store in TABLES or store == HISTORIQUES_STORE
+
+    def stores(self):
+        """
+        Retourne les noms des fichiers JSON remplacés par ce backend.
+        """
+        return list(TABLES) + [HISTORIQUES_STORE]
+
+    @staticmethod
+    def _row_values(schema, record):
+        return [record.get(column) for column in schema["columns"]] + [json.dumps(record)]
+
+    def _upsert_sql(self, schema):
+        columns = list(schema["columns"]) + ["data"]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != schema["key"])
+        return (
+            f"INSERT INTO {schema['table']} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({schema['key']}) DO UPDATE SET {updates}"
+        )
+
+    def load(self, file_path, default_value=None):
+        """
+        Charge le contenu complet d'une table, sous la même forme que le fichier JSON correspondant.
+        """
+        store = os.path.basename(file_path)
+        with self._lock:
+            conn = self._connexion()
+            if store == HISTORIQUES_STORE:
+                historiques = {}
+                for email, id_trajet, data in conn.execute("SELECT email, id_trajet, data FROM historiques ORDER BY rowid"):
+                    historiques.setdefault(email, {})[id_trajet] = json.loads(data)
+                return historiques
+            schema = TABLES[store]
+            rows = conn.execute(f"SELECT data FROM {schema['table']} ORDER BY rowid").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def save(self, file_path, data):
+        """
+        Remplace le contenu complet d'une table, dans une seule transaction.
+        """
+        store = os.path.basename(file_path)
+        with self._lock:
+            conn = self._connexion()
+            with conn:
+                if store == HISTORIQUES_STORE:
+                    conn.execute("DELETE FROM historiques")
+                    conn.executemany(
+                        "INSERT INTO historiques (email, id_trajet, data) VALUES (?, ?, ?)",
+                        [(email, id_trajet, json.dumps(entree))
+                         for email, trajets in data.items() for id_trajet, entree in trajets.items()]
+                    )
+                    return
+                schema = TABLES[store]
+                self._derives.pop(schema["table"], None)
+                conn.execute(f"DELETE FROM {schema['table']}")
+                conn.executemany(self._upsert_sql(schema), [self._row_values(schema, record) for record in data])
+
+    def upsert(self, file_path, record, key):
+        """
+        Ajoute ou remplace un seul enregistrement.
+        """
+        self.apply([{"store": os.path.basename(file_path), "op": "upsert", "key": key, "value": record}])
+
+    def delete(self, file_path, record_id, key):
+        """
+        Supprime un seul enregistrement par sa clé primaire.
+        """
+        self.apply([{"store": os.path.basename(file_path), "op": "delete", "key": key, "id": record_id}])
+
+    def set_entry(self, file_path, path, value):
+        """
+        Écrit une entrée d'historique identifiée par le chemin [email, id_trajet].
+        """
+        self.apply([{"store": os.path.basename(file_path), "op": "set", "path": list(path), "value": value}])
+
+    def apply(self, deltas, verifications=()):
+        """
+        Applique une liste de deltas (même format que le journal JSON) dans une seule transaction.
+        Les conditions (fichier, valeur de la clé, clé, champ, valeur attendue, défaut) sont d'abord
+        contrôlées dans la même transaction, ouverte en écriture (BEGIN IMMEDIATE) pour qu'aucun
+        autre processus ne puisse écrire entre le contrôle et les deltas.
+
+        Raises:
+            ConflitEcriture: Si une condition n'est plus remplie (rien n'est alors écrit).
+        """
+        with self._lock:
+            conn = self._connexion()
+            self._verifier_derives(conn)
+            try:
+                with conn:
+                    if verifications:
+                        conn.execute("BEGIN IMMEDIATE")
+                        for file_path, record_id, key, champ, valeur, defaut in verifications:
+                            record = self.get(file_path, record_id, key)
+                            if (record.get(champ, defaut) if record is not None else None) != valeur:
+                                raise ConflitEcriture(f"{os.path.basename(file_path)}: {record_id} a été modifié entre-temps.")
+                    for delta in deltas:
+                        self._apply_delta(conn, delta)
+            except ConflitEcriture:
+                raise
+            except Exception:
+                self._derives.clear() # La transaction est annulée: les index dérivés sont reconstruits
+                raise
+
+    def _apply_delta(self, conn, delta):
+        if delta["store"] == HISTORIQUES_STORE:
+            email, id_trajet = delta["path"]
+            if delta["op"] == "set":
+                conn.execute(
+                    "INSERT INTO historiques (email, id_trajet, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT (email, id_trajet) DO UPDATE SET data = excluded.data",
+                    (email, id_trajet, json.dumps(delta["value"]))
+                )
+            elif delta["op"] == "unset":
+                conn.execute("DELETE FROM historiques WHERE email = ? AND id_trajet = ?", (email, id_trajet))
+            return
+        schema = TABLES[delta["store"]]
+        derives = self._derives.get(schema["table"])
+        if derives:
+            record_id = delta["value"].get(schema["key"]) if delta["op"] == "upsert" else delta["id"]
+            row = conn.execute(f"SELECT data FROM {schema['table']} WHERE {schema['key']} = ?", (record_id,)).fetchone()
+            if row is not None:
+                old = json.loads(row[0])
+                for derive in derives.values():
+                    derive.discard(old)
+        if delta["op"] == "upsert":
+            conn.execute(self._upsert_sql(schema), self._row_values(schema, delta["value"]))
+            for derive in (derives or {}).values():
+                derive.add(delta["value"])
+        elif delta["op"] == "delete":
+            conn.execute(f"DELETE FROM {schema['table']} WHERE {schema['key']} = ?", (delta["id"],))
+
+    def get(self, file_path, record_id, key):
+        """
+        Récupère un enregistrement par la valeur d'une colonne indexée (None si absent).
+        """
+        records = self.find(file_path, **{key: record_id})
+        return records[0] if records else None
+
+    def find(self, file_path, **criteria):
+        """
+        Recherche les enregistrements dont les champs valent les critères donnés.
+        Les critères portant sur une colonne de la table sont évalués en SQL (et profitent des index),
+        les autres sont vérifiés après décodage.
+        """
+        schema = TABLES[os.path.basename(file_path)]
+        sql_criteria = {field: value for field, value in criteria.items() if field in schema["columns"]}
+        other_criteria = {field: value for field, value in criteria.items() if field not in sql_criteria}
+        query = f"SELECT data FROM {schema['table']}"
+        if sql_criteria:
+            # IS plutôt que =: un critère None retrouve les valeurs absentes, comme avec les fichiers JSON
+            query += " WHERE " + " AND ".join(f"{field} IS ?" for field in sql_criteria)
+        query += " ORDER BY rowid"
+        with self._lock:
+            rows = self._connexion().execute(query, list(sql_criteria.values())).fetchall()
+        records = [json.loads(data) for (data,) in rows]
+        if other_criteria:
+            records = [record for record in records
+                       if all(record.get(field) == value for field, value in other_criteria.items())]
+        return records
+
+    def range(self, file_path, field, debut=None, fin=None, **criteria):
+        """
+        Recherche, triés par `field`, les enregistrements dont la valeur est dans [debut, fin)
+        et qui vérifient les critères. La plage est évaluée en SQL si `field` est une colonne de la table.
+        """
+        schema = TABLES[os.path.basename(file_path)]
+        if field not in schema["columns"]:
+            records = [record for record in self.find(file_path, **criteria) if record.get(field) is not None
+                       and (debut is None or record[field] >= debut) and (fin is None or record[field] < fin)]
+            return sorted(records, key=lambda record: record[field])
+        sql_criteria = {key: value for key, value in criteria.items() if key in schema["columns"]}
+        other_criteria = {key: value for key, value in criteria.items() if key not in sql_criteria}
+        conditions = [f"{key} IS ?" for key in sql_criteria] + [f"{field} IS NOT NULL"]
+        params = list(sql_criteria.values())
+        if debut is not None:
+            conditions.append(f"{field} >= ?")
+            params.append(debut)
+        if fin is not None:
+            conditions.append(f"{field} < ?")
+            params.append(fin)
+        query = f"SELECT data FROM {schema['table']} WHERE {' AND '.join(conditions)} ORDER BY {field}, rowid"
+        with self._lock:
+            rows = self._connexion().execute(query, params).fetchall()
+        records = [json.loads(data) for (data,) in rows]
+        return [record for record in records
+                if all(record.get(key) == value for key, value in other_criteria.items())]
+
+    def query_derived(self, file_path, name, factory, requete):
+        """
+        Exécute une requête sur un index dérivé (voir stockage.declare_derived_index).
+        L'index est construit à partir de la table à la première requête puis tenu à jour par
+        les écritures faites par ce backend ; il est reconstruit si un autre processus a écrit dans la base.
+        """
+        table = TABLES[os.path.basename(file_path)]["table"]
+        with self._lock:
+            self._verifier_derives(self._connexion())
+            derives = self._derives.setdefault(table, {})
+            index = derives.get(name)
+            if index is None:
+                index = derives[name] = factory()
+                for record in self.load(file_path):
+                    index.add(record)
+            return requete(index)
+
+    def clear(self):
+        """
+        Ferme la base et supprime ses fichiers. Utilisé principalement pour les tests.
+        """
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def close(self):
+        """
+        Ferme la connexion à la base si elle est ouverte.
+        """
+        with self._lock:
+            self._derives.clear()
+            self._data_version = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
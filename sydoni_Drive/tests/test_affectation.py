@@ -0,0 +1,74 @@
+import unittest
+import os
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stockage import clear_all_data
+from backend.affectation import calculer_affectation, affecter_en_lot
+from backend.models.annonce import Annonce, get_annonce_by_id
+from backend.users import register_user
+from backend.trajets import publier_trajet
+
+UNZ = "Université Norbert Zongo (UNZ)" # 12.2400, -2.3990
+UNIVERSITES = {UNZ: (12.2400, -2.3990)}
+
+def annonce(id_annonce, lat, lon, places=1):
+    return Annonce("auto@example.com", UNZ, "07:00", places, "voiture", id_annonce=id_annonce,
+                   position_depart={"latitude": lat, "longitude": lon}, statut="en_attente")
+
+class TestCalculerAffectation(unittest.TestCase):
+
+    def test_report_libere_une_place(self):
+        """
+        p1 est le plus proche de A mais peut aussi aller en B; p2 ne peut aller qu'en A.
+        Le premier arrivé prendrait A et laisserait p2 sans place.
+        """
+        annonces = [annonce("A", 12.40, -2.399), annonce("B", 12.40, -2.420)]
+        demandes = [{"id": "p1", "latitude": 12.39, "longitude": -2.409, "universite": UNZ},
+                    {"id": "p2", "latitude": 12.385, "longitude": -2.399, "universite": UNZ}]
+        resultat = calculer_affectation(demandes, annonces, UNIVERSITES, distance_max_km=2.0)
+        self.assertEqual(resultat["affectations"], {"p1": "B", "p2": "A"})
+        self.assertEqual(resultat["non_affectees"], [])
+
+    def test_places_et_eligibilite_respectees(self):
+        annonces = [annonce("A", 12.40, -2.399, places=2), annonce("Sud", 12.20, -2.399, places=3)]
+        demandes = [{"id": f"p{i}", "latitude": 12.39, "longitude": -2.399 + i * 0.001, "universite": UNZ} for i in range(4)]
+        resultat = calculer_affectation(demandes, annonces, UNIVERSITES)
+        # L'annonce "Sud" part plus près de l'université que les passagers: le détour est trop grand
+        self.assertEqual(sorted(resultat["affectations"].values()), ["A", "A"])
+        self.assertEqual(len(resultat["non_affectees"]), 2)
+
+    def test_meme_regle_que_la_recherche(self):
+        """
+        Le passager est plus proche de l'université que l'automobiliste, mais loin de sa route:
+        comme dans la recherche interactive, seul le détour décide de l'éligibilité.
+        """
+        annonces = [annonce("A", 12.40, -2.399)]
+        demandes = [{"id": "p1", "latitude": 12.30, "longitude": -2.50, "universite": UNZ}]
+        self.assertEqual(calculer_affectation(demandes, annonces, UNIVERSITES)["non_affectees"], ["p1"])
+        self.assertEqual(calculer_affectation(demandes, annonces, UNIVERSITES, detour_max_km=None)["affectations"], {"p1": "A"})
+
+class TestAffecterEnLot(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_reservations_enregistrees(self):
+        register_user("Auto", "Un", "1", "auto@example.com", UNZ, "automobiliste", engin="voiture", places_disponibles=2)
+        demain = (datetime.now() + timedelta(days=1)).date()
+        _, _, id_annonce = publier_trajet("auto@example.com", UNZ, "07:15", 2, 12.40, -2.399, date_depart=demain)
+        publier_trajet("auto@example.com", UNZ, "09:00", 2, 12.40, -2.399, date_depart=demain) # Hors de la fenêtre
+        demandes = [{"id": f"p{i}@example.com", "latitude": 12.39, "longitude": -2.399, "universite": UNZ} for i in range(3)]
+
+        debut = datetime.combine(demain, datetime.strptime("07:00", "%H:%M").time())
+        resultat = affecter_en_lot(demandes, debut, debut + timedelta(hours=1))
+        self.assertEqual(set(resultat["affectations"].values()), {id_annonce})
+        self.assertEqual(len(resultat["non_affectees"]), 1)
+        self.assertEqual(resultat["echecs"], {})
+        self.assertEqual(get_annonce_by_id(id_annonce).places_disponibles, 0)
@@ -8,8 +8,9 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend.users import register_user, login_user, get_user_by_email, update_user_role, update_user_points
-from backend.trajets import publier_trajet, reserver_trajet, noter_trajet, get_historique_utilisateur, get_annonces_disponibles, terminer_trajet
-from backend.models.annonce import get_all_annonces, delete_annonce
+from backend.trajets import publier_trajet, reserver_trajet, noter_trajet, get_historique_utilisateur, get_annonces_disponibles, terminer_trajet, completer_distances_annonces
+from backend.models.annonce import calculer_depart_prevu, get_all_annonces, delete_annonce, find_annonces, find_annonces_par_depart, get_annonce_by_id, update_annonce
+import stockage
 from stockage import clear_all_data
 
 class TestBackend(unittest.TestCase):
@@ -52,6 +53,30 @@ class TestBackend(unittest.TestCase):
         self.assertIsNone(user)
         self.assertEqual(message, "Email ou mot de passe incorrect.")
 
+    def test_email_casse_ignoree(self):
+        """
+        Teste que l'email est retrouvé quelle que soit sa casse, à l'inscription comme à la connexion.
+        """
+        success, message = register_user("John", "Doe", "123456789", " John.Doe@Example.com ", "Université A", "passager")
+        self.assertTrue(success, message)
+        self.assertEqual(get_user_by_email("john.doe@example.com").email, "john.doe@example.com")
+
+        success, user, message, role = login_user("JOHN.DOE@example.COM")
+        self.assertTrue(success, message)
+        self.assertEqual(user.email, "john.doe@example.com")
+
+        success, message = register_user("John", "Doe", "123456789", "john.DOE@example.com", "Université A", "passager")
+        self.assertFalse(success)
+
+        # Compte enregistré avant la normalisation, avec des majuscules
+        stockage.upsert_record(stockage.USERS_FILE, {"nom": "Ancien", "prenom": "Compte", "email": "Ancien.Compte@example.com",
+                                                     "telephone": "1", "universite": "Université A", "role": "passager"}, key="email")
+        self.assertEqual(get_user_by_email("ancien.compte@example.com").email, "Ancien.Compte@example.com")
+        success, message = update_user_points("ANCIEN.compte@example.com", 5)
+        self.assertTrue(success, message)
+        self.assertEqual(get_user_by_email("Ancien.Compte@example.com").points, 5)
+        self.assertFalse(register_user("A", "C", "1", "ancien.compte@example.com", "Université A", "passager")[0])
+
     def test_automobiliste_registration(self):
         """
         Teste l'enregistrement d'un automobiliste avec engin et places disponibles.
@@ -235,12 +260,103 @@ class TestBackend(unittest.TestCase):
         self.assertEqual(len(annonces), 1)
         self.assertEqual(annonces[0].id_automobiliste, "auto.dispo@example.com")
 
-        # Tester avec une annonce passée
-        heure_depart_passee = (datetime.now() - timedelta(minutes=30)).strftime("%H:%M")
-        publier_trajet("auto.dispo@example.com", "Université B", heure_depart_passee, 1, 48.8566, 2.3522)
+        # Tester avec une annonce passée (sans date, une heure passée désigne le lendemain)
+        depart_passe = datetime.now() - timedelta(minutes=30)
+        publier_trajet("auto.dispo@example.com", "Université B", depart_passe.strftime("%H:%M"), 1, 48.8566, 2.3522,
+                       date_depart=depart_passe.date())
         annonces_apres = get_annonces_disponibles()
         self.assertEqual(len(annonces_apres), 1) # Seule l'annonce future devrait être là
 
+    def test_depart_prevu_le_lendemain(self):
+        """
+        Teste qu'une heure de départ déjà passée à la publication désigne le lendemain.
+        """
+        self.assertEqual(calculer_depart_prevu("06:30", "2026-01-31T23:30:12"), "2026-02-01T06:30:00")
+        self.assertEqual(calculer_depart_prevu("23:45", "2026-01-31T23:30:12"), "2026-01-31T23:45:00")
+        self.assertEqual(calculer_depart_prevu("23:30", "2026-01-31T23:30:12"), "2026-01-31T23:30:00")
+        self.assertIsNone(calculer_depart_prevu("6h30", "2026-01-31T23:30:12"))
+
+    def test_find_annonces(self):
+        """
+        Teste la recherche d'annonces par statut, université et automobiliste.
+        """
+        register_user("Auto", "Un", "1", "auto1@example.com", "UNZ", "automobiliste", engin="moto", places_disponibles=1)
+        register_user("Auto", "Deux", "2", "auto2@example.com", "BIT", "automobiliste", engin="voiture", places_disponibles=3)
+        heure_depart = (datetime.now() + timedelta(minutes=30)).strftime("%H:%M")
+        _, _, id_1 = publier_trajet("auto1@example.com", "UNZ", heure_depart, 1, 12.25, -2.36)
+        _, _, id_2 = publier_trajet("auto2@example.com", "UNZ", heure_depart, 3, 12.26, -2.37)
+        _, _, id_3 = publier_trajet("auto2@example.com", "BIT", heure_depart, 3, 12.26, -2.37)
+        terminer_trajet(id_2)
+
+        self.assertEqual([a.id_annonce for a in find_annonces(statut="en_attente", universite="UNZ")], [id_1])
+        self.assertEqual([a.id_annonce for a in find_annonces(automobiliste="auto2@example.com")], [id_2, id_3])
+        self.assertEqual([a.id_annonce for a in find_annonces(statut="termine", universite="UNZ", automobiliste="auto2@example.com")], [id_2])
+        self.assertEqual(find_annonces(statut="en_attente", universite="ISMK"), [])
+        self.assertEqual([a.id_annonce for a in get_annonces_disponibles(universite="BIT")], [id_3])
+
+    def test_find_annonces_par_depart(self):
+        """
+        Teste la recherche d'annonces par plage de départ (ex: demain entre 07:00 et 08:00).
+        """
+        register_user("Auto", "Depart", "1", "auto.depart@example.com", "UNZ", "automobiliste", engin="voiture", places_disponibles=3)
+        demain = (datetime.now() + timedelta(days=1)).date()
+        ids = {}
+        for heure in ("07:45", "06:59", "07:00", "08:00", "07:30"):
+            _, _, ids[heure] = publier_trajet("auto.depart@example.com", "UNZ", heure, 3, 12.25, -2.36, date_depart=demain)
+
+        debut = datetime.combine(demain, datetime.strptime("07:00", "%H:%M").time())
+        annonces = find_annonces_par_depart(debut, debut + timedelta(hours=1), statut="en_attente", universite="UNZ")
+        self.assertEqual([a.id_annonce for a in annonces], [ids["07:00"], ids["07:30"], ids["07:45"]])
+        self.assertEqual(annonces[0].depart_prevu, debut.isoformat())
+        self.assertEqual(len(find_annonces_par_depart(debut, debut + timedelta(hours=1), statut="termine")), 0)
+
+        # Une annonce terminée sort de la plage des annonces en attente
+        terminer_trajet(ids["07:30"])
+        annonces = find_annonces_par_depart(debut, debut + timedelta(hours=1), statut="en_attente")
+        self.assertEqual([a.id_annonce for a in annonces], [ids["07:00"], ids["07:45"]])
+        self.assertEqual([a.id_annonce for a in get_annonces_disponibles()],
+                         [ids["06:59"], ids["07:00"], ids["07:45"], ids["08:00"]])
+
+        # Annonce enregistrée sans départ complet après une première recherche: elle est complétée à la suivante
+        ancienne = get_annonce_by_id(ids["07:45"]).to_dict()
+        ancienne["depart_prevu"], ancienne["date_publication"] = None, debut.isoformat()
+        stockage.upsert_record(stockage.ANNONCES_FILE, ancienne, key="id_annonce")
+        annonces = find_annonces_par_depart(debut, debut + timedelta(hours=1), statut="en_attente")
+        self.assertEqual([a.id_annonce for a in annonces], [ids["07:00"], ids["07:45"]])
+        self.assertEqual(get_annonce_by_id(ids["07:45"]).version, ancienne["version"] + 1)
+
+    def test_distance_universite_enregistree(self):
+        """
+        Teste l'enregistrement de la destination et de la distance départ-université à la publication,
+        et leur calcul pour les annonces publiées avant.
+        """
+        register_user("Auto", "Dist", "1", "auto.dist@example.com", "UNZ", "automobiliste", engin="voiture", places_disponibles=1)
+        heure_depart = (datetime.now() + timedelta(minutes=30)).strftime("%H:%M")
+        _, _, annonce_id = publier_trajet("auto.dist@example.com", "Université Norbert Zongo (UNZ)", heure_depart, 1, 12.25, -2.399)
+        annonce = get_annonce_by_id(annonce_id)
+        self.assertEqual(annonce.position_destination, {"latitude": 12.2400, "longitude": -2.3990})
+        self.assertAlmostEqual(annonce.distance_universite_km, 1.112, places=2)
+
+        # Annonce publiée avant l'enregistrement de la distance
+        annonce.position_destination = annonce.distance_universite_km = None
+        update_annonce(annonce)
+        self.assertEqual(completer_distances_annonces(), 1)
+        self.assertAlmostEqual(get_annonce_by_id(annonce_id).distance_universite_km, 1.112, places=2)
+        self.assertEqual(completer_distances_annonces(), 0)
+
+class TestBackendSQLite(TestBackend):
+    """
+    Rejoue les mêmes scénarios avec le backend SQLite à la place des fichiers JSON.
+    """
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+        stockage.use_json_backend()
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,85 @@
+import unittest
+import os
+import random
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import clear_all_data
+from backend.classement import ArbreRang, get_classement, get_rangs
+from backend.users import register_user, update_user_points
+
+class TestArbreRang(unittest.TestCase):
+
+    def test_comparaison_avec_liste_triee(self):
+        """
+        Teste insertions, retraits, comptages et parcours contre une liste triée.
+        """
+        aleatoire = random.Random(3)
+        arbre, reference = ArbreRang(), []
+        arbre.construire(sorted((aleatoire.randint(0, 50), f"u{i}") for i in range(200)))
+        reference = arbre.premiers()
+        for i in range(200, 1200):
+            if reference and aleatoire.random() < 0.4:
+                cle = reference.pop(aleatoire.randrange(len(reference)))
+                arbre.retirer(cle)
+            else:
+                cle = (aleatoire.randint(0, 50), f"u{i}")
+                arbre.ajouter(cle)
+                reference.append(cle)
+                reference.sort()
+            self.assertEqual(len(arbre), len(reference))
+            valeur = (aleatoire.randint(0, 50),)
+            self.assertEqual(arbre.compter_inferieurs(valeur), sum(1 for cle in reference if cle < valeur))
+        self.assertEqual(arbre.premiers(), reference)
+        self.assertEqual(arbre.premiers(7), reference[:7])
+
+class TestClassement(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        for nom, universite, engin in [("a", "UNZ", "moto"), ("b", "UNZ", "voiture"), ("c", "BIT", "moto"), ("d", "BIT", "moto")]:
+            register_user(nom, nom, "1", f"{nom}@example.com", universite, "automobiliste", engin, 2)
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_classements_tenus_a_jour(self):
+        """
+        Teste les classements général, par université et par engin, et leur mise à jour à chaque attribution.
+        """
+        self.assertIsNone(get_rangs("a@example.com")["general"])
+        for email, points in [("a@example.com", 10), ("b@example.com", 30), ("c@example.com", 20), ("d@example.com", 20)]:
+            update_user_points(email, points)
+
+        self.assertEqual([(e["rang"], e["email"], e["points"]) for e in get_classement(3)],
+                         [(1, "b@example.com", 30), (2, "c@example.com", 20), (2, "d@example.com", 20)])
+        self.assertEqual(get_rangs("a@example.com"), {"general": (4, 4), "universite": (2, 2), "engin": (3, 3)})
+        self.assertEqual([e["email"] for e in get_classement(universite="BIT")], ["c@example.com", "d@example.com"])
+        self.assertEqual([e["email"] for e in get_classement(engin="voiture")], ["b@example.com"])
+        self.assertEqual(get_classement(engin="velo"), [])
+
+        # Une attribution déplace l'utilisateur dans tous ses classements
+        update_user_points("a@example.com", 25)
+        self.assertEqual(get_rangs("a@example.com"), {"general": (1, 4), "universite": (1, 2), "engin": (1, 3)})
+        self.assertEqual(get_rangs("b@example.com")["general"], (2, 4))
+        with self.assertRaises(ValueError):
+            get_classement(universite="UNZ", engin="moto")
+
+class TestClassementSQLite(TestClassement):
+    """
+    Rejoue les mêmes scénarios avec le backend SQLite à la place des fichiers JSON.
+    """
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        stockage.use_json_backend()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.detour import calculer_detours, filtrer_par_detour
+from backend.models.annonce import Annonce
+from backend.routage import ReseauRoutier, utiliser_reseau
+from backend.distance import calculer_distance_km
+
+def annonce(lat, lon):
+    return Annonce("auto@example.com", "UNZ", "08:00", 1, "voiture", position_depart={"latitude": lat, "longitude": lon})
+
+class TestDetours(unittest.TestCase):
+
+    def tearDown(self):
+        utiliser_reseau(None)
+
+    def test_sans_reseau_vol_d_oiseau(self):
+        utiliser_reseau(None)
+        # Université en (12.24, -2.40), passager en (12.30, -2.40)
+        annonces = [annonce(12.35, -2.40), annonce(12.30, -2.45), annonce(12.26, -2.40)]
+        detours = calculer_detours(12.30, -2.40, annonces, 12.24, -2.40)
+        self.assertAlmostEqual(detours[0]["detour_km"], 0.0, places=3) # Passager sur la route
+        attendu = calculer_distance_km(12.30, -2.45, 12.30, -2.40) + 6.672 - calculer_distance_km(12.30, -2.45, 12.24, -2.40)
+        self.assertAlmostEqual(detours[1]["detour_km"], attendu, places=2)
+        self.assertAlmostEqual(detours[2]["detour_km"], 2 * 4.448, places=2) # Aller-retour vers le nord
+        self.assertAlmostEqual(detours[2]["detour_min"], detours[2]["detour_km"] * 2, places=6) # 30 km/h
+
+        retenues = filtrer_par_detour(annonces, detours, detour_max_km=5)
+        self.assertEqual([a for a, _ in retenues], [annonces[0], annonces[1]])
+        self.assertEqual(filtrer_par_detour(annonces, detours, detour_max_min=1), [(annonces[0], detours[0])])
+
+    def test_avec_reseau_routier(self):
+        # Route en ligne droite 0 - 1 - 2 (université au nœud 0), et un cul-de-sac 1 - 3 où se trouve le passager
+        points = [(12.24, -2.40), (12.25, -2.40), (12.26, -2.40), (12.25, -2.39)]
+        aretes = []
+        for u, v in ((0, 1), (1, 2), (1, 3)):
+            longueur = calculer_distance_km(*points[u], *points[v]) * 1000
+            aretes += [(u, v, longueur, longueur / 10), (v, u, longueur, longueur / 10)] # 36 km/h
+        utiliser_reseau(ReseauRoutier(points, aretes))
+
+        detours = calculer_detours(12.25, -2.39, [annonce(12.26, -2.40), annonce(12.24, -2.40)], 12.24, -2.40)
+        cul_de_sac = calculer_distance_km(*points[1], *points[3])
+        self.assertAlmostEqual(detours[0]["detour_km"], 2 * cul_de_sac, places=6)
+        self.assertAlmostEqual(detours[0]["detour_min"], 2 * cul_de_sac * 1000 / 10 / 60, places=6)
+        # Depuis l'université même: aller chercher le passager et revenir
+        self.assertAlmostEqual(detours[1]["detour_km"], 2 * (cul_de_sac + calculer_distance_km(*points[0], *points[1])), places=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+from unittest import mock
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import distance
+from backend.distance import calculer_distance_km, distances_depuis_point, matrice_distances, PointsPrepares
+
+# Quelques points autour de Ouagadougou et Bobo-Dioulasso
+POINTS = [(12.3714, -1.5197), (12.3800, -1.4990), (11.1771, -4.2979), (12.3714, -1.5197)]
+
+class TestDistancesParLots(unittest.TestCase):
+
+    def verifier_lots(self):
+        """
+        Compare les calculs par lots avec le calcul point par point.
+        """
+        attendues = [calculer_distance_km(12.36, -1.53, lat, lon) for lat, lon in POINTS]
+        for obtenue, attendue in zip(distances_depuis_point(12.36, -1.53, POINTS), attendues):
+            self.assertAlmostEqual(obtenue, attendue, places=9)
+
+        # Un lot préparé est réutilisable pour plusieurs origines
+        prepares = PointsPrepares(POINTS)
+        self.assertEqual(len(prepares), 4)
+        matrice = matrice_distances(POINTS[:2], prepares)
+        self.assertEqual(len(matrice), 2)
+        for i, (lat1, lon1) in enumerate(POINTS[:2]):
+            for j, (lat2, lon2) in enumerate(POINTS):
+                self.assertAlmostEqual(matrice[i][j], calculer_distance_km(lat1, lon1, lat2, lon2), places=9)
+        self.assertEqual(distances_depuis_point(12.36, -1.53, []), [])
+
+    def test_sans_numpy(self):
+        with mock.patch.object(distance, "np", None):
+            self.verifier_lots()
+
+    @unittest.skipIf(distance.np is None, "NumPy n'est pas installé")
+    def test_avec_numpy(self):
+        self.verifier_lots()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import time
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stockage import load_data
+from backend.geocodage import Geocodeur, geocoder, geocoder_inverse, utiliser_geocodeur
+
+LIEUX = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'lieux.json'))
+
+class TestGeocodeur(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.geocodeur = Geocodeur(load_data(LIEUX, default_value=[]))
+
+    def premier(self, texte):
+        lieu, _ = self.geocodeur.geocoder(texte, limit=1)[0]
+        return lieu.nom, lieu.ville
+
+    def test_recherche_par_texte(self):
+        self.assertEqual(self.premier("Dapoya, Koudougou"), ("Dapoya", "Koudougou"))
+        self.assertEqual(self.premier("dapoya ouaga"), ("Dapoya", "Ouagadougou"))
+        self.assertEqual(self.premier("secteur 5"), ("Secteur 5", "Koudougou"))
+        self.assertEqual(self.premier("CHR"), ("Centre hospitalier régional de Koudougou", "Koudougou"))
+        self.assertEqual(self.premier("issoka"), ("Issouka", "Koudougou")) # Faute de frappe
+        self.assertEqual(self.premier("koudougou"), ("Centre-ville de Koudougou", "Koudougou"))
+        self.assertEqual(self.geocodeur.geocoder("   "), [])
+
+    def test_cache_des_requetes(self):
+        geocodeur = Geocodeur(load_data(LIEUX, default_value=[]), taille_cache=2)
+        premier = geocodeur.geocoder("Grand marché")
+        self.assertEqual(geocodeur.geocoder("  grand MARCHE "), premier) # Même requête une fois normalisée
+        self.assertEqual(geocodeur.cache_info().hits, 1)
+        premier.clear() # Le résultat retourné est une copie: le cache n'est pas modifié
+        self.assertTrue(geocodeur.geocoder("grand marche"))
+
+        # Requêtes répétées à chaque frappe: bien moins d'une milliseconde
+        debut = time.perf_counter()
+        for texte in ["d", "da", "dap", "dapo", "dapoy", "dapoya"] * 50:
+            self.geocodeur.geocoder(texte)
+        self.assertLess((time.perf_counter() - debut) / 300, 0.001)
+
+    def test_geocodage_inverse(self):
+        lieu, distance = self.geocodeur.geocoder_inverse(12.2587, -2.3642)
+        self.assertEqual((lieu.nom, lieu.ville), ("Dapoya", "Koudougou"))
+        self.assertLess(distance, 0.1)
+        lieu, _ = self.geocodeur.geocoder_inverse(12.2587, -2.3642, types=("secteur",))
+        self.assertEqual(lieu.type, "secteur")
+        self.assertIsNone(self.geocodeur.geocoder_inverse(13.5, -1.0)) # Hors du répertoire
+
+    def test_geocodeur_de_l_application(self):
+        utiliser_geocodeur(None) # Répertoire absent
+        self.assertEqual(geocoder("Dapoya"), [])
+        self.assertIsNone(geocoder_inverse(12.2587, -2.3642))
+        utiliser_geocodeur(self.geocodeur)
+        try:
+            self.assertEqual(geocoder("Dapoya", limit=1)[0][0].coordonnees, (12.2585, -2.364))
+        finally:
+            utiliser_geocodeur(None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stockage import load_data
+from backend.geocodage import Geocodeur, utiliser_geocodeur
+from backend.geolocalisation import (SourceFixe, SourceFichier, SourceHTTP, SourceChainee, FournisseurPosition,
+                                     lire_phrase_nmea, get_coordinates_from_address)
+
+LIEUX = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'lieux.json'))
+
+class ServiceMock(BaseHTTPRequestHandler):
+    """
+    Service de géolocalisation local, au format d'ip-api.com.
+    """
+    reponse = {"status": "success", "lat": 12.2526, "lon": -2.3627}
+
+    def do_GET(self):
+        corps = json.dumps(self.reponse).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, *args):
+        pass
+
+class SourceLente:
+    """
+    Source qui met du temps à répondre, comme un vrai récepteur ou un service distant.
+    """
+    def __init__(self, positions, delai=0.05):
+        self.positions = list(positions)
+        self.delai = delai
+        self.lectures = 0
+
+    def lire(self):
+        time.sleep(self.delai)
+        self.lectures += 1
+        return self.positions[min(self.lectures, len(self.positions)) - 1]
+
+class TestSources(unittest.TestCase):
+
+    def test_phrases_nmea(self):
+        self.assertEqual(lire_phrase_nmea("$GPGGA,123519,1215.156,N,00221.762,W,1,08,0.9,300.0,M,,,,*0B"), (12.2526, -2.3627000000000002))
+        self.assertIsNone(lire_phrase_nmea("$GPGGA,123519,1215.156,N,00221.762,W,1,08,0.9,300.0,M,,,,*47")) # Somme de contrôle fausse
+        self.assertIsNone(lire_phrase_nmea("$GPGGA,123519,1215.156,N,00221.762,W,0,00,,,M,,,,")) # Pas de fix
+        latitude, longitude = lire_phrase_nmea("$GNRMC,081836,A,1222.116,N,00131.182,W,000.0,360.0,130998,011.3,E")
+        self.assertAlmostEqual(latitude, 12.3686)
+        self.assertAlmostEqual(longitude, -1.5197)
+        self.assertIsNone(lire_phrase_nmea("$GPRMC,081836,V,,,,,,,130998,,"))
+
+    def test_fichier_et_chaine(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "position.nmea")
+            source = SourceChainee(SourceFichier(chemin), SourceFixe(12.0, -2.0))
+            self.assertEqual(source.lire(), (12.0, -2.0)) # Fichier absent: source suivante
+            with open(chemin, "w") as f:
+                f.write("$GPGGA,123519,1215.156,N,00221.762,W,1,08,0.9,300.0,M,,,,\n$GPRMC,081836,V,,,,,,,130998,,\n")
+            self.assertAlmostEqual(source.lire()[0], 12.2526) # Dernière position valide
+            with open(chemin, "a") as f:
+                f.write("12.30,-2.40\n")
+            self.assertEqual(source.lire(), (12.30, -2.40))
+
+    def test_http(self):
+        serveur = HTTPServer(("127.0.0.1", 0), ServiceMock)
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{serveur.server_port}/json"
+            self.assertEqual(SourceHTTP(url).lire(), (12.2526, -2.3627))
+            ServiceMock.reponse = {"status": "fail"}
+            self.assertIsNone(SourceHTTP(url).lire())
+        finally:
+            ServiceMock.reponse = {"status": "success", "lat": 12.2526, "lon": -2.3627}
+            serveur.shutdown()
+            serveur.server_close()
+        self.assertIsNone(SourceHTTP(url, timeout=0.5).lire()) # Service arrêté
+
+class TestFournisseurPosition(unittest.TestCase):
+
+    def test_lecture_non_bloquante_et_abonnes(self):
+        source = SourceLente([(12.1, -2.1), (12.2, -2.2)])
+        fournisseur = FournisseurPosition(source, ttl=60, intervalle=0.01)
+        recues = []
+        arrivee = threading.Event()
+        fournisseur.abonner(lambda position: (recues.append(position), arrivee.set()))
+
+        debut = time.perf_counter()
+        self.assertIsNone(fournisseur.position()) # Aucune position connue: lecture lancée en arrière-plan
+        self.assertLess(time.perf_counter() - debut, source.delai)
+        self.assertTrue(arrivee.wait(2))
+        self.assertEqual(fournisseur.position(), (12.1, -2.1)) # Position en cache, sans relire la source
+        self.assertEqual(source.lectures, 1)
+
+        # Rafraîchissement périodique: les abonnés reçoivent la nouvelle position, une seule fois
+        fournisseur.demarrer()
+        limite = time.monotonic() + 2
+        while recues[-1] != (12.2, -2.2) and time.monotonic() < limite:
+            time.sleep(0.01)
+        fournisseur.arreter()
+        self.assertEqual(recues, [(12.1, -2.1), (12.2, -2.2)])
+
+    def test_position_perimee(self):
+        fournisseur = FournisseurPosition(SourceFixe(12.1, -2.1), ttl=0.05)
+        self.assertEqual(fournisseur.rafraichir(), (12.1, -2.1))
+        self.assertEqual(fournisseur.position(), (12.1, -2.1))
+        time.sleep(0.06)
+        position, age = fournisseur.derniere_position() # Toujours disponible, avec son âge
+        self.assertEqual(position, (12.1, -2.1))
+        self.assertGreater(age, 0.05)
+        self.assertIsNone(fournisseur.position()) # Périmée: relue en arrière-plan
+        position, limite = None, time.monotonic() + 2
+        while position is None and time.monotonic() < limite:
+            time.sleep(0.001)
+            position = fournisseur.position()
+        self.assertEqual(position, (12.1, -2.1))
+
+class TestAdresse(unittest.TestCase):
+
+    def setUp(self):
+        utiliser_geocodeur(Geocodeur(load_data(LIEUX, default_value=[])))
+
+    def tearDown(self):
+        utiliser_geocodeur(None)
+
+    def test_adresse_connue(self):
+        self.assertEqual(get_coordinates_from_address("Dapoya, Koudougou"), (12.2585, -2.364))
+        self.assertEqual(get_coordinates_from_address("dap"), (12.2585, -2.364)) # Début d'un mot du lieu
+
+    def test_adresse_inconnue(self):
+        """
+        Une adresse qui ne correspond à un lieu que par un mot vide ou une seule lettre n'est pas géocodée.
+        """
+        self.assertIsNone(get_coordinates_from_address("Rue de Paris"))
+        self.assertIsNone(get_coordinates_from_address("a"))
+        self.assertIsNone(get_coordinates_from_address("de la"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stockage import clear_all_data
+from backend.matching import rechercher_trajets
+from backend.users import register_user
+from backend.trajets import publier_trajet
+
+UNZ = "Université Norbert Zongo (UNZ)" # 12.2400, -2.3990
+
+class TestRechercherTrajets(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        register_user("Auto", "Un", "1", "auto1@example.com", UNZ, "automobiliste", engin="voiture", places_disponibles=3)
+        heure = lambda minutes: (datetime.now() + timedelta(minutes=minutes)).strftime("%H:%M")
+        # Le passager est en (12.30, -2.399), à environ 6.7 km de l'université
+        _, _, self.loin = publier_trajet("auto1@example.com", UNZ, heure(30), 1, 12.40, -2.399)
+        _, _, self.proche = publier_trajet("auto1@example.com", UNZ, heure(60), 3, 12.31, -2.399)
+        _, _, self.plus_proche_univ = publier_trajet("auto1@example.com", UNZ, heure(45), 2, 12.25, -2.399)
+        _, _, self.autre_univ = publier_trajet("auto1@example.com", "Burkina Institut of Technology(BIT)", heure(45), 2, 12.31, -2.399)
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_eligibilite_et_classement(self):
+        """
+        Seules les annonces dont le détour pour prendre le passager reste sous la limite sont proposées.
+        """
+        resultats = rechercher_trajets(12.30, -2.399, UNZ)
+        self.assertEqual([r["annonce"].id_annonce for r in resultats], [self.proche, self.loin])
+        self.assertAlmostEqual(resultats[0]["score"], resultats[0]["distance_passager_automobiliste"])
+        self.assertLess(resultats[0]["distance_passager_universite"], resultats[0]["distance_automobiliste_universite"])
+        # Le passager est sur la route des deux automobilistes: détour quasi nul
+        self.assertAlmostEqual(resultats[0]["detour_km"], 0.0, places=2)
+
+        # Sans limite, l'automobiliste proche de l'université est proposé, avec un détour d'environ 11 km
+        resultats = rechercher_trajets(12.30, -2.399, UNZ, sort_by="detour", detour_max_km=None)
+        self.assertEqual(resultats[-1]["annonce"].id_annonce, self.plus_proche_univ)
+        self.assertAlmostEqual(resultats[-1]["detour_km"], 11.1, places=0)
+        self.assertGreater(resultats[-1]["detour_min"], 20)
+        self.assertEqual(len(rechercher_trajets(12.30, -2.399, UNZ, detour_max_km=None, detour_max_min=10)), 2)
+
+        self.assertEqual([r["annonce"].id_annonce for r in rechercher_trajets(12.30, -2.399, UNZ, sort_by="depart")],
+                         [self.loin, self.proche])
+        self.assertEqual([r["annonce"].id_annonce for r in rechercher_trajets(12.30, -2.399, UNZ, limit=1, sort_by="places")],
+                         [self.proche])
+        self.assertEqual([r["annonce"].id_annonce for r in rechercher_trajets(12.30, -2.399, UNZ, rayon_km=5)],
+                         [self.proche])
+
+    def test_universite_inconnue_ou_critere_invalide(self):
+        self.assertEqual(rechercher_trajets(12.30, -2.399, "Université inconnue"), [])
+        with self.assertRaises(ValueError):
+            rechercher_trajets(12.30, -2.399, UNZ, sort_by="prix")
@@ -0,0 +1,158 @@
+import unittest
+import os
+import threading
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import clear_all_data
+from backend.points import (POINTS_FILE, SOLDES_FILE, MOTIF_REPRISE, crediter_points, get_solde, get_mouvements, recalculer_soldes,
+                            reprendre_points_existants)
+from backend.classement import get_classement
+from backend.users import register_user, get_user_by_email, update_user_points
+from backend.trajets import publier_trajet, reserver_trajet, terminer_trajet, noter_trajet
+
+class TestPoints(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        register_user("Auto", "Mobiliste", "111", "auto@example.com", "Université A", "automobiliste", "voiture", 3)
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_mouvements_et_solde(self):
+        """
+        Teste que chaque attribution ajoute un mouvement et met à jour le solde, sans réécrire l'utilisateur.
+        """
+        self.assertIsNone(get_solde("auto@example.com"))
+        self.assertEqual(crediter_points("auto@example.com", 10, "Trajet terminé", "t1"), 10)
+        self.assertEqual(crediter_points("auto@example.com", -3, "Correction"), 7)
+
+        self.assertEqual(get_solde("auto@example.com"), 7)
+        self.assertEqual(get_user_by_email("auto@example.com").points, 7)
+        mouvements = get_mouvements("auto@example.com")
+        self.assertEqual([(m["delta"], m["motif"], m["id_trajet"]) for m in mouvements],
+                         [(10, "Trajet terminé", "t1"), (-3, "Correction", None)])
+        # Le fichier des utilisateurs n'est pas modifié par les attributions
+        self.assertEqual(stockage.get_record(stockage.USERS_FILE, "auto@example.com", key="email")["points"], 0)
+
+    def test_reprise_des_points_existants(self):
+        """
+        Teste que les points enregistrés sur un compte avant le journal sont repris au premier mouvement.
+        """
+        stockage.upsert_record(stockage.USERS_FILE, {"nom": "Ancien", "prenom": "Compte", "email": "ancien@example.com",
+                                                     "telephone": "1", "universite": "Université A", "role": "automobiliste",
+                                                     "points": 25}, key="email")
+        self.assertEqual(get_user_by_email("ancien@example.com").points, 25)
+        success, message = update_user_points("ancien@example.com", 5)
+        self.assertTrue(success, message)
+        self.assertEqual(get_user_by_email("ancien@example.com").points, 30)
+        self.assertEqual([m["motif"] for m in get_mouvements("ancien@example.com")], [MOTIF_REPRISE, "Ajustement"])
+
+    def test_reprise_a_la_migration(self):
+        """
+        Teste que les comptes ayant des points d'avant le journal sont classés dès la migration,
+        sans attendre leur prochaine attribution.
+        """
+        for email, points in (("ancien@example.com", 25), ("autre@example.com", 0)):
+            stockage.upsert_record(stockage.USERS_FILE, {"nom": "Ancien", "prenom": "Compte", "email": email, "telephone": "1",
+                                                         "universite": "Université A", "role": "passager", "points": points}, key="email")
+        crediter_points("auto@example.com", 10, "Trajet terminé")
+        self.assertEqual([c["email"] for c in get_classement()], ["auto@example.com"])
+
+        self.assertEqual(reprendre_points_existants(), 1)
+        self.assertEqual([(c["email"], c["points"]) for c in get_classement()], [("ancien@example.com", 25), ("auto@example.com", 10)])
+        self.assertEqual([m["motif"] for m in get_mouvements("ancien@example.com")], [MOTIF_REPRISE])
+        self.assertEqual(reprendre_points_existants(), 0)
+
+        # Une attribution ultérieure ne reprend pas les points une seconde fois
+        self.assertEqual(crediter_points("ancien@example.com", 5, "Ajustement"), 30)
+        self.assertEqual(recalculer_soldes(), {"auto@example.com": 10, "ancien@example.com": 30})
+
+    def test_trajet_note_et_rejeu(self):
+        """
+        Teste que les points d'un trajet terminé et noté sont tracés par trajet, et que le rejeu
+        du journal redonne les mêmes soldes.
+        """
+        register_user("Pass", "Ager", "222", "pass@example.com", "Université A", "passager")
+        heure_depart = (datetime.now() + timedelta(hours=1)).strftime("%H:%M")
+        success, message, id_annonce = publier_trajet("auto@example.com", "Université A", heure_depart, 2, 12.25, -2.36)
+        self.assertTrue(success, message)
+        self.assertTrue(reserver_trajet(id_annonce, "pass@example.com", 12.24, -2.37)[0])
+        self.assertTrue(terminer_trajet(id_annonce)[0])
+        self.assertTrue(noter_trajet(id_annonce, "pass@example.com", 4)[0])
+
+        mouvements = get_mouvements("auto@example.com")
+        self.assertEqual([m["id_trajet"] for m in mouvements], [id_annonce] * 2)
+        self.assertEqual([m["delta"] for m in mouvements], [10, 8])
+        self.assertEqual(get_user_by_email("auto@example.com").points, 18)
+
+        # Table des soldes perdue: elle est reconstruite à partir du journal
+        stockage.save_data(SOLDES_FILE, [])
+        self.assertIsNone(get_solde("auto@example.com"))
+        self.assertEqual(recalculer_soldes(), {"auto@example.com": 18})
+        self.assertEqual(get_solde("auto@example.com"), 18)
+        self.assertEqual(len(stockage.load_data(POINTS_FILE, default_value=[])), 2)
+
+    def test_attributions_simultanees(self):
+        """
+        Teste qu'aucune attribution n'est perdue quand plusieurs sont faites en même temps au même utilisateur,
+        y compris à la création du solde.
+        """
+        fils = [threading.Thread(target=crediter_points, args=("auto@example.com", i + 1, "Ajustement")) for i in range(8)]
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+
+        self.assertEqual(get_solde("auto@example.com"), sum(range(1, 9)))
+        self.assertEqual(len(get_mouvements("auto@example.com")), 8)
+        self.assertEqual(stockage.get_record(SOLDES_FILE, "auto@example.com", key="email")["mouvements"], 8)
+        self.assertEqual(recalculer_soldes(), {"auto@example.com": sum(range(1, 9))})
+
+    def test_fin_et_notes_simultanees(self):
+        """
+        Teste qu'un trajet terminé plusieurs fois en même temps ne rapporte ses points qu'une fois,
+        et que les notes simultanées de plusieurs passagers sont toutes comptées.
+        """
+        passagers = [f"pass{i}@example.com" for i in range(3)]
+        heure_depart = (datetime.now() + timedelta(hours=1)).strftime("%H:%M")
+        _, _, id_annonce = publier_trajet("auto@example.com", "Université A", heure_depart, 3, 12.25, -2.36)
+        for email in passagers:
+            register_user("Pass", "Ager", "222", email, "Université A", "passager")
+            self.assertTrue(reserver_trajet(id_annonce, email, 12.24, -2.37)[0])
+
+        def en_parallele(appels):
+            resultats = []
+            fils = [threading.Thread(target=lambda f=f, a=a: resultats.append(f(*a)[0])) for f, a in appels]
+            for fil in fils:
+                fil.start()
+            for fil in fils:
+                fil.join()
+            return resultats
+
+        self.assertEqual(sorted(en_parallele([(terminer_trajet, (id_annonce,))] * 4)), [False, False, False, True])
+        self.assertEqual(get_solde("auto@example.com"), 30)
+        self.assertEqual(en_parallele([(noter_trajet, (id_annonce, email, 5)) for email in passagers] * 2).count(True), 3)
+        self.assertEqual(get_solde("auto@example.com"), 60)
+        self.assertEqual(len(get_mouvements("auto@example.com")), 4)
+
+class TestPointsSQLite(TestPoints):
+    """
+    Rejoue les mêmes scénarios avec le backend SQLite à la place des fichiers JSON.
+    """
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        stockage.use_json_backend()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import random
+from itertools import permutations
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stockage import clear_all_data
+from backend.distance import calculer_distance_km
+from backend.ramassage import ordonner_arrets, planifier_ramassage, _ordre_exact, _cout_chemin, _matrice_couts
+from backend.routage import utiliser_reseau
+from backend.users import register_user
+from backend.trajets import publier_trajet, reserver_trajet
+
+UNZ = "Université Norbert Zongo (UNZ)"
+
+def cout(depart, arrets, arrivee, ordre):
+    chemin = [depart] + [arrets[k] for k in ordre] + [arrivee]
+    return sum(calculer_distance_km(*a, *b) for a, b in zip(chemin, chemin[1:]))
+
+class TestOrdonnerArrets(unittest.TestCase):
+
+    def setUp(self):
+        utiliser_reseau(None) # Distances à vol d'oiseau
+        self.rng = random.Random(7)
+
+    def points(self, n):
+        return [(self.rng.uniform(12.2, 12.4), self.rng.uniform(-2.5, -2.3)) for _ in range(n)]
+
+    def test_ordre_exact_identique_a_l_enumeration(self):
+        for n in range(0, 7):
+            depart, arrivee = self.points(2)
+            arrets = self.points(n)
+            resultat = ordonner_arrets(depart, arrets, arrivee)
+            optimum = min(cout(depart, arrets, arrivee, ordre) for ordre in permutations(range(n)))
+            self.assertTrue(resultat["exact"])
+            self.assertEqual(sorted(resultat["ordre"]), list(range(n)))
+            self.assertAlmostEqual(resultat["cout"], optimum, places=6)
+            self.assertAlmostEqual(cout(depart, arrets, arrivee, resultat["ordre"]), optimum, places=6)
+
+    def test_heuristique_proche_de_l_optimum(self):
+        depart, arrivee = self.points(2)
+        arrets = self.points(12)
+        resultat = ordonner_arrets(depart, arrets, arrivee)
+        self.assertFalse(resultat["exact"])
+        self.assertEqual(sorted(resultat["ordre"]), list(range(12)))
+        couts = _matrice_couts([depart] + arrets + [arrivee], "distance")
+        optimum = _cout_chemin(couts, _ordre_exact(couts))
+        self.assertLessEqual(resultat["cout"], optimum * 1.1)
+
+    def test_critere_duree(self):
+        depart, arrivee = self.points(2)
+        arrets = self.points(3)
+        distance = ordonner_arrets(depart, arrets, arrivee)
+        duree = ordonner_arrets(depart, arrets, arrivee, critere="duree")
+        self.assertEqual(duree["ordre"], distance["ordre"])
+        self.assertAlmostEqual(duree["cout"], distance["cout"] * 2, places=6) # 30 km/h
+        with self.assertRaises(ValueError):
+            ordonner_arrets(depart, arrets, arrivee, critere="prix")
+
+class TestPlanifierRamassage(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        utiliser_reseau(None)
+        register_user("Auto", "Un", "1", "auto1@example.com", UNZ, "automobiliste", engin="voiture", places_disponibles=3)
+        heure = (datetime.now() + timedelta(minutes=60)).strftime("%H:%M")
+        # Départ au nord (12.33), université au sud (12.24)
+        _, _, self.id_annonce = publier_trajet("auto1@example.com", UNZ, heure, 3, 12.33, -2.399)
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_ordre_de_prise_en_charge_et_cache(self):
+        reserver_trajet(self.id_annonce, "p1@example.com", 12.26, -2.399)
+        reserver_trajet(self.id_annonce, "p2@example.com", 12.31, -2.399)
+        plan = planifier_ramassage(self.id_annonce)
+        self.assertEqual(plan["passagers"], ["p2@example.com", "p1@example.com"])
+        self.assertEqual(plan["etapes"][:3], [(12.33, -2.399), (12.31, -2.399), (12.26, -2.399)])
+        self.assertIs(planifier_ramassage(self.id_annonce), plan) # Même ensemble de réservations: plan en cache
+
+        # Une nouvelle réservation invalide le plan
+        reserver_trajet(self.id_annonce, "p3@example.com", 12.29, -2.399)
+        plan = planifier_ramassage(self.id_annonce)
+        self.assertEqual(plan["passagers"], ["p2@example.com", "p3@example.com", "p1@example.com"])
+        self.assertIsNone(planifier_ramassage("inconnue"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import os
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.recherche import IndexTexte, mots, normaliser_texte
+
+class TestIndexTexte(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IndexTexte()
+        self.index.add("unz", ["Université Norbert Zongo (UNZ)", "Université de Koudougou"])
+        self.index.add("bit", ["Burkina Institut of Technology(BIT)"])
+        self.index.add("ismk", ["Institut Supérieur de Management de Koudougou (ISMK)"])
+
+    def cles(self, texte):
+        return [cle for _, cle in self.index.rechercher(texte)]
+
+    def test_normalisation(self):
+        self.assertEqual(normaliser_texte("  Supérieur   ÉCOLE "), "superieur ecole")
+        self.assertEqual(mots("Technology(BIT)"), ["technology", "bit"])
+
+    def test_exact_prefixe_et_fautes_de_frappe(self):
+        self.assertEqual(self.cles("UNZ"), ["unz"])
+        self.assertEqual(self.cles("norbert zongo"), ["unz"])
+        self.assertEqual(self.cles("norbet zngo"), ["unz"]) # Fautes de frappe
+        self.assertEqual(self.cles("techno"), ["bit"]) # Préfixe
+        self.assertEqual(self.cles("unz koudougou")[0], "unz")
+        self.assertEqual(self.index.rechercher("UNZ")[0][0], 1.0)
+        self.assertLess(self.index.rechercher("norbet")[0][0], self.index.rechercher("norb")[0][0])
+        self.assertEqual(self.cles("xyz"), [])
+        self.assertEqual(self.cles(""), [])
+
+    def test_mise_a_jour_incrementale(self):
+        self.index.discard("ismk")
+        self.assertEqual(self.cles("management"), [])
+        self.assertEqual(self.cles("koudougou"), ["unz"])
+        self.assertNotIn("management", self.index.mots_tries)
+        self.index.add("unz", ["Université Norbert Zongo (UNZ)"]) # Remplace l'entrée: l'alias disparaît
+        self.assertEqual(self.cles("koudougou"), [])
+        self.assertEqual(len(self.index), 2)
+
+if __name__ == '__main__':
+    unittest.main()
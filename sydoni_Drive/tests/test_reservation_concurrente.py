@@ -0,0 +1,112 @@
+import unittest
+import os
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import clear_all_data
+from backend.users import register_user
+from backend.trajets import publier_trajet, reserver_trajet
+from backend.models.annonce import get_annonce_by_id
+from backend.reservations import creer_reservation, get_reservations_by_annonce
+
+# Nombre de places offertes par annonce et nombre d'annonces disputées
+PLACES = 15
+ANNONCES = 4
+
+def _reserver(annonce_id, email):
+    return reserver_trajet(annonce_id, email, 12.24, -2.37)[0]
+
+def _processus_reservations(annonce_ids, debut, nombre, resultats):
+    """
+    Réservations faites par un processus fils (avec quelques threads): nombre de réussites par annonce.
+    """
+    demandes = [(annonce_ids[i % len(annonce_ids)], f"proc{debut + i}@example.com") for i in range(nombre)]
+    with ThreadPoolExecutor(max_workers=4) as executeur:
+        reussites = list(executeur.map(lambda demande: _reserver(*demande), demandes))
+    resultats.put(Counter(annonce_id for (annonce_id, _), ok in zip(demandes, reussites) if ok))
+
+class TestReservationConcurrente(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        register_user("Auto", "Mobiliste", "111", "auto@example.com", "UNZ", "automobiliste", "voiture", PLACES)
+        self.annonce_ids = [publier_trajet("auto@example.com", "UNZ", "23:59", PLACES, 12.25, -2.36)[2] for _ in range(ANNONCES)]
+
+    def tearDown(self):
+        clear_all_data()
+
+    def _verifier_annonces(self, reussites):
+        """
+        Vérifie qu'aucune annonce n'est surréservée et que les réussites correspondent aux passagers enregistrés.
+        """
+        for annonce_id in self.annonce_ids:
+            annonce = get_annonce_by_id(annonce_id)
+            self.assertEqual(reussites[annonce_id], PLACES)
+            self.assertEqual(annonce.places_disponibles, 0)
+            self.assertEqual(len(annonce.passagers_reserves), PLACES)
+            self.assertEqual(len(set(annonce.passagers_reserves)), PLACES)
+
+    def test_reservations_simultanees_threads(self):
+        """
+        Lance 2000 réservations en parallèle (threads) sur quelques annonces, dont des doublons de passagers.
+        """
+        demandes = [(self.annonce_ids[i % ANNONCES], f"p{i % 1500}@example.com") for i in range(2000)]
+        with ThreadPoolExecutor(max_workers=32) as executeur:
+            reussites = list(executeur.map(lambda demande: _reserver(*demande), demandes))
+        self._verifier_annonces(Counter(annonce_id for (annonce_id, _), ok in zip(demandes, reussites) if ok))
+
+    def test_reservations_simultanees_creer_reservation(self):
+        """
+        Les réservations par creer_reservation sont soumises à la même garantie, et une seule
+        réservation est enregistrée par place prise.
+        """
+        demandes = [(f"p{i}@example.com", self.annonce_ids[i % ANNONCES]) for i in range(1000)]
+        with ThreadPoolExecutor(max_workers=32) as executeur:
+            reussites = list(executeur.map(lambda demande: creer_reservation(*demande)[0], demandes))
+        self._verifier_annonces(Counter(annonce_id for (_, annonce_id), ok in zip(demandes, reussites) if ok))
+        for annonce_id in self.annonce_ids:
+            self.assertEqual(len(get_reservations_by_annonce(annonce_id)), PLACES)
+
+    @unittest.skipUnless(stockage.fcntl is not None and "fork" in multiprocessing.get_all_start_methods(),
+                         "Verrou entre processus indisponible sur cette plateforme")
+    def test_reservations_simultanees_processus(self):
+        """
+        Lance 1200 réservations depuis plusieurs processus partageant le répertoire de données.
+        """
+        contexte = multiprocessing.get_context("fork")
+        resultats = contexte.Queue()
+        processus = [contexte.Process(target=_processus_reservations, args=(self.annonce_ids, k * 300, 300, resultats))
+                     for k in range(4)]
+        for p in processus:
+            p.start()
+        reussites = Counter()
+        for _ in processus:
+            reussites.update(resultats.get(timeout=120))
+        for p in processus:
+            p.join(timeout=120)
+            self.assertEqual(p.exitcode, 0)
+        self._verifier_annonces(reussites)
+
+class TestReservationConcurrenteSQLite(TestReservationConcurrente):
+    """
+    Rejoue les mêmes scénarios avec le backend SQLite à la place des fichiers JSON.
+    """
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        super().setUp()
+        # Chaque processus fils ouvre sa propre connexion à la base
+        stockage.use_sqlite_backend()
+
+    def tearDown(self):
+        super().tearDown()
+        stockage.use_json_backend()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import clear_all_data
+from backend.users import register_user
+from backend.trajets import publier_trajet, reserver_trajet, get_historique_utilisateur
+from backend.models.annonce import get_annonce_by_id
+from backend.reservations import (creer_reservation, get_reservation_by_id, get_reservations_by_user, get_reservations_by_annonce,
+                                  mettre_a_jour_statut_reservation, mettre_a_jour_statuts_reservations,
+                                  mettre_a_jour_statut_reservations_annonce)
+
+class TestReservations(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+        register_user("Auto", "Mobiliste", "111", "auto@example.com", "Université A", "automobiliste", "voiture", 3)
+        heure_depart = (datetime.now() + timedelta(hours=1)).strftime("%H:%M")
+        self.id_annonce = publier_trajet("auto@example.com", "Université A", heure_depart, 3, 12.25, -2.36)[2]
+        self.reservations = [creer_reservation(f"p{i}@example.com", self.id_annonce)[1] for i in range(3)]
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_recherches_indexees(self):
+        """
+        Teste la lecture d'une réservation par ID et les recherches par passager, automobiliste et annonce.
+        """
+        reservation = get_reservation_by_id(self.reservations[0].id_reservation)
+        self.assertEqual((reservation.id_passager, reservation.id_annonce), ("p0@example.com", self.id_annonce))
+        self.assertIsNone(get_reservation_by_id("inconnue"))
+        self.assertEqual([r.id_passager for r in get_reservations_by_user("p1@example.com")], ["p1@example.com"])
+        self.assertEqual(len(get_reservations_by_user("auto@example.com", is_automobiliste=True)), 3)
+        self.assertEqual(len(get_reservations_by_annonce(self.id_annonce)), 3)
+
+    def test_changement_de_statut(self):
+        """
+        Teste le changement de statut d'une réservation, seule ou par lot.
+        """
+        premiere = self.reservations[0].id_reservation
+        self.assertTrue(mettre_a_jour_statut_reservation(premiere, "annulee"))
+        self.assertEqual(get_reservation_by_id(premiere).statut, "annulee")
+        self.assertFalse(mettre_a_jour_statut_reservation(premiere, "inconnu"))
+        self.assertFalse(mettre_a_jour_statut_reservation("inconnue", "confirmee"))
+
+        # Les réservations annulées ne sont pas reconfirmées avec le reste de l'annonce
+        self.assertEqual(mettre_a_jour_statut_reservations_annonce(self.id_annonce, "confirmee"), 2)
+        self.assertEqual(sorted(r.statut for r in get_reservations_by_annonce(self.id_annonce)), ["annulee", "confirmee", "confirmee"])
+        self.assertEqual(mettre_a_jour_statuts_reservations([r.id_reservation for r in self.reservations] + ["inconnue"], "terminee"), 3)
+        self.assertEqual({r.statut for r in get_reservations_by_annonce(self.id_annonce)}, {"terminee"})
+
+    def test_annulation_rend_la_place(self):
+        """
+        Teste qu'une annulation rend la place et retire le passager de l'annonce et des historiques,
+        en une seule écriture, et que la place peut être reprise.
+        """
+        self.assertEqual(get_annonce_by_id(self.id_annonce).places_disponibles, 0)
+        self.assertTrue(mettre_a_jour_statut_reservation(self.reservations[0].id_reservation, "annulee"))
+        annonce = get_annonce_by_id(self.id_annonce)
+        self.assertEqual((annonce.places_disponibles, annonce.passagers_reserves), (1, ["p1@example.com", "p2@example.com"]))
+        self.assertEqual(next(t for t in get_historique_utilisateur("p0@example.com") if t["id"] == self.id_annonce)["etat"], "annulee")
+        entree = next(t for t in get_historique_utilisateur("auto@example.com") if t["id"] == self.id_annonce)
+        self.assertEqual((entree["places_disponibles"], entree["passagers_reserves"]), (1, ["p1@example.com", "p2@example.com"]))
+
+        # Une réservation déjà annulée ne rend pas sa place une seconde fois
+        self.assertEqual(mettre_a_jour_statuts_reservations([self.reservations[0].id_reservation], "annulee"), 1)
+        self.assertEqual(get_annonce_by_id(self.id_annonce).places_disponibles, 1)
+        self.assertTrue(creer_reservation("p3@example.com", self.id_annonce)[0])
+
+        self.assertEqual(mettre_a_jour_statut_reservations_annonce(self.id_annonce, "annulee"), 3)
+        annonce = get_annonce_by_id(self.id_annonce)
+        self.assertEqual((annonce.places_disponibles, annonce.passagers_reserves), (3, []))
+        self.assertEqual({r.statut for r in get_reservations_by_annonce(self.id_annonce)}, {"annulee"})
+
+    def test_chemin_de_reservation_unique(self):
+        """
+        Teste que reserver_trajet et creer_reservation écrivent la même chose: la réservation,
+        l'annonce et les deux historiques.
+        """
+        heure_depart = (datetime.now() + timedelta(hours=1)).strftime("%H:%M")
+        id_annonce = publier_trajet("auto@example.com", "Université A", heure_depart, 2, 12.25, -2.36)[2]
+        self.assertTrue(reserver_trajet(id_annonce, "p0@example.com", 12.24, -2.37)[0])
+        self.assertTrue(creer_reservation("p1@example.com", id_annonce)[0])
+
+        reservations = {r.id_passager: r for r in get_reservations_by_annonce(id_annonce)}
+        self.assertEqual(set(reservations), {"p0@example.com", "p1@example.com"})
+        self.assertEqual(get_annonce_by_id(id_annonce).passagers_reserves, ["p0@example.com", "p1@example.com"])
+        for passager in reservations:
+            entree = next(t for t in get_historique_utilisateur(passager) if t["id"] == id_annonce)
+            self.assertEqual(entree["id_reservation"], reservations[passager].id_reservation)
+        self.assertEqual(next(t for t in get_historique_utilisateur("auto@example.com") if t["id"] == id_annonce)["places_disponibles"], 0)
+        self.assertFalse(creer_reservation("p2@example.com", id_annonce)[0])
+
+class TestReservationsSQLite(TestReservations):
+    """
+    Rejoue les mêmes scénarios avec le backend SQLite à la place des fichiers JSON.
+    """
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        stockage.use_json_backend()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import heapq
+import random
+import tempfile
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.distance import calculer_distance_km
+from backend.routage import ReseauRoutier
+
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="12.2500" lon="-2.3700"/>
+  <node id="2" lat="12.2500" lon="-2.3600"/>
+  <node id="3" lat="12.2400" lon="-2.3600"/>
+  <node id="4" lat="12.2400" lon="-2.3700"/>
+  <node id="5" lat="12.2600" lon="-2.3500"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="primary"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="1"/><tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="12"><nd ref="2"/><nd ref="5"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+def grille(n, graine=3):
+    """
+    Réseau en grille n x n (environ 200 m entre les nœuds), avec des vitesses aléatoires et quelques sens uniques.
+    """
+    rng = random.Random(graine)
+    points = [(12.2 + i * 0.0018, -2.4 + j * 0.0018) for i in range(n) for j in range(n)]
+    aretes = []
+    for i in range(n):
+        for j in range(n):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di < n and j + dj < n:
+                    u, v = i * n + j, (i + di) * n + j + dj
+                    longueur = calculer_distance_km(*points[u], *points[v]) * 1000
+                    duree = longueur / (rng.choice([15, 25, 40, 60]) / 3.6)
+                    sens = rng.random()
+                    if sens < 0.9:
+                        aretes.append((u, v, longueur, duree))
+                    if sens > 0.1:
+                        aretes.append((v, u, longueur, duree))
+    return ReseauRoutier(points, aretes)
+
+def dijkstra(reseau, source, cible, critere):
+    poids = reseau.duree if critere == "duree" else reseau.longueur
+    couts, file = {source: 0.0}, [(0.0, source)]
+    while file:
+        cout, u = heapq.heappop(file)
+        if u == cible:
+            return cout
+        if cout > couts[u]:
+            continue
+        for i in range(reseau.debut[u], reseau.debut[u + 1]):
+            v = reseau.cible[i]
+            if cout + poids[i] < couts.get(v, float("inf")):
+                couts[v] = cout + poids[i]
+                heapq.heappush(file, (cout + poids[i], v))
+    return None
+
+class TestReseauRoutier(unittest.TestCase):
+
+    def verifier(self, reseau, recherche, critere, paires):
+        for source, cible in paires:
+            attendu = dijkstra(reseau, source, cible, critere)
+            resultat = recherche(source, cible, critere)
+            if attendu is None:
+                self.assertIsNone(resultat)
+                continue
+            cout, chemin = resultat
+            self.assertAlmostEqual(cout, attendu, places=6)
+            self.assertEqual((chemin[0], chemin[-1]), (source, cible))
+            # Le chemin retourné est fait d'arêtes existantes et a bien le coût annoncé
+            poids = reseau.duree if critere == "duree" else reseau.longueur
+            total = sum(min(poids[i] for i in range(reseau.debut[u], reseau.debut[u + 1]) if reseau.cible[i] == v)
+                        for u, v in zip(chemin, chemin[1:]))
+            self.assertAlmostEqual(total, attendu, places=6)
+
+    def test_algorithmes_identiques_a_dijkstra(self):
+        reseau = grille(12)
+        rng = random.Random(5)
+        paires = [(rng.randrange(len(reseau)), rng.randrange(len(reseau))) for _ in range(40)]
+        for critere in ("duree", "distance"):
+            self.verifier(reseau, reseau.astar, critere, paires)
+            self.verifier(reseau, reseau.dijkstra_bidirectionnel, critere, paires)
+        reseau.contracter("duree")
+        self.verifier(reseau, lambda s, c, critere: reseau.plus_court_chemin(s, c, critere), "duree", paires)
+
+    def test_lecture_osm_et_sens_uniques(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "reseau.osm")
+            with open(chemin, "w", encoding="utf-8") as f:
+                f.write(OSM)
+            reseau = ReseauRoutier.depuis_osm(chemin)
+            self.assertEqual(len(reseau), 4) # Le chemin piéton (footway) est ignoré
+
+            # 4 -> 1 emprunte directement le sens unique résidentiel (3 -> 4 -> 1)
+            itineraire = reseau.itineraire(12.2400, -2.3700, 12.2500, -2.3700, critere="distance")
+            self.assertEqual(itineraire["polyline"][1:-1], [(12.24, -2.37), (12.25, -2.37)])
+            # 1 -> 4 ne peut pas l'emprunter à contresens: tour par 2 et 3
+            itineraire = reseau.itineraire(12.2500, -2.3700, 12.2400, -2.3700, critere="distance")
+            self.assertEqual(itineraire["polyline"][1:-1], [(12.25, -2.37), (12.25, -2.36), (12.24, -2.36), (12.24, -2.37)])
+
+            itineraire = reseau.itineraire(12.2500, -2.3700, 12.2400, -2.3600, critere="distance")
+            self.assertEqual(itineraire["polyline"][1:-1], [(12.25, -2.37), (12.25, -2.36), (12.24, -2.36)])
+            self.assertAlmostEqual(itineraire["distance_km"], 1.086 + 1.112, places=2)
+            self.assertAlmostEqual(itineraire["duree_min"], 2.198 / 60 * 60, places=1) # Route primaire à 60 km/h
+
+            # Sauvegarde compacte et rechargement, avec la hiérarchie de contraction
+            reseau.contracter("distance")
+            reseau.sauvegarder(chemin + ".graphe")
+            recharge = ReseauRoutier.charger(chemin + ".graphe")
+            self.assertEqual(recharge.itineraire(12.2500, -2.3700, 12.2400, -2.3600, critere="distance"), itineraire)
@@ -0,0 +1,104 @@
+import unittest
+import os
+import random
+from datetime import datetime, timedelta
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import clear_all_data
+from backend.distance import calculer_distance_km
+from backend.spatial import GrilleSpatiale, annonces_les_plus_proches, annonces_dans_rayon
+from backend.users import register_user
+from backend.trajets import publier_trajet, reserver_trajet, terminer_trajet
+
+class TestGrilleSpatiale(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.grille = GrilleSpatiale()
+        self.annonces = []
+        for i in range(500):
+            annonce = {"id_annonce": f"a{i}", "statut": "en_attente", "places_disponibles": 1,
+                       "universite_destination": rng.choice(["UNZ", "BIT"]),
+                       "position_depart": {"latitude": rng.uniform(12.1, 12.4), "longitude": rng.uniform(-2.6, -2.2)}}
+            self.annonces.append(annonce)
+            self.grille.add(annonce)
+
+    def distances(self, lat, lon, universite=None):
+        return sorted((calculer_distance_km(lat, lon, a["position_depart"]["latitude"], a["position_depart"]["longitude"]), a["id_annonce"])
+                      for a in self.annonces if universite is None or a["universite_destination"] == universite)
+
+    def test_plus_proches_identiques_au_parcours_complet(self):
+        for lat, lon, universite in [(12.25, -2.40, None), (12.25, -2.40, "UNZ"), (13.0, -1.5, "BIT")]:
+            attendus = self.distances(lat, lon, universite)[:7]
+            obtenus = self.grille.plus_proches(lat, lon, 7, universite)
+            self.assertEqual([i for _, i in obtenus], [i for _, i in attendus])
+
+    def test_dans_rayon_identique_au_parcours_complet(self):
+        for rayon in (0.5, 3.0, 200.0):
+            attendus = [i for d, i in self.distances(12.25, -2.40, "BIT") if d <= rayon]
+            self.assertEqual([i for _, i in self.grille.dans_rayon(12.25, -2.40, rayon, "BIT")], attendus)
+
+    def test_mise_a_jour(self):
+        complete = dict(self.annonces[0], places_disponibles=0)
+        self.grille.discard(self.annonces[0])
+        self.grille.add(complete)
+        self.assertEqual(len(self.grille), 499)
+        self.assertNotIn("a0", [i for _, i in self.grille.dans_rayon(12.25, -2.40, 200.0)])
+
+    def test_departs_passes_ecartes(self):
+        self.grille.discard(self.annonces[0])
+        self.grille.add(dict(self.annonces[0], depart_prevu="2026-01-31T06:30:00"))
+        lat, lon = self.annonces[0]["position_depart"]["latitude"], self.annonces[0]["position_depart"]["longitude"]
+        self.assertEqual(self.grille.plus_proches(lat, lon, 1)[0][1], "a0")
+        filtre = self.grille.a_venir("2026-01-31T07:00:00")
+        attendus = [i for _, i in self.distances(lat, lon) if i != "a0"][:3]
+        self.assertEqual([i for _, i in self.grille.plus_proches(lat, lon, 3, filtre=filtre)], attendus)
+        self.assertNotIn("a0", [i for _, i in self.grille.dans_rayon(lat, lon, 5.0, filtre=filtre)])
+        self.assertEqual(self.grille.plus_proches(lat, lon, 1, filtre=self.grille.a_venir("2026-01-31T06:00:00"))[0][1], "a0")
+
+class TestIndexSpatialStockage(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_index_suit_publication_reservation_et_fin(self):
+        """
+        Vérifie que l'index suit les écritures d'annonces sans être reconstruit.
+        """
+        register_user("Auto", "Un", "1", "auto1@example.com", "UNZ", "automobiliste", engin="moto", places_disponibles=1)
+        register_user("Pass", "Un", "2", "pass1@example.com", "UNZ", "passager")
+        heure_depart = (datetime.now() + timedelta(minutes=30)).strftime("%H:%M")
+        _, _, proche = publier_trajet("auto1@example.com", "UNZ", heure_depart, 1, 12.250, -2.360)
+        self.assertEqual([a.id_annonce for a, _ in annonces_les_plus_proches(12.25, -2.36, 5, "UNZ")], [proche])
+
+        _, _, loin = publier_trajet("auto1@example.com", "UNZ", heure_depart, 2, 12.300, -2.360)
+        _, _, autre = publier_trajet("auto1@example.com", "BIT", heure_depart, 2, 12.251, -2.360)
+        self.assertEqual([a.id_annonce for a, _ in annonces_les_plus_proches(12.25, -2.36, 5, "UNZ")], [proche, loin])
+        self.assertEqual([a.id_annonce for a, _ in annonces_dans_rayon(12.25, -2.36, 1.0)], [proche, autre])
+
+        # Une annonce complète ou terminée n'est plus proposée
+        reserver_trajet(proche, "pass1@example.com", 12.25, -2.36)
+        terminer_trajet(autre)
+        self.assertEqual([a.id_annonce for a, _ in annonces_dans_rayon(12.25, -2.36, 10.0)], [loin])
+
+        # Une annonce dont le départ est passé n'est plus proposée
+        depart_passe = datetime.now() - timedelta(minutes=30)
+        publier_trajet("auto1@example.com", "UNZ", depart_passe.strftime("%H:%M"), 2, 12.250, -2.360, date_depart=depart_passe.date())
+        self.assertEqual([a.id_annonce for a, _ in annonces_les_plus_proches(12.25, -2.36, 5, "UNZ")], [loin])
+
+class TestIndexSpatialSQLite(TestIndexSpatialStockage):
+
+    def setUp(self):
+        stockage.use_sqlite_backend()
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+        stockage.use_json_backend()
@@ -0,0 +1,329 @@
+import unittest
+import os
+import json
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import stockage
+from stockage import (USERS_FILE, ANNONCES_FILE, HISTORIQUES_FILE, load_data, save_data, upsert_record, delete_record,
+                      set_entry, compact_journal, clear_all_data, get_record, find_records, range_records,
+                      declare_sorted_index, declare_derived_index, query_derived_index, migrate_json_to_sqlite)
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Préparer un répertoire de données vide avant chaque test.
+        """
+        clear_all_data()
+
+    def tearDown(self):
+        """
+        Nettoyer après chaque test.
+        """
+        clear_all_data()
+
+    def test_mutations_ajoutees_au_journal(self):
+        """
+        Vérifie qu'une mutation n'écrit qu'une ligne dans le journal et que load_data la rejoue.
+        """
+        save_data(ANNONCES_FILE, [{"id_annonce": "a1", "statut": "en_attente"}])
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a2", "statut": "en_attente"}, key="id_annonce")
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a1", "statut": "termine"}, key="id_annonce")
+
+        # L'instantané n'a pas été réécrit
+        with open(ANNONCES_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+        annonces = load_data(ANNONCES_FILE)
+        self.assertEqual(annonces, [{"id_annonce": "a1", "statut": "termine"}, {"id_annonce": "a2", "statut": "en_attente"}])
+
+        delete_record(ANNONCES_FILE, "a1", key="id_annonce")
+        self.assertEqual([a["id_annonce"] for a in load_data(ANNONCES_FILE)], ["a2"])
+
+    def test_historiques_par_chemin(self):
+        """
+        Vérifie les deltas par chemin de clés sur un fichier de type dictionnaire.
+        """
+        set_entry(HISTORIQUES_FILE, ["user@example.com", "a1"], {"etat": "en_attente"})
+        set_entry(HISTORIQUES_FILE, ["user@example.com", "a1"], {"etat": "termine"})
+        self.assertEqual(load_data(HISTORIQUES_FILE, default_value={}), {"user@example.com": {"a1": {"etat": "termine"}}})
+
+    def test_compaction(self):
+        """
+        Vérifie que la compaction replie le journal dans les instantanés et le supprime.
+        """
+        journal = os.path.join("data", stockage.JOURNAL_FILENAME)
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a1"}, key="id_annonce")
+        set_entry(HISTORIQUES_FILE, ["user@example.com", "a1"], {"etat": "en_attente"})
+        self.assertTrue(os.path.exists(journal))
+
+        compact_journal("data")
+        self.assertFalse(os.path.exists(journal))
+        with open(ANNONCES_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"id_annonce": "a1"}])
+        self.assertEqual(load_data(HISTORIQUES_FILE, default_value={}), {"user@example.com": {"a1": {"etat": "en_attente"}}})
+
+    def test_compaction_au_seuil(self):
+        """
+        Vérifie que la compaction est déclenchée automatiquement au seuil configuré.
+        """
+        seuil = stockage.JOURNAL_COMPACTION_THRESHOLD
+        stockage.JOURNAL_COMPACTION_THRESHOLD = 3
+        try:
+            for i in range(3):
+                upsert_record(ANNONCES_FILE, {"id_annonce": f"a{i}"}, key="id_annonce")
+        finally:
+            stockage.JOURNAL_COMPACTION_THRESHOLD = seuil
+        self.assertFalse(os.path.exists(os.path.join("data", stockage.JOURNAL_FILENAME)))
+        self.assertEqual(len(load_data(ANNONCES_FILE)), 3)
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+
+    def test_lectures_repetees_servies_par_le_cache(self):
+        """
+        Vérifie qu'un fichier inchangé n'est décodé qu'une fois, et qu'une écriture l'invalide.
+        """
+        save_data(USERS_FILE, [{"email": "a@example.com", "points": 0}])
+        stockage.clear_cache()
+        for _ in range(5):
+            self.assertEqual(get_record(USERS_FILE, "a@example.com", key="email")["points"], 0)
+        self.assertEqual(stockage.cache_stats(), {"hits": 4, "misses": 1})
+
+        # Une écriture externe au processus invalide le cache
+        with open(USERS_FILE, "w", encoding="utf-8") as f:
+            json.dump([{"email": "a@example.com", "points": 10}], f)
+        self.assertEqual(get_record(USERS_FILE, "a@example.com", key="email")["points"], 10)
+        self.assertEqual(stockage.cache_stats()["misses"], 2)
+
+    def test_ecritures_locales_mises_a_jour_sur_place(self):
+        """
+        Vérifie que les écritures de ce processus mettent à jour le cache (et son index par clé)
+        sans relire le fichier, y compris après une suppression et une compaction.
+        """
+        save_data(ANNONCES_FILE, [{"id_annonce": f"a{i}", "statut": "en_attente"} for i in range(5)])
+        get_record(ANNONCES_FILE, "a0", key="id_annonce")
+        misses = stockage.cache_stats()["misses"]
+
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a3", "statut": "termine"}, key="id_annonce")
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a5", "statut": "en_attente"}, key="id_annonce")
+        delete_record(ANNONCES_FILE, "a1", key="id_annonce")
+        self.assertEqual(get_record(ANNONCES_FILE, "a3", key="id_annonce")["statut"], "termine")
+        self.assertEqual(get_record(ANNONCES_FILE, "a5", key="id_annonce")["statut"], "en_attente")
+        self.assertIsNone(get_record(ANNONCES_FILE, "a1", key="id_annonce"))
+
+        compact_journal("data")
+        self.assertEqual([a["id_annonce"] for a in load_data(ANNONCES_FILE)], ["a0", "a2", "a3", "a4", "a5"])
+        self.assertEqual(stockage.cache_stats()["misses"], misses)
+
+        # Le contenu en mémoire est identique à celui relu depuis le disque
+        stockage.clear_cache()
+        self.assertEqual([a["id_annonce"] for a in load_data(ANNONCES_FILE)], ["a0", "a2", "a3", "a4", "a5"])
+
+    def test_copies_independantes(self):
+        """
+        Vérifie que modifier les données retournées ne modifie pas le cache.
+        """
+        save_data(ANNONCES_FILE, [{"id_annonce": "a1", "passagers_reserves": []}])
+        annonces = load_data(ANNONCES_FILE)
+        annonces[0]["passagers_reserves"].append("p@example.com")
+        get_record(ANNONCES_FILE, "a1", key="id_annonce")["passagers_reserves"].append("p@example.com")
+        self.assertEqual(load_data(ANNONCES_FILE, readonly=True), [{"id_annonce": "a1", "passagers_reserves": []}])
+
+    def test_invalidation_par_ecriture_externe(self):
+        """
+        Vérifie qu'une modification du fichier par un autre processus est détectée.
+        """
+        save_data(USERS_FILE, [{"email": "a@example.com"}])
+        load_data(USERS_FILE)
+        # Simule l'écriture d'un autre processus (le compteur de version local n'est pas incrémenté)
+        with open(USERS_FILE, "w", encoding="utf-8") as f:
+            json.dump([{"email": "a@example.com"}, {"email": "b@example.com"}], f)
+        self.assertEqual(len(load_data(USERS_FILE)), 2)
+
+    def test_recherche_par_plage_sur_index_trie(self):
+        """
+        Vérifie que l'index trié (partitionné par statut) reste à jour après mises à jour et suppressions.
+        """
+        declare_sorted_index(ANNONCES_FILE, "depart_prevu", partition=("statut",))
+        save_data(ANNONCES_FILE, [{"id_annonce": f"a{i}", "statut": "en_attente", "depart_prevu": f"2026-01-01T0{9 - i}:00:00"}
+                                  for i in range(5)])
+        self.assertEqual([a["id_annonce"] for a in range_records(ANNONCES_FILE, "depart_prevu", "2026-01-01T06:00:00",
+                                                                 "2026-01-01T09:00:00", statut="en_attente")],
+                         ["a3", "a2", "a1"])
+
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a2", "statut": "termine", "depart_prevu": "2026-01-01T07:00:00"}, key="id_annonce")
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a5", "statut": "en_attente", "depart_prevu": "2026-01-01T06:30:00"}, key="id_annonce")
+        delete_record(ANNONCES_FILE, "a1", key="id_annonce")
+        self.assertEqual([a["id_annonce"] for a in range_records(ANNONCES_FILE, "depart_prevu", "2026-01-01T06:00:00",
+                                                                 statut="en_attente")],
+                         ["a3", "a5", "a0"])
+        self.assertEqual([a["id_annonce"] for a in range_records(ANNONCES_FILE, "depart_prevu", fin="2026-01-01T07:00:00")],
+                         ["a4", "a3", "a5"])
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+
+    def _journal_lines(self):
+        journal = os.path.join("data", stockage.JOURNAL_FILENAME)
+        if not os.path.exists(journal):
+            return 0
+        with open(journal, "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+
+    def test_une_seule_ecriture_a_la_validation(self):
+        """
+        Vérifie que les écritures d'une transaction sont lisibles avant validation
+        et écrites en une seule entrée du journal.
+        """
+        tx = stockage.Transaction()
+        tx.upsert_record(ANNONCES_FILE, {"id_annonce": "a1", "places": 2}, key="id_annonce")
+        annonce = tx.get_record(ANNONCES_FILE, "a1", key="id_annonce")
+        annonce["places"] -= 1
+        tx.upsert_record(ANNONCES_FILE, annonce, key="id_annonce")
+        tx.set_entry(HISTORIQUES_FILE, ["user@example.com", "a1"], {"etat": "en_attente"})
+        self.assertEqual(tx.dirty, {ANNONCES_FILE, HISTORIQUES_FILE})
+        self.assertEqual(self._journal_lines(), 0)
+
+        tx.commit()
+        self.assertEqual(self._journal_lines(), 1)
+        self.assertEqual(load_data(ANNONCES_FILE), [{"id_annonce": "a1", "places": 1}])
+        self.assertIn("user@example.com", load_data(HISTORIQUES_FILE, default_value={}))
+
+    def test_abandon_sur_exception(self):
+        """
+        Vérifie qu'une exception dans le bloc with abandonne les écritures.
+        """
+        with self.assertRaises(RuntimeError):
+            with stockage.Transaction() as tx:
+                tx.upsert_record(ANNONCES_FILE, {"id_annonce": "a1"}, key="id_annonce")
+                raise RuntimeError("échec")
+        self.assertEqual(load_data(ANNONCES_FILE), [])
+
+    def test_reservation_une_seule_ecriture(self):
+        """
+        Vérifie qu'une réservation complète (annonce et deux historiques) n'écrit qu'une entrée.
+        """
+        from backend.users import register_user
+        from backend.trajets import publier_trajet, reserver_trajet
+        register_user("Auto", "Mobile", "1", "auto@example.com", "UNZ", "automobiliste", engin="voiture", places_disponibles=2)
+        register_user("Passager", "Un", "2", "p1@example.com", "UNZ", "passager")
+        _, _, annonce_id = publier_trajet("auto@example.com", "UNZ", "23:59", 2, 12.25, -2.36)
+
+        avant = self._journal_lines()
+        success, message = reserver_trajet(annonce_id, "p1@example.com", 12.24, -2.37)
+        self.assertTrue(success, message)
+        self.assertEqual(self._journal_lines(), avant + 1)
+
+    def test_conflit_sur_version(self):
+        """
+        Vérifie qu'une transaction conditionnée à une version n'écrit rien si l'enregistrement a changé entre-temps.
+        """
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a1", "places": 2, "version": 1}, key="id_annonce")
+        tx = stockage.Transaction()
+        annonce = tx.get_record(ANNONCES_FILE, "a1", key="id_annonce")
+        tx.upsert_record(ANNONCES_FILE, dict(annonce, places=1, version=2), key="id_annonce")
+        tx.set_entry(HISTORIQUES_FILE, ["user@example.com", "a1"], {"etat": "en_attente"})
+        tx.verifier(ANNONCES_FILE, "a1", "id_annonce", "version", 1)
+
+        # Écriture concurrente entre la lecture et la validation
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a1", "places": 0, "version": 2}, key="id_annonce")
+        avant = self._journal_lines()
+        with self.assertRaises(stockage.ConflitEcriture):
+            tx.commit()
+        self.assertEqual(self._journal_lines(), avant)
+        self.assertEqual(get_record(ANNONCES_FILE, "a1", key="id_annonce")["places"], 0)
+        self.assertEqual(load_data(HISTORIQUES_FILE, default_value={}), {})
+
+        # Sans écriture concurrente, la condition est remplie (version absente: valeur par défaut)
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a2", "places": 1}, key="id_annonce")
+        tx = stockage.Transaction()
+        tx.upsert_record(ANNONCES_FILE, {"id_annonce": "a2", "places": 0, "version": 1}, key="id_annonce")
+        tx.verifier(ANNONCES_FILE, "a2", "id_annonce", "version", 0, defaut=0)
+        tx.commit()
+        self.assertEqual(get_record(ANNONCES_FILE, "a2", key="id_annonce")["version"], 1)
+
+class TestSQLite(unittest.TestCase):
+
+    def setUp(self):
+        clear_all_data()
+
+    def tearDown(self):
+        clear_all_data()
+        stockage.use_json_backend()
+        if os.path.exists(stockage.DATABASE_FILE):
+            os.remove(stockage.DATABASE_FILE)
+
+    def test_recherche_par_colonnes_indexees(self):
+        """
+        Vérifie que les recherches par critères fonctionnent avec le backend SQLite.
+        """
+        stockage.use_sqlite_backend()
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a1", "statut": "en_attente", "universite_destination": "UNZ", "places": 2}, key="id_annonce")
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a2", "statut": "termine", "universite_destination": "UNZ", "places": 0}, key="id_annonce")
+        upsert_record(ANNONCES_FILE, {"id_annonce": "a3", "statut": "en_attente", "universite_destination": "BIT", "places": 1}, key="id_annonce")
+
+        self.assertEqual(get_record(ANNONCES_FILE, "a2", key="id_annonce")["statut"], "termine")
+        self.assertIsNone(get_record(ANNONCES_FILE, "inconnue", key="id_annonce"))
+        resultats = find_records(ANNONCES_FILE, statut="en_attente", universite_destination="UNZ")
+        self.assertEqual([a["id_annonce"] for a in resultats], ["a1"])
+        # Critère hors colonnes indexées: vérifié après décodage
+        self.assertEqual([a["id_annonce"] for a in find_records(ANNONCES_FILE, places=1)], ["a3"])
+
+        delete_record(ANNONCES_FILE, "a1", key="id_annonce")
+        self.assertEqual([a["id_annonce"] for a in load_data(ANNONCES_FILE)], ["a2", "a3"])
+
+    def test_index_derive_apres_ecriture_externe(self):
+        """
+        Vérifie qu'un index dérivé tient compte des écritures faites par une autre connexion à la base.
+        """
+        class Emails(set):
+            def add(self, record):
+                super().add(record["email"])
+
+            def discard(self, record):
+                super().discard(record["email"])
+
+        declare_derived_index(USERS_FILE, "emails_test", Emails)
+        stockage.use_sqlite_backend()
+        upsert_record(USERS_FILE, {"email": "a@example.com"}, key="email")
+        self.assertEqual(query_derived_index(USERS_FILE, "emails_test", set), {"a@example.com"})
+
+        from stockage_sqlite import SQLiteBackend
+        autre = SQLiteBackend(stockage.DATABASE_FILE) # Connexion d'un autre processus
+        autre.upsert(USERS_FILE, {"email": "b@example.com"}, key="email")
+        autre.delete(USERS_FILE, "a@example.com", key="email")
+        autre.close()
+        self.assertEqual(query_derived_index(USERS_FILE, "emails_test", set), {"b@example.com"})
+
+    def test_migration_depuis_json(self):
+        """
+        Vérifie la migration des fichiers JSON (et du journal) vers la base SQLite.
+        """
+        save_data(USERS_FILE, [{"email": "a@example.com", "nom": "A"}])
+        upsert_record(USERS_FILE, {"email": "b@example.com", "nom": "B"}, key="email")
+        set_entry(HISTORIQUES_FILE, ["a@example.com", "t1"], {"etat": "termine"})
+
+        counts = migrate_json_to_sqlite()
+        self.assertEqual(counts["users.json"], 2)
+        self.assertEqual(counts["historiques.json"], 1)
+
+        stockage.use_sqlite_backend()
+        self.assertEqual(get_record(USERS_FILE, "b@example.com", key="email")["nom"], "B")
+        self.assertEqual(load_data(HISTORIQUES_FILE, default_value={}), {"a@example.com": {"t1": {"etat": "termine"}}})
+
+if __name__ == '__main__':
+    unittest.main()
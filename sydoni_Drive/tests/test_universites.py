@@ -0,0 +1,115 @@
+import unittest
+import os
+import json
+import subprocess
+import tempfile
+from unittest import mock
+from math import radians, cos
+
+# Ajuster le chemin pour les imports du backend
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import universites
+from backend.universites import (charger_universites, sauvegarder_universites, get_universite,
+                                 get_coordonnees_universite, normaliser_nom, rechercher_universites)
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestRegistreUniversites(unittest.TestCase):
+
+    def setUp(self):
+        # Registre sur un fichier temporaire, initialisé au premier accès
+        self.dossier = tempfile.TemporaryDirectory()
+        self.ancien_fichier, self.ancien_registre = universites.UNIVERSITES_FILE, universites._etat
+        universites.UNIVERSITES_FILE, universites._etat = os.path.join(self.dossier.name, "universites.json"), None
+        self.initiales = charger_universites()
+
+    def tearDown(self):
+        universites.UNIVERSITES_FILE, universites._etat = self.ancien_fichier, self.ancien_registre
+        self.dossier.cleanup()
+
+    def test_recherche_normalisee(self):
+        self.assertEqual(get_coordonnees_universite("Université Norbert Zongo (UNZ)"), (12.24, -2.399))
+        self.assertEqual(get_coordonnees_universite("  UNIVERSITE norbert   zongo (unz) "), (12.24, -2.399))
+        self.assertIsNone(get_coordonnees_universite("Université inconnue"))
+        self.assertEqual(normaliser_nom("Institut Supérieur  de Management"), "institut superieur de management")
+
+        universite = get_universite("burkina institut of technology(bit)")
+        self.assertEqual(universite.nom, "Burkina Institut of Technology(BIT)")
+        self.assertEqual(universite.trig, (radians(12.2419), radians(-2.4083), cos(radians(12.2419))))
+        self.assertIsInstance(universite.coordonnees, tuple)
+
+    def test_sauvegarde_met_a_jour_le_registre(self):
+        sauvegarder_universites(self.initiales + [{"nom": "École Normale Supérieure (ENS)", "latitude": 12.26, "longitude": -2.37}])
+        self.assertEqual(get_coordonnees_universite("ecole normale superieure (ens)"), (12.26, -2.37))
+        sauvegarder_universites(self.initiales)
+        self.assertIsNone(get_coordonnees_universite("ecole normale superieure (ens)"))
+
+    def test_seules_les_entrees_modifiees_sont_reindexees(self):
+        registre, index = universites._get_etat()
+        unz = get_universite("Université Norbert Zongo (UNZ)")
+        ens = {"nom": "École Normale Supérieure (ENS)", "latitude": 12.26, "longitude": -2.37}
+        with mock.patch.object(index, "add", wraps=index.add) as ajout, \
+             mock.patch.object(index, "discard", wraps=index.discard) as retrait:
+            sauvegarder_universites(self.initiales + [ens])
+            self.assertEqual([appel.args[0] for appel in ajout.call_args_list], ["ecole normale superieure (ens)"])
+            ajout.reset_mock()
+            retrait.reset_mock()
+            sauvegarder_universites(self.initiales)
+            self.assertEqual(ajout.call_count, 0)
+            self.assertEqual([appel.args[0] for appel in retrait.call_args_list], ["ecole normale superieure (ens)"])
+        self.assertEqual(universites._get_etat(), (registre, index))
+        self.assertIs(get_universite("Université Norbert Zongo (UNZ)"), unz)
+
+    def test_fichier_modifie_hors_du_module(self):
+        """
+        Le registre est reconstruit quand le fichier change sans passer par sauvegarder_universites
+        (autre processus, fichier supprimé), au prochain contrôle du fichier.
+        """
+        self.addCleanup(setattr, universites, "INTERVALLE_VERIFICATION", universites.INTERVALLE_VERIFICATION)
+        universites.INTERVALLE_VERIFICATION = universites._prochaine_verification = 0
+        self.assertIsNone(get_coordonnees_universite("ENS"))
+        with open(universites.UNIVERSITES_FILE, "w", encoding="utf-8") as f:
+            json.dump([{"nom": "École Normale Supérieure (ENS)", "latitude": 12.26, "longitude": -2.37}], f)
+        self.assertEqual(get_coordonnees_universite("ecole normale superieure (ens)"), (12.26, -2.37))
+        self.assertEqual(rechercher_universites("ENS")[0][0].nom, "École Normale Supérieure (ENS)")
+        self.assertIsNone(get_coordonnees_universite("Université Norbert Zongo (UNZ)"))
+
+        os.remove(universites.UNIVERSITES_FILE)
+        self.assertEqual(get_coordonnees_universite("Université Norbert Zongo (UNZ)"), (12.24, -2.399))
+        self.assertEqual(charger_universites(), universites.UNIVERSITES_INITIALES)
+
+    def test_recherches_sans_lecture_du_fichier(self):
+        """
+        Entre deux contrôles du fichier, les recherches ne font aucune entrée-sortie.
+        """
+        with mock.patch.object(universites, "data_token", wraps=universites.data_token) as jeton:
+            for _ in range(100):
+                self.assertEqual(get_coordonnees_universite("UNZ (Université Norbert Zongo)"), None)
+                self.assertEqual(get_coordonnees_universite("Université Norbert Zongo (UNZ)"), (12.24, -2.399))
+            self.assertEqual(jeton.call_count, 0)
+
+    def test_recherche_par_nom_alias_et_sigle(self):
+        for texte in ["Norbert Zongo", "UNZ", "unz koudougou", "norbet zongo"]:
+            self.assertEqual(rechercher_universites(texte)[0][0].nom, "Université Norbert Zongo (UNZ)")
+        self.assertEqual(rechercher_universites("ISMK")[0][0].alias, ("ISMK",))
+
+        # Le sigle des universités ajoutées est calculé et indexé à la sauvegarde
+        sauvegarder_universites(self.initiales + [{"nom": "École Normale Supérieure", "latitude": 12.26, "longitude": -2.37}])
+        self.assertEqual(rechercher_universites("ENS")[0][0].nom, "École Normale Supérieure")
+        sauvegarder_universites(self.initiales)
+        self.assertEqual(rechercher_universites("ENS"), [])
+
+    def test_import_sans_lecture_de_fichier(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, sys.argv[1]); import backend.universites", RACINE],
+                           cwd=dossier, check=True)
+            self.assertEqual(os.listdir(dossier), [])
+
+    def test_initialisation_au_premier_acces(self):
+        self.assertEqual(self.initiales, universites.UNIVERSITES_INITIALES)
+        self.assertTrue(os.path.exists(universites.UNIVERSITES_FILE))
+
+if __name__ == '__main__':
+    unittest.main()